@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+ROSTER_PAGE_SIZE = 200
+ROSTER_CACHE_TIMEOUT = 60 * 60
+ROSTER_CHANGED_KEY = 'about_us:roster:changed_at'
+# The user fields the roster shows; saves of other fields leave it as is.
+ROSTER_FIELDS = ('first_name', 'last_name')
+
+
+def roster_changed_at():
+    """When the user roster last changed, as far as the cache knows."""
+    changed_at = cache.get(ROSTER_CHANGED_KEY)
+    if changed_at is None:
+        # Nothing recorded (cold or evicted cache): assume it just changed.
+        changed_at = touch_roster()
+    return changed_at
+
+
+async def aroster_changed_at():
+    changed_at = await cache.aget(ROSTER_CHANGED_KEY)
+    if changed_at is None:
+        changed_at = timezone.now()
+        await cache.aset(ROSTER_CHANGED_KEY, changed_at, None)
+    return changed_at
+
+
+def touch_roster():
+    changed_at = timezone.now()
+    cache.set(ROSTER_CHANGED_KEY, changed_at, None)
+    return changed_at
+
+
+def roster_pages_key(changed_at):
+    return f'about_us:roster:{changed_at.timestamp()}:pages'
+
+
+def roster_page_key(page_number, changed_at=None):
+    changed_at = changed_at or roster_changed_at()
+    return f'about_us:roster:{changed_at.timestamp()}:{page_number}'
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .roster import ROSTER_FIELDS, touch_roster
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_roster_on_save(sender, created, update_fields, **kwargs):
+    # Logins save last_login alone; the roster does not show it.
+    if (created or update_fields is None
+            or not update_fields.isdisjoint(ROSTER_FIELDS)):
+        touch_roster()
+
+
+@receiver(post_delete, sender=get_user_model())
+def invalidate_roster_on_delete(sender, **kwargs):
+    touch_roster()
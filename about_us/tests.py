@@ -0,0 +1,69 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from .views import about_us, about_us_async
+
+User = get_user_model()
+
+
+class AboutUsRosterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create(username='ali', first_name='Ali', last_name='Alavi')
+
+    def test_cached_page_and_conditional_get_skip_the_database(self):
+        response = self.client.get('/about-us/')
+        self.assertContains(response, 'Ali Alavi')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/about-us/').status_code, 200)
+            not_modified = self.client.get(
+                '/about-us/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_user_changes_invalidate_the_roster(self):
+        etag = self.client.get('/about-us/')['ETag']
+        User.objects.create(username='sara', first_name='Sara', last_name='Saei')
+        response = self.client.get('/about-us/', HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Sara Saei')
+
+        User.objects.filter(username='sara').get().delete()
+        self.assertNotContains(self.client.get('/about-us/'), 'Sara Saei')
+
+    def test_saves_of_fields_off_the_roster_keep_it(self):
+        etag = self.client.get('/about-us/')['ETag']
+        user = User.objects.get(username='ali')
+        user.last_login = user.date_joined
+        user.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(
+            '/about-us/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        user.first_name = 'Aly'
+        user.save(update_fields=['first_name'])
+        self.assertContains(self.client.get(
+            '/about-us/', HTTP_IF_NONE_MATCH=etag), 'Aly Alavi')
+
+    def test_out_of_range_pages_share_the_last_page(self):
+        last = self.client.get('/about-us/')
+        for page in ('2', '10000000000000000000', 'x', '-1'):
+            response = self.client.get('/about-us/', {'page': page})
+            self.assertEqual(response['ETag'], last['ETag'])
+
+    def test_async_view_renders_and_validates_like_the_sync_one(self):
+        sync_response = about_us(RequestFactory().get('/about-us/'))
+        response = async_to_sync(about_us_async)(
+            RequestFactory().get('/about-us/'))
+        self.assertEqual(response.content, sync_response.content)
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+        self.assertEqual(response['Last-Modified'],
+                         sync_response['Last-Modified'])
+
+        conditional = RequestFactory().get(
+            '/about-us/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(
+            async_to_sync(about_us_async)(conditional).status_code, 304)
+
+        beyond = async_to_sync(about_us_async)(
+            RequestFactory().get('/about-us/', {'page': '99'}))
+        self.assertEqual(beyond['ETag'], response['ETag'])
@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import about_us
+from .views import about_us, about_us_async
 
 urlpatterns = [
-    path('', about_us),
+    path('', about_us_async if settings.ASYNC_READ_VIEWS else about_us),
 ]
@@ -1,8 +1,107 @@
-from django.shortcuts import render
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
 
-def about_us(request):
+from charity.db import primary_reads
+
+from .roster import (
+    ROSTER_CACHE_TIMEOUT, ROSTER_FIELDS, ROSTER_PAGE_SIZE, aroster_changed_at,
+    roster_changed_at, roster_page_key, roster_pages_key
+)
+
+
+def requested_page(request):
+    try:
+        return max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        return 1
+
+
+def page_number(request):
+    """
+    The requested page, clamped to the last one so that out of range pages
+    share its cache entry rather than each filling one of their own.
+    """
+    changed_at = roster_changed_at()
+    key = roster_pages_key(changed_at)
+    pages = cache.get(key)
+    if pages is None:
+        with primary_reads():
+            pages = Paginator(roster_users(), ROSTER_PAGE_SIZE).num_pages
+        cache.set(key, pages, ROSTER_CACHE_TIMEOUT)
+    return min(requested_page(request), pages)
+
+
+async def apage_number(request, changed_at):
+    key = roster_pages_key(changed_at)
+    pages = await cache.aget(key)
+    if pages is None:
+        paginator = Paginator(roster_users(), ROSTER_PAGE_SIZE)
+        with primary_reads():
+            paginator.count = await roster_users().acount()
+        pages = paginator.num_pages
+        await cache.aset(key, pages, ROSTER_CACHE_TIMEOUT)
+    return min(requested_page(request), pages)
+
+
+def roster_etag(request):
+    return roster_page_key(page_number(request))
+
+
+def roster_last_modified(request):
+    return roster_changed_at()
+
+
+def roster_users():
     User = get_user_model()
-    users = User.objects.all()
-    context = {'users': users}
+    return User.objects.only(*ROSTER_FIELDS).order_by('pk')
+
+
+@condition(etag_func=roster_etag, last_modified_func=roster_last_modified)
+def about_us(request):
+    number = page_number(request)
+    key = roster_page_key(number)
+    roster = cache.get(key)
+    if roster is None:
+        # Cached under the current roster version: no lagging replica.
+        with primary_reads():
+            page = Paginator(roster_users(), ROSTER_PAGE_SIZE).get_page(
+                number)
+            roster = render_to_string('roster.html', {'page': page})
+        cache.set(key, roster, ROSTER_CACHE_TIMEOUT)
+    context = {'roster': roster}
     return render(request, 'about_us.html', context)
+
+
+async def about_us_async(request):
+    """about_us on the async ORM and cache API, for ASGI deployments."""
+    changed_at = await aroster_changed_at()
+    number = await apage_number(request, changed_at)
+    key = roster_page_key(number, changed_at)
+    etag = quote_etag(key)
+    last_modified = int(changed_at.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    roster = await cache.aget(key)
+    if roster is None:
+        users = roster_users()
+        paginator = Paginator(users, ROSTER_PAGE_SIZE)
+        with primary_reads():
+            paginator.count = await users.acount()
+            page = paginator.get_page(number)
+            page.object_list = [user async for user in page.object_list]
+        roster = render_to_string('roster.html', {'page': page})
+        await cache.aset(key, roster, ROSTER_CACHE_TIMEOUT)
+    context = {'roster': roster}
+    response = render(request, 'about_us.html', context)
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    return response
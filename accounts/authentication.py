@@ -0,0 +1,202 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import User
+
+
+class UserRoles(NamedTuple):
+    is_benefactor: bool
+    is_charity: bool
+    benefactor_id: Optional[int]
+    charity_id: Optional[int]
+
+
+def user_roles(user):
+    """
+    Role flags of ``user``. Users authenticated by CachedTokenAuthentication
+    carry them precomputed; anyone else pays one query per reverse relation.
+    """
+    roles = getattr(user, 'roles', None)
+    if roles is None:
+        benefactor = getattr(user, 'benefactor', None)
+        charity = getattr(user, 'charity', None)
+        roles = UserRoles(benefactor is not None, charity is not None,
+                          benefactor and benefactor.pk, charity and charity.pk)
+    return roles
+
+
+class LRUCache:
+    """Thread-safe, size-bounded mapping whose entries expire."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LastSeenBuffer:
+    """
+    Collects the ids of users seen since the last flush and stamps them all
+    with a single UPDATE at most once per ``interval`` seconds.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = set()
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def touch(self, user_id):
+        with self._lock:
+            self._pending.add(user_id)
+            if time.monotonic() - self._flushed_at < self.interval:
+                return
+            pending, self._pending = self._pending, set()
+            self._flushed_at = time.monotonic()
+        self.write(pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            self._flushed_at = time.monotonic()
+        self.write(pending)
+
+    def write(self, user_ids):
+        if user_ids:
+            User.objects.filter(pk__in=user_ids).update(
+                last_seen=timezone.now())
+
+
+token_cache = LRUCache(
+    max_entries=getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000),
+    timeout=getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60))
+last_seen = LastSeenBuffer(
+    interval=getattr(settings, 'AUTH_LAST_SEEN_FLUSH_INTERVAL', 60))
+
+
+def shared_cache():
+    alias = getattr(settings, 'AUTH_TOKEN_SHARED_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def shared_cache_key(key):
+    return f'accounts:token:{key}'
+
+
+def revoked_key(key):
+    return f'accounts:token:{key}:revoked'
+
+
+def invalidate_token(key):
+    token_cache.delete(key)
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(shared_cache_key(key))
+        # Other workers still hold the token in their LRU; they check this
+        # before serving it. It only has to outlive their entries.
+        cache.set(revoked_key(key), time.time(), token_cache.timeout)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that resolves token, user and role flags with one
+    query and then serves them from an in-process LRU, optionally backed by
+    a shared Django cache (settings.AUTH_TOKEN_SHARED_CACHE) so other
+    workers can skip the query too.
+
+    Deleting a token or changing its user evicts it from the LRU of the
+    worker that did it. With a shared cache it also leaves a revocation
+    marker there, which every worker checks before serving a token it
+    loaded earlier, so a logout holds everywhere at once. Without one,
+    other workers keep accepting the token until their entry expires
+    (settings.AUTH_TOKEN_CACHE_TIMEOUT).
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None and self.revoked(token):
+            token = None
+        if token is None:
+            token = self.load_token(key)
+            token_cache.set(key, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        last_seen.touch(token.user.pk)
+        # Hand out copies so that nothing a view sets on the user leaks into
+        # later requests through the cache.
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return (token.user, token)
+
+    def revoked(self, token):
+        """Whether ``token`` was invalidated after it was loaded."""
+        cache = shared_cache()
+        if cache is None:
+            return False
+        revoked_at = cache.get(revoked_key(token.key))
+        # Tokens cached before loaded_at existed count as loaded at 0.
+        return (revoked_at is not None
+                and revoked_at >= getattr(token, 'loaded_at', 0))
+
+    def load_token(self, key):
+        cache = shared_cache()
+        if cache is not None:
+            token = cache.get(shared_cache_key(key))
+            if token is not None and not self.revoked(token):
+                return token
+
+        # Stamped before the query, so that a revocation racing it counts.
+        loaded_at = time.time()
+        try:
+            token = Token.objects.select_related(
+                'user__benefactor', 'user__charity').get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        token.user.roles = user_roles(token.user)
+        token.loaded_at = loaded_at
+
+        if cache is not None:
+            cache.set(shared_cache_key(key), token, token_cache.timeout)
+        return token
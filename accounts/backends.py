@@ -0,0 +1,30 @@
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashers
+from .models import User
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that verifies passwords in the hashing pool and stores the
+    upgraded hash when the password was made with an outdated hasher or cost.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as known ones.
+            hashers.make_password(password)
+            return None
+        valid, upgraded = hashers.verify_password(password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+        if upgraded is not None:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+        return user
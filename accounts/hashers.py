@@ -0,0 +1,143 @@
+"""
+Password hashers with a configurable cost, and a process pool to run them in.
+
+settings.PASSWORD_HASHERS lists the hasher of PASSWORD_HASHER_PROFILE first,
+so it signs new passwords, and keeps the others so that existing hashes
+still verify. Their cost comes from settings.PASSWORD_HASHER_COST; a hash
+made with another algorithm or cost is replaced on the user's next login.
+
+make_password() and verify_password() hash in a pool of
+PASSWORD_HASHING_WORKERS processes, so the CPU time of a registration or
+login burst does not hold the web worker's GIL: the calling thread waits
+for the result with the GIL released and other threads keep serving. Async
+code awaits amake_password() and averify_password() instead, which never
+block the event loop. With no workers configured they hash inline (the
+async ones in a thread), as do daemonic processes (e.g. the workers of
+manage.py test --parallel), which may not start processes of their own.
+Pool processes inherit the settings of the moment they start; changing a
+hashing setting (e.g. override_settings) restarts them.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+
+HASHING_SETTINGS = {
+    'PASSWORD_HASHERS', 'PASSWORD_HASHER_COST', 'PASSWORD_HASHING_WORKERS'}
+
+
+def cost(profile, name, default):
+    return getattr(settings, 'PASSWORD_HASHER_COST', {}).get(
+        profile, {}).get(name, default)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return cost('argon2', 'time_cost', super().time_cost)
+
+    @property
+    def memory_cost(self):
+        return cost('argon2', 'memory_cost', super().memory_cost)
+
+    @property
+    def parallelism(self):
+        return cost('argon2', 'parallelism', super().parallelism)
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return cost('bcrypt', 'rounds', super().rounds)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return cost('pbkdf2', 'iterations', super().iterations)
+
+
+def hash_inline(password):
+    return hashers.make_password(password)
+
+
+def verify_inline(password, encoded):
+    """
+    Returns whether ``password`` matches ``encoded`` and, if it does but the
+    hash uses another hasher or cost than the preferred one, a new hash.
+    """
+    upgraded = []
+    valid = hashers.check_password(
+        password, encoded,
+        setter=lambda raw: upgraded.append(hashers.make_password(raw)))
+    return valid, upgraded[0] if upgraded else None
+
+
+class HashingPool:
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', 0)
+        if not workers or multiprocessing.current_process().daemon:
+            return None
+        with self._lock:
+            # A pool inherited through fork() (e.g. gunicorn --preload)
+            # belongs to the parent; start our own.
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, func, *args):
+        executor = self.executor()
+        if executor is None:
+            return func(*args)
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            self.shutdown()
+            return func(*args)
+
+    async def arun(self, func, *args):
+        executor = self.executor()
+        if executor is None:
+            return await sync_to_async(func, thread_sensitive=False)(*args)
+        try:
+            return await asyncio.wrap_future(executor.submit(func, *args))
+        except BrokenProcessPool:
+            self.shutdown()
+            return await sync_to_async(func, thread_sensitive=False)(*args)
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+pool = HashingPool()
+
+
+def make_password(password):
+    return pool.run(hash_inline, password)
+
+
+def verify_password(password, encoded):
+    return pool.run(verify_inline, password, encoded)
+
+
+async def amake_password(password):
+    return await pool.arun(hash_inline, password)
+
+
+async def averify_password(password, encoded):
+    return await pool.arun(verify_inline, password, encoded)
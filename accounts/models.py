@@ -11,6 +11,7 @@ class User(AbstractUser):
     description = models.TextField(blank=True)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, blank=True, null=True)
     phone = models.CharField(max_length=15, blank=True)
+    last_seen = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         return self.username
@@ -1,9 +1,15 @@
 from rest_framework.permissions import IsAuthenticated
 
+from .authentication import user_roles
+
 
 class IsBenefactor(IsAuthenticated):
-    pass
+    def has_permission(self, request, view):
+        return bool(super().has_permission(request, view) and
+                    user_roles(request.user).is_benefactor)
 
 
 class IsCharityOwner(IsAuthenticated):
-    pass
\ No newline at end of file
+    def has_permission(self, request, view):
+        return bool(super().has_permission(request, view) and
+                    user_roles(request.user).is_charity)
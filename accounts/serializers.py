@@ -1,7 +1,35 @@
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
 from rest_framework import serializers
 
+from . import hashers
 from .models import User
 
 
 class UserSerializer(serializers.ModelSerializer):
-    pass
\ No newline at end of file
+    password = serializers.CharField(write_only=True,
+                                     style={'input_type': 'password'})
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'password', 'email', 'first_name',
+                  'last_name', 'phone', 'address', 'gender', 'age',
+                  'description')
+
+    def validate(self, attrs):
+        user = User(**{key: value for key, value in attrs.items()
+                       if key != 'password'})
+        try:
+            validate_password(attrs['password'], user)
+        except ValidationError as exc:
+            raise serializers.ValidationError(
+                {'password': list(exc.messages)})
+        return attrs
+
+    def create(self, validated_data):
+        password = validated_data.pop('password')
+        user = User(**validated_data)
+        # Hashed in the pool rather than by set_password() in this worker.
+        user.password = hashers.make_password(password)
+        user.save()
+        return user
@@ -0,0 +1,40 @@
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from charities.models import Benefactor, Charity
+
+from .authentication import invalidate_token
+from .hashers import HASHING_SETTINGS, pool
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    for key in Token.objects.filter(user_id=instance.pk).values_list(
+            'key', flat=True):
+        invalidate_token(key)
+
+
+@receiver(post_save, sender=Benefactor)
+@receiver(post_delete, sender=Benefactor)
+@receiver(post_save, sender=Charity)
+@receiver(post_delete, sender=Charity)
+def invalidate_role_tokens(sender, instance, **kwargs):
+    # Cached tokens carry role flags, so becoming (or ceasing to be) a
+    # benefactor or charity has to drop them.
+    invalidate_user_tokens(User, instance.user)
+
+
+@receiver(setting_changed)
+def restart_hashing_pool(sender, setting, **kwargs):
+    # Pool processes keep the settings they started with.
+    if setting in HASHING_SETTINGS:
+        pool.shutdown()
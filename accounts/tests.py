@@ -1,3 +1,164 @@
-from django.test import TestCase
+import multiprocessing
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import (
+    check_password, identify_hasher, make_password)
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts import hashers
+from accounts.authentication import last_seen, token_cache
+from accounts.models import User
+from charities.models import Benefactor, Charity, Task
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        last_seen.flush()
+        owner = User.objects.create(username='owner')
+        charity = Charity.objects.create(
+            user=owner, name='charity', reg_number='1234567890')
+        self.tasks = Task.objects.bulk_create(
+            [Task(title=f'task{i}', charity=charity) for i in range(3)])
+        self.user = User.objects.create(username='benefactor')
+        Benefactor.objects.create(user=self.user)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def claim(self, task):
+        return self.client.post(f'/tasks/{task.id}/request/').status_code
+
+    def test_authentication_and_roles_are_served_from_cache(self):
+        auth_tables = ('authtoken_token', 'accounts_user',
+                       'charities_benefactor', 'charities_charity')
+        auth_queries = []
+        for task in self.tasks[:2]:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.claim(task), 200)
+            auth_queries.append([query['sql'] for query in queries
+                                 if any(f'"{table}"' in query['sql']
+                                        for table in auth_tables)])
+        # Only the first request had to look the token up.
+        first, second = auth_queries
+        self.assertTrue(any('"authtoken_token"' in sql for sql in first))
+        self.assertEqual(second, [])
+
+    def test_logout_revokes_the_cached_token(self):
+        self.claim(self.tasks[0])
+        self.assertEqual(self.client.post('/accounts/logout/').status_code,
+                         204)
+        self.assertEqual(self.claim(self.tasks[1]), 401)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+    def test_logout_reaches_workers_through_the_shared_cache(self):
+        cache.clear()
+        self.claim(self.tasks[0])
+        # Another worker loaded the token before this one logged out.
+        other_worker = token_cache.get(self.token.key)
+        self.assertEqual(self.client.post('/accounts/logout/').status_code,
+                         204)
+        token_cache.set(self.token.key, other_worker)
+        self.assertEqual(self.claim(self.tasks[1]), 401)
+
+    def test_role_changes_evict_cached_flags(self):
+        response = self.client.post('/tasks/', {'title': 'task'})
+        self.assertEqual(response.status_code, 403)
+        Charity.objects.create(user=self.user, name='c', reg_number='1')
+        response = self.client.post('/tasks/', {'title': 'task'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_last_seen_is_written_in_batches(self):
+        with mock.patch.object(last_seen, 'interval', 3600):
+            self.claim(self.tasks[0])
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_seen)
+        last_seen.flush()
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_seen)
+
+
+@override_settings(PASSWORD_HASHER_COST={
+    'argon2': {'time_cost': 1, 'memory_cost': 1024, 'parallelism': 1},
+    'pbkdf2': {'iterations': 1000},
+})
+class PasswordHashingTest(TestCase):
+    password = 'correct horse battery staple'
+
+    def login(self, username, password):
+        return self.client.post('/accounts/login/', {
+            'username': username, 'password': password})
+
+    def test_registration_hashes_with_the_profile_hasher(self):
+        response = self.client.post('/accounts/register/', {
+            'username': 'new', 'password': self.password, 'age': 30})
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('password', response.data)
+        user = User.objects.get(username='new')
+        self.assertEqual(identify_hasher(user.password).algorithm, 'argon2')
+        self.assertEqual(self.login('new', self.password).status_code, 200)
+
+    def test_registration_validates_the_password(self):
+        response = self.client.post('/accounts/register/', {
+            'username': 'new', 'password': '123'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.data)
+
+    def test_login_upgrades_outdated_hashes(self):
+        user = User.objects.create(username='old', password=make_password(
+            self.password, hasher='pbkdf2_sha256'))
+        self.assertEqual(self.login('old', 'wrong').status_code, 400)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+        self.assertEqual(self.login('old', self.password).status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertIn('m=1024,t=1,p=1', user.password)
+
+        # A cost change is an upgrade as well.
+        with override_settings(PASSWORD_HASHER_COST={
+                'argon2': {'time_cost': 2, 'memory_cost': 1024,
+                           'parallelism': 1}}):
+            self.assertEqual(self.login('old', self.password).status_code,
+                             200)
+        user.refresh_from_db()
+        self.assertIn('m=1024,t=2,p=1', user.password)
+
+    def test_hashing_runs_in_the_pool_or_inline(self):
+        # Workers of manage.py test --parallel are daemonic: no pool there.
+        pooled = not multiprocessing.current_process().daemon
+        with override_settings(PASSWORD_HASHING_WORKERS=1):
+            encoded = hashers.make_password(self.password)
+            self.assertEqual(hashers.pool._executor is not None, pooled)
+        self.assertIsNone(hashers.pool._executor)
+        with override_settings(PASSWORD_HASHING_WORKERS=0):
+            self.assertEqual(hashers.verify_password(self.password, encoded),
+                             (True, None))
+            self.assertIsNone(hashers.pool._executor)
+
+    def test_daemonic_processes_hash_inline(self):
+        with override_settings(PASSWORD_HASHING_WORKERS=1), mock.patch(
+                'multiprocessing.current_process',
+                return_value=mock.Mock(daemon=True)):
+            encoded = hashers.make_password(self.password)
+            self.assertIsNone(hashers.pool._executor)
+        self.assertTrue(check_password(self.password, encoded))
+
+    def test_async_hashing_awaits_the_pool(self):
+        pooled = not multiprocessing.current_process().daemon
+        for workers in (1, 0):
+            with override_settings(PASSWORD_HASHING_WORKERS=workers):
+                encoded = async_to_sync(hashers.amake_password)(self.password)
+                self.assertEqual(
+                    async_to_sync(hashers.averify_password)(
+                        self.password, encoded),
+                    (True, None))
+                self.assertEqual(hashers.pool._executor is not None,
+                                 pooled and bool(workers))
@@ -8,8 +8,16 @@ from .serializers import UserSerializer
 
 
 class LogoutAPIView(APIView):
-    pass
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        # Deleting the token also evicts it from the authentication cache.
+        if request.auth is not None:
+            request.auth.delete()
+        return Response(data={'message': f'Bye {request.user.username}!'},
+                        status=status.HTTP_204_NO_CONTENT)
 
 
 class UserRegistration(generics.CreateAPIView):
-    pass
\ No newline at end of file
+    permission_classes = (AllowAny,)
+    serializer_class = UserSerializer
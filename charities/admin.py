@@ -1,18 +1,97 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 
 from .models import Benefactor, Charity, Task
 
 
+def estimated_row_count(model, using='default'):
+    """The planner's row estimate for ``model``'s table, if it keeps one."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'sqlite':
+        # Maintained by ANALYZE; stat starts with the row count of the
+        # index. Partial indexes count only their rows, so take the largest.
+        sql = ('SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 '
+               'WHERE tbl = %s')
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the table statistics instead of COUNT(*) for unfiltered changelists
+    of large tables. Filtered and small lists are still counted exactly.
+    """
+    exact_count_below = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.exact_count_below:
+                return estimate
+        return super().count
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """
+    Changelists that stay cheap on big tables: estimated page counts, no
+    full-table count, and search by exact value on indexed columns instead
+    of icontains scans. ``search_fields`` must use the '=' prefix.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        query = Q()
+        for field in self.search_fields:
+            lookup = field.lstrip('=')
+            if lookup.split('__')[-1] in ('id', 'pk') and not term.isdigit():
+                continue
+            query |= Q(**{lookup: term})
+        if not query:
+            return queryset.none(), False
+        return queryset.filter(query), False
+
+
 @admin.register(Benefactor)
-class BenefactorAdmin(admin.ModelAdmin):
-    pass
+class BenefactorAdmin(ScalableModelAdmin):
+    list_display = ('__str__', 'experience', 'free_time_per_week')
+    list_select_related = ('user',)
+    list_filter = ('experience',)
+    search_fields = ('=user__username',)
+    raw_id_fields = ('user',)
 
 
 @admin.register(Charity)
-class CharityAdmin(admin.ModelAdmin):
-    pass
+class CharityAdmin(ScalableModelAdmin):
+    list_display = ('name', 'reg_number', 'user')
+    list_select_related = ('user',)
+    search_fields = ('=name', '=reg_number', '=user__username')
+    raw_id_fields = ('user',)
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
-    pass
\ No newline at end of file
+class TaskAdmin(ScalableModelAdmin):
+    list_display = ('title', 'state', 'date', 'charity',
+                    'assigned_benefactor')
+    list_select_related = ('charity', 'assigned_benefactor__user')
+    list_filter = ('state', ('date', admin.DateFieldListFilter))
+    search_fields = ('=id', '=title')
+    raw_id_fields = ('charity', 'assigned_benefactor')
@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class CharitiesConfig(AppConfig):
     name = 'charities'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from charity.db import configure_sqlite
+
+        from . import signals  # noqa: F401
+
+        connection_created.connect(
+            configure_sqlite, dispatch_uid='charity.db.configure_sqlite')
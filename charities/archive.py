@@ -0,0 +1,121 @@
+"""
+Archival of old done tasks (manage.py archive_tasks).
+
+Done tasks dated more than settings.TASK_ARCHIVE_DAYS days ago move from
+Task to TaskArchive, in batches, keeping their ids. Task then holds the
+tasks that still change, and the feed, search and matching queries no
+longer step over years of finished work; the archived tasks leave the feed
+and the search results.
+
+A batch is one transaction: an INSERT ... SELECT copies the tasks, still
+done, into TaskArchive and a DELETE removes them from Task without the
+delete signals, since the task stats count both tables (stats.aggregate).
+The search index follows the DELETE through its triggers and the feeds that
+showed the tasks are invalidated. The calendar reads both tables, so its
+weeks do not change.
+
+Reads that cover the whole history of tasks (the calendar, the export and
+GET /tasks/history/) go through task_history(), one UNION ALL of the two
+tables: a task is in exactly one of them.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .feed import touch_task_feeds
+from .matching import unindex_tasks
+from .models import Task, TaskArchive
+
+# Ids per batch: one parameter each in the INSERT and the DELETE.
+ARCHIVE_BATCH_SIZE = 500
+
+
+def task_history(select, *fields):
+    """
+    values_list(*fields) of the tasks ``select`` picks from both Task and
+    TaskArchive, as one query; ``select`` is called with each manager and
+    returns a queryset of it. Order and slice the result as a whole.
+    """
+    return select(Task.objects).values_list(*fields).union(
+        select(TaskArchive.objects).values_list(*fields), all=True)
+
+
+def archive_cutoff(days=None, today=None):
+    """Tasks dated before this day are old enough to archive."""
+    if days is None:
+        days = settings.TASK_ARCHIVE_DAYS
+    return (today or timezone.localdate()) - timedelta(days=days)
+
+
+def archivable_tasks(cutoff):
+    # Served in (date, id) order by the (state, date) index.
+    return Task.objects.filter(state='D', date__lt=cutoff).order_by(
+        'date', 'id')
+
+
+def archive_batch(rows, archived_at):
+    """
+    Move the tasks of ``rows`` (id, charity_id, assigned_benefactor_id)
+    that are still done to TaskArchive; returns how many moved.
+    """
+    columns = ', '.join(
+        connection.ops.quote_name(field.column)
+        for field in TaskArchive._meta.concrete_fields
+        if field.name != 'archived_at')
+    task_table = connection.ops.quote_name(Task._meta.db_table)
+    archive_table = connection.ops.quote_name(TaskArchive._meta.db_table)
+    ids = [pk for pk, _, _ in rows]
+    placeholders = ', '.join(['%s'] * len(ids))
+    with transaction.atomic():
+        # Writes first: SQLite cannot upgrade a read transaction to a write
+        # one while another writer waits.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {archive_table} ({columns}, archived_at) '
+                f'SELECT {columns}, %s FROM {task_table} '
+                f"WHERE id IN ({placeholders}) AND state = 'D'",
+                [archived_at, *ids])
+            moved = cursor.rowcount
+            if moved != len(ids):
+                ids = list(TaskArchive.objects.filter(
+                    pk__in=ids, archived_at=archived_at,
+                ).values_list('pk', flat=True))
+                placeholders = ', '.join(['%s'] * len(ids))
+            if not ids:
+                return 0
+            cursor.execute(
+                f'DELETE FROM {task_table} WHERE id IN ({placeholders})', ids)
+        unindex_tasks(ids)
+        kept = set(ids)
+        touch_task_feeds(*{
+            (charity_id, benefactor_id, 'D')
+            for pk, charity_id, benefactor_id in rows if pk in kept})
+    return moved
+
+
+def archive_tasks(days=None, batch_size=ARCHIVE_BATCH_SIZE, today=None,
+                  limit=None):
+    """
+    Move done tasks dated more than ``days`` days before ``today`` (default
+    settings.TASK_ARCHIVE_DAYS and the current date) to TaskArchive, at
+    most ``limit`` of them, ``batch_size`` per transaction. Undated tasks
+    stay. Returns the number of tasks moved.
+    """
+    tasks = archivable_tasks(archive_cutoff(days, today))
+    archived_at = timezone.now()
+    total = 0
+    while limit is None or total < limit:
+        size = batch_size if limit is None else min(batch_size, limit - total)
+        # Read before the batch transaction; moved tasks leave the index,
+        # so every batch starts from the oldest that is left.
+        rows = list(tasks.values_list(
+            'id', 'charity_id', 'assigned_benefactor_id')[:size])
+        if not rows:
+            break
+        moved = archive_batch(rows, archived_at)
+        if not moved:
+            break
+        total += moved
+    return total
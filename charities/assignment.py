@@ -0,0 +1,311 @@
+"""
+Batch assignment of pending tasks to benefactors.
+
+assign_tasks() gives as many pending tasks as possible a benefactor who
+may take them (the Task gender and age limits, as in charities.matching)
+and has time left, preferring experienced benefactors. A benefactor's
+capacity is free_time_per_week // settings.TASK_ASSIGNMENT_HOURS, less
+the tasks already waiting for or assigned to them.
+
+Tasks and benefactors are loaded into NumPy arrays and grouped into
+classes that are interchangeable for the problem: tasks by their limits,
+benefactors by gender, age segment (ages between two consecutive task limit
+boundaries behave the same) and experience. The class graph is solved as a
+min-cost flow LP with SciPy's HiGHS interior point method; its constraint
+matrix is a network matrix, so the basic solution HiGHS crosses over to is
+integral. (Dual simplex finds the same optimum, 30-40 times slower.) The flow is then spread
+back over individual tasks, earliest first, and benefactors, one task per
+benefactor and round so the load is balanced.
+
+The assignments are written in one batch of UPDATEs guarded by the
+pending state, together with what Task.transition() keeps up to date: outbox
+events (P -> W -> A), task stats, the eligibility index, the feed versions
+and the calendar weeks.
+"""
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from scipy import sparse
+from scipy.optimize import linprog
+
+from .feed import touch_task_feeds
+from .matching import unindex_tasks
+from .models import Benefactor, Task, TaskEvent
+from .schedule import touch_task_weeks
+from .stats import StatsDelta
+
+GENDER_CODES = {None: 0, 'M': 1, 'F': 2}
+NO_AGE = -1
+# Cost of a task-benefactor unit is -(ASSIGNED_WEIGHT + experience): every
+# extra assigned task outweighs any difference in experience.
+ASSIGNED_WEIGHT = 10
+
+
+class AssignmentConflict(Exception):
+    """Tasks left the pending state while the assignment was solved."""
+
+
+@dataclass
+class AssignmentReport:
+    tasks: int
+    benefactors: int
+    capacity: int
+    assigned: int
+    mean_experience: float
+    load_seconds: float
+    solve_seconds: float
+    write_seconds: float
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+def gender_codes(values):
+    return np.array([GENDER_CODES[value or None] for value in values],
+                    dtype=np.int8)
+
+
+def load_tasks(queryset, today):
+    """Upcoming or undated pending tasks of ``queryset``, earliest first."""
+    rows = list(queryset.filter(state='P').exclude(date__lt=today).order_by(
+        F('date').asc(nulls_last=True), 'id',
+    ).values_list('id', 'charity_id', 'date', 'gender_limit',
+                  'age_limit_from', 'age_limit_to'))
+    ids, charities, dates, genders, ages_from, ages_to = (
+        zip(*rows) if rows else ((),) * 6)
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'charity': np.array(charities, dtype=np.int64),
+        'date': list(dates),
+        'gender': gender_codes(genders),
+        # A missing bound is open: 0 and the largest age.
+        'age_from': np.array([value or 0 for value in ages_from],
+                             dtype=np.int64),
+        'age_to': np.array(
+            [np.iinfo(np.int32).max if value is None else value
+             for value in ages_to], dtype=np.int64),
+        'age_limited': np.array(
+            [low is not None or high is not None
+             for low, high in zip(ages_from, ages_to)], dtype=bool),
+    }
+
+
+def load_benefactors(hours):
+    """Benefactors with capacity left and their capacity, largest first."""
+    rows = list(Benefactor.objects.filter(
+        free_time_per_week__gte=hours,
+    ).values_list(
+        'id', 'user__gender', 'user__age', 'experience', 'free_time_per_week',
+        'task_stats__waiting', 'task_stats__assigned'))
+    ids, genders, ages, experience, free_time, waiting, assigned = (
+        zip(*rows) if rows else ((),) * 7)
+    held = np.array([(w or 0) + (a or 0) for w, a in zip(waiting, assigned)],
+                    dtype=np.int64)
+    capacity = np.array(free_time, dtype=np.int64) // hours - held
+    keep = capacity > 0
+    order = np.argsort(-capacity[keep], kind='stable')
+    return {
+        'id': np.array(ids, dtype=np.int64)[keep][order],
+        'gender': gender_codes(genders)[keep][order],
+        'age': np.array([NO_AGE if age is None else age for age in ages],
+                        dtype=np.int64)[keep][order],
+        'experience': np.array(experience, dtype=np.int64)[keep][order],
+        'capacity': capacity[keep][order],
+    }
+
+
+def classes(*columns):
+    """Unique rows of ``columns``, the class of every item and class sizes."""
+    stacked = np.stack(columns, axis=1) if len(columns[0]) else np.empty(
+        (0, len(columns)), dtype=np.int64)
+    return np.unique(stacked, axis=0, return_inverse=True, return_counts=True)
+
+
+def solve(tasks, benefactors):
+    """
+    Optimal (task index, benefactor index) pairs for the loaded arrays.
+    """
+    if not len(tasks['id']) or not len(benefactors['id']):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # Ages between two consecutive limit boundaries are interchangeable.
+    limited = tasks['age_limited']
+    boundaries = np.unique(np.concatenate(
+        [tasks['age_from'][limited], tasks['age_to'][limited] + 1]))
+    segment = np.where(benefactors['age'] == NO_AGE, -1, np.searchsorted(
+        boundaries, benefactors['age'], side='right'))
+
+    task_classes, task_class, task_counts = classes(
+        tasks['gender'], tasks['age_from'], tasks['age_to'],
+        limited.astype(np.int64))
+    node_classes, node_of, _ = classes(benefactors['gender'], segment)
+    slot_classes, slot_of, _ = classes(node_of, benefactors['experience'])
+    slot_capacity = np.bincount(slot_of, weights=benefactors['capacity'],
+                                minlength=len(slot_classes))
+    # Any age of a segment decides for the whole segment.
+    node_age = np.full(len(node_classes), NO_AGE)
+    np.maximum.at(node_age, node_of, benefactors['age'])
+
+    gender, age_from, age_to, has_limit = task_classes.T
+    compatible = (
+        ((gender[:, None] == 0)
+         | (gender[:, None] == node_classes[None, :, 0]))
+        & ((has_limit[:, None] == 0)
+           | ((node_age[None, :] != NO_AGE)
+              & (age_from[:, None] <= node_age[None, :])
+              & (node_age[None, :] <= age_to[:, None]))))
+    edge_task, edge_node = np.nonzero(compatible)
+    edges, slots = len(edge_task), len(slot_classes)
+    if not edges:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # Variables: flow on every (task class, node) edge, then on every
+    # (node, experience) slot. Tasks of a class are used at most once,
+    # what enters a node leaves it through its slots, and slots are bounded
+    # by the capacity of their benefactors.
+    slot_node = slot_classes[:, 0]
+    cost = np.concatenate([
+        np.zeros(edges), -(ASSIGNED_WEIGHT + slot_classes[:, 1])])
+    a_ub = sparse.csr_matrix(
+        (np.ones(edges), (edge_task, np.arange(edges))),
+        shape=(len(task_classes), edges + slots))
+    a_eq = sparse.csr_matrix(
+        (np.concatenate([np.ones(edges), -np.ones(slots)]),
+         (np.concatenate([edge_node, slot_node]),
+          np.arange(edges + slots))),
+        shape=(len(node_classes), edges + slots))
+    bounds = np.stack([
+        np.zeros(edges + slots),
+        np.concatenate([np.full(edges, np.inf), slot_capacity])], axis=1)
+    result = linprog(cost, A_ub=a_ub, b_ub=task_counts, A_eq=a_eq,
+                     b_eq=np.zeros(len(node_classes)), bounds=bounds,
+                     method='highs-ipm')
+    if result.status != 0:
+        raise RuntimeError(f'Assignment solver failed: {result.message}')
+    flow = np.rint(result.x).astype(np.int64)
+    if np.abs(result.x - flow).max() > 1e-6:
+        raise RuntimeError('Assignment solver returned a fractional flow.')
+    edge_flow, slot_flow = flow[:edges], flow[edges:]
+
+    # Tasks of each class, earliest first, handed out edge by edge.
+    task_order = np.argsort(task_class, kind='stable')
+    class_start = np.concatenate([[0], np.cumsum(task_counts)])
+    taken = np.zeros(len(task_classes), dtype=np.int64)
+    node_tasks = [[] for _ in node_classes]
+    for edge in np.nonzero(edge_flow)[0]:
+        task_class_index, amount = edge_task[edge], edge_flow[edge]
+        start = class_start[task_class_index] + taken[task_class_index]
+        node_tasks[edge_node[edge]].append(task_order[start:start + amount])
+        taken[task_class_index] += amount
+
+    # Benefactor slots of each (node, experience): round r holds every
+    # benefactor with more than r tasks of capacity, largest first.
+    repeated = np.repeat(np.arange(len(benefactors['id'])),
+                         benefactors['capacity'])
+    rounds = np.arange(len(repeated)) - np.repeat(
+        np.cumsum(benefactors['capacity']) - benefactors['capacity'],
+        benefactors['capacity'])
+    slot_order = repeated[np.lexsort((rounds, slot_of[repeated]))]
+    slot_start = np.concatenate([[0], np.cumsum(
+        np.bincount(slot_of[repeated], minlength=slots))])
+
+    task_indexes = [np.empty(0, dtype=np.int64)]
+    benefactor_indexes = [np.empty(0, dtype=np.int64)]
+    for node in range(len(node_classes)):
+        if not node_tasks[node]:
+            continue
+        assigned = np.concatenate(node_tasks[node])
+        offset = 0
+        for slot in np.nonzero((slot_node == node) & (slot_flow > 0))[0]:
+            amount = slot_flow[slot]
+            chosen = slot_order[slot_start[slot]:slot_start[slot] + amount]
+            task_indexes.append(assigned[offset:offset + amount])
+            benefactor_indexes.append(chosen)
+            offset += amount
+    return np.concatenate(task_indexes), np.concatenate(benefactor_indexes)
+
+
+def update_pending_tasks(task_ids, benefactor_ids):
+    """
+    Assign every task that is still pending; returns how many were. One
+    parametrized UPDATE run for all rows: bulk_update()'s CASE expressions
+    take seconds to build for 10k tasks.
+    """
+    table = connection.ops.quote_name(Task._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET state = 'A', assigned_benefactor_id = %s "
+            f"WHERE id = %s AND state = 'P'",
+            list(zip(benefactor_ids, task_ids)))
+        return cursor.rowcount
+
+
+def write_assignments(task_ids, benefactor_ids, task_rows):
+    """Assign and record the solved pairs; all or nothing."""
+    events, stats = [], StatsDelta()
+    for task_id, benefactor, (charity_id, day) in zip(
+            task_ids, benefactor_ids, task_rows):
+        events += [
+            TaskEvent(task_id=task_id, charity_id=charity_id,
+                      benefactor_id=benefactor, from_state='P',
+                      to_state='W'),
+            TaskEvent(task_id=task_id, charity_id=charity_id,
+                      benefactor_id=benefactor, from_state='W',
+                      to_state='A'),
+        ]
+        stats.remove(charity_id, None, 'P')
+        stats.add(charity_id, benefactor, 'A')
+    with transaction.atomic():
+        updated = update_pending_tasks(task_ids, benefactor_ids)
+        if updated != len(task_ids):
+            raise AssignmentConflict(
+                f'{len(task_ids) - updated} tasks are no longer pending.')
+        TaskEvent.objects.bulk_create(events)
+        stats.apply()
+        unindex_tasks(task_ids)
+        touch_task_feeds(*{
+            placement
+            for (charity_id, _), benefactor in zip(task_rows, benefactor_ids)
+            for placement in ((charity_id, None, 'P'),
+                              (charity_id, benefactor, 'A'))})
+        touch_task_weeks(*{day for _, day in task_rows})
+
+
+def assign_tasks(tasks=None, hours=None, dry_run=False, today=None):
+    """
+    Assign the pending tasks of ``tasks`` (all tasks by default) in one
+    batch and return an AssignmentReport. Raises AssignmentConflict, and
+    writes nothing, if some of them stopped being pending meanwhile.
+    """
+    tasks = Task.objects.all() if tasks is None else tasks
+    hours = hours or settings.TASK_ASSIGNMENT_HOURS
+    started = time.perf_counter()
+    loaded = load_tasks(tasks, today or timezone.localdate())
+    benefactors = load_benefactors(hours)
+    solving = time.perf_counter()
+    task_indexes, benefactor_indexes = solve(loaded, benefactors)
+    writing = time.perf_counter()
+    task_ids = loaded['id'][task_indexes].tolist()
+    benefactor_ids = benefactors['id'][benefactor_indexes].tolist()
+    if task_ids and not dry_run:
+        task_rows = list(zip(
+            loaded['charity'][task_indexes].tolist(),
+            [loaded['date'][index] for index in task_indexes.tolist()]))
+        write_assignments(task_ids, benefactor_ids, task_rows)
+    finished = time.perf_counter()
+    experience = benefactors['experience'][benefactor_indexes]
+    return AssignmentReport(
+        tasks=len(loaded['id']),
+        benefactors=len(benefactors['id']),
+        capacity=int(benefactors['capacity'].sum()),
+        assigned=len(task_ids),
+        mean_experience=float(experience.mean()) if len(experience) else 0.0,
+        load_seconds=solving - started,
+        solve_seconds=writing - solving,
+        write_seconds=finished - writing,
+    )
@@ -0,0 +1,85 @@
+"""
+Async counterparts of the read-heavy task endpoints, used when the project
+is served over ASGI (settings.ASYNC_READ_VIEWS). They answer exactly like
+their DRF views but wait on the database without holding a worker thread.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from accounts.authentication import CachedTokenAuthentication, user_roles
+from charity.db import primary_reads
+
+from .feed import (
+    FEED_CACHE_TIMEOUT, afeed_versions, etag_matches, feed_cache, feed_etag,
+    feed_page_key
+)
+from .pagination import TaskCursorPagination
+from .serializers import TaskSerializer
+from .views import requested_task_fields, set_feed_headers, task_feed_branches
+
+
+def read_async(async_get, sync_view):
+    """
+    Serve GET with the coroutine ``async_get`` and every other method with
+    the regular ``sync_view``.
+    """
+    sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        handler = async_get if request.method == 'GET' else sync_view
+        return await handler(request, *args, **kwargs)
+
+    return csrf_exempt(view)
+
+
+def error_response(exc):
+    response = JsonResponse(
+        exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail},
+        status=exc.status_code)
+    if exc.status_code == 401:
+        response.headers['WWW-Authenticate'] = (
+            CachedTokenAuthentication.keyword)
+    return response
+
+
+async def authenticate(request):
+    authenticator = CachedTokenAuthentication()
+    result = await sync_to_async(authenticator.authenticate)(request)
+    if result is None:
+        raise exceptions.NotAuthenticated()
+    return result[0]
+
+
+async def task_feed(request):
+    """Async GET /tasks/."""
+    request = Request(request)
+    try:
+        user = await authenticate(request)
+        roles = user_roles(user)
+        key = feed_page_key(request.build_absolute_uri(), roles,
+                            await afeed_versions(roles))
+        etag = feed_etag(key)
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+            set_feed_headers(response, etag)
+            return response
+        cache = feed_cache()
+        data = await cache.aget(key)
+        if data is None:
+            fields = requested_task_fields(request.query_params)
+            paginator = TaskCursorPagination()
+            # Cached under the current versions: no lagging replica.
+            with primary_reads():
+                page = await paginator.apaginate_queryset(
+                    task_feed_branches(roles, fields), request)
+            data = paginator.get_paginated_response(
+                TaskSerializer(page, many=True, fields=fields).data).data
+            await cache.aset(key, data, FEED_CACHE_TIMEOUT)
+    except exceptions.APIException as exc:
+        return error_response(exc)
+    response = JsonResponse(data)
+    set_feed_headers(response, etag)
+    return response
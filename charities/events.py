@@ -0,0 +1,169 @@
+"""
+Delivery of the TaskEvent outbox.
+
+Task.transition() only inserts TaskEvent rows next to the state change, so
+request handlers commit and return. The process_task_events worker calls
+drain() in a loop, which takes three steps so that no transaction stays
+open while handlers run (on SQLite a write transaction that started before
+other writers committed could not commit any more):
+
+1. claim a batch of due events in id order: one short transaction whose
+   first statement is the UPDATE that stamps them with the worker's claim;
+2. hand them to every handler in settings.TASK_EVENT_HANDLERS on a thread
+   pool, outside any transaction;
+3. in a new transaction, delete the delivered events and record the error
+   on the ones that failed, which are retried after an exponential backoff
+   (RETRY_DELAY seconds, doubled per attempt) until they reach
+   MAX_ATTEMPTS. The rest of the batch is released.
+
+A claim older than CLAIM_TIMEOUT seconds is taken to belong to a worker
+that died, and its events become due again.
+
+Handlers are called with one event at a time. The events of one task are
+delivered in order by the same thread, and not while an earlier event of
+the task is claimed or waits for a retry; different tasks run
+concurrently, so handlers must be thread-safe.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TaskEvent
+
+MAX_ATTEMPTS = 5
+# Seconds before the first retry of a failed event; doubled per attempt.
+RETRY_DELAY = 5
+CLAIM_TIMEOUT = 5 * 60
+
+logger = logging.getLogger(__name__)
+
+
+def log_event(event):
+    logger.info('Task %s moved from %s to %s (charity %s, benefactor %s)',
+                event.task_id, event.from_state, event.to_state,
+                event.charity_id, event.benefactor_id)
+
+
+@lru_cache(maxsize=None)
+def event_handlers():
+    return [import_string(path)
+            for path in getattr(settings, 'TASK_EVENT_HANDLERS', ())]
+
+
+def deliver(events, handlers):
+    """
+    Run ``handlers`` over the events of one task in order. Returns the
+    delivered event ids and the (event, error) of the first failure; the
+    events after it wait for the next round so the order holds.
+    """
+    delivered = []
+    for event in events:
+        try:
+            for handler in handlers:
+                handler(event)
+        except Exception as exc:
+            logger.exception('Handling %s failed', event)
+            return delivered, (event, exc)
+        delivered.append(event.pk)
+    return delivered, None
+
+
+def deliver_in_thread(events, handlers):
+    try:
+        return deliver(events, handlers)
+    finally:
+        # Handlers may have opened a connection in this pool thread.
+        connection.close()
+
+
+def waiting(now):
+    """Events a worker is delivering or that wait for a retry."""
+    return (Q(claimed_at__gte=now - timedelta(seconds=CLAIM_TIMEOUT))
+            | Q(next_attempt_at__gt=now))
+
+
+def pending_events(batch_size, now):
+    """
+    Events due for delivery, in id order: neither given up nor waiting,
+    and without an earlier event of their task that waits.
+    """
+    blocked = TaskEvent.objects.filter(
+        waiting(now), task_id=OuterRef('task_id'), id__lt=OuterRef('id'),
+        attempts__lt=MAX_ATTEMPTS)
+    return TaskEvent.objects.filter(
+        ~waiting(now), ~Exists(blocked), attempts__lt=MAX_ATTEMPTS,
+    ).order_by('id')[:batch_size]
+
+
+def claim(batch_size, now):
+    """Claim a batch of due events for this call; returns them."""
+    token = uuid.uuid4()
+    with transaction.atomic():
+        # The UPDATE comes first, so SQLite takes the write lock at once.
+        # The outer filter is checked again on the rows themselves, so
+        # concurrent workers claim disjoint batches.
+        TaskEvent.objects.filter(
+            ~waiting(now),
+            pk__in=pending_events(batch_size, now).values('pk'),
+        ).update(claimed_by=token, claimed_at=now)
+    return list(TaskEvent.objects.filter(claimed_by=token).order_by('id'))
+
+
+def retry_at(event, now):
+    return now + timedelta(seconds=RETRY_DELAY * 2 ** event.attempts)
+
+
+def drain(batch_size=500, pool=None, handlers=None):
+    """
+    Deliver one batch of pending events. Returns the number of events read,
+    so the caller knows whether the outbox is empty.
+    """
+    handlers = event_handlers() if handlers is None else handlers
+    events = claim(batch_size, timezone.now())
+    if not events:
+        return 0
+    by_task = [list(group) for _, group in groupby(
+        sorted(events, key=attrgetter('task_id', 'id')),
+        key=attrgetter('task_id'))]
+    if pool is None:
+        results = [deliver(group, handlers) for group in by_task]
+    else:
+        results = list(pool.map(deliver_in_thread, by_task,
+                                [handlers] * len(by_task)))
+
+    now = timezone.now()
+    delivered = [pk for ids, _ in results for pk in ids]
+    with transaction.atomic():
+        TaskEvent.objects.filter(pk__in=delivered).delete()
+        for _, failure in results:
+            if failure is not None:
+                event, exc = failure
+                TaskEvent.objects.filter(pk=event.pk).update(
+                    attempts=F('attempts') + 1, last_error=repr(exc),
+                    next_attempt_at=retry_at(event, now),
+                    claimed_by=None, claimed_at=None)
+        # Events queued behind a failure in their task.
+        TaskEvent.objects.filter(claimed_by=events[0].claimed_by).update(
+            claimed_by=None, claimed_at=None)
+    return len(events)
+
+
+def drain_all(batch_size=500, workers=8, handlers=None):
+    """Drain until a batch comes back empty. Returns the events read."""
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            count = drain(batch_size, pool, handlers)
+            if not count:
+                return total
+            total += count
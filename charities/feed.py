@@ -0,0 +1,115 @@
+"""
+Versioned caching of the task feed (GET /tasks/).
+
+A user's feed is made of three scopes: every pending task, the tasks of the
+user's charity and the tasks assigned to the user's benefactor profile.
+Each scope has a version counter in the cache that is bumped after any
+transaction that changes a task in it commits. The ETag of a feed page is
+derived from the user's scope versions and the page URL, so a matching
+If-None-Match is answered from the cache alone, and full pages are cached
+under the same key until they are evicted or time out. Pages are read from
+the primary (charity.db.primary_reads): a lagging replica would cache the
+rows from before a write under the version its commit bumped.
+
+A version missing from the cache (cold start, eviction) is recreated from
+the clock, so it never matches a key issued before.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import quote_etag
+
+FEED_CACHE_TIMEOUT = 5 * 60
+PENDING_SCOPE_KEY = 'charities:feed:pending'
+
+
+def feed_cache():
+    return caches[getattr(settings, 'TASK_FEED_CACHE', 'default')]
+
+
+def charity_scope_key(charity_id):
+    return f'charities:feed:charity:{charity_id}'
+
+
+def benefactor_scope_key(benefactor_id):
+    return f'charities:feed:benefactor:{benefactor_id}'
+
+
+def scope_keys(roles):
+    keys = [PENDING_SCOPE_KEY]
+    if roles.charity_id is not None:
+        keys.append(charity_scope_key(roles.charity_id))
+    if roles.benefactor_id is not None:
+        keys.append(benefactor_scope_key(roles.benefactor_id))
+    return keys
+
+
+def new_versions(keys, found):
+    return {key: time.time_ns() for key in keys if key not in found}
+
+
+def feed_versions(roles):
+    cache = feed_cache()
+    keys = scope_keys(roles)
+    versions = cache.get_many(keys)
+    missing = new_versions(keys, versions)
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def afeed_versions(roles):
+    cache = feed_cache()
+    keys = scope_keys(roles)
+    versions = await cache.aget_many(keys)
+    missing = new_versions(keys, versions)
+    if missing:
+        await cache.aset_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def feed_page_key(url, roles, versions):
+    scope = f'{roles.charity_id}:{roles.benefactor_id}:{versions}:{url}'
+    digest = hashlib.md5(scope.encode()).hexdigest()
+    return f'charities:feed:page:{digest}'
+
+
+def feed_etag(page_key):
+    return quote_etag(page_key.rsplit(':', 1)[1])
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    return etag in (tag.strip() for tag in if_none_match.split(',')) or (
+        if_none_match.strip() == '*')
+
+
+def touch_task_feeds(*placements):
+    """
+    Invalidate the feeds that show tasks at ``placements``, which are
+    (charity_id, benefactor_id, state) tuples a task left or entered, once
+    the current transaction commits.
+    """
+    keys = set()
+    for charity_id, benefactor_id, state in placements:
+        keys.add(charity_scope_key(charity_id))
+        if benefactor_id is not None:
+            keys.add(benefactor_scope_key(benefactor_id))
+        if state == 'P':
+            keys.add(PENDING_SCOPE_KEY)
+    if keys:
+        transaction.on_commit(lambda: bump_versions(keys))
+
+
+def bump_versions(keys):
+    cache = feed_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
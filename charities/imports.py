@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework.exceptions import ParseError
+
+from about_us.roster import touch_roster
+from accounts.models import User
+
+from .models import Benefactor, Charity
+from .validators import RegNumberValidator
+
+
+def csv_rows(lines):
+    for row in csv.DictReader(lines):
+        # Empty cells mean "not given", so optional columns fall back to
+        # their defaults instead of failing type conversion.
+        yield {key: value for key, value in row.items() if value != ''}
+
+
+def ndjson_rows(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ParseError(f'Line {number} is not valid JSON.')
+
+
+IMPORT_FORMATS = {
+    '.csv': csv_rows,
+    '.ndjson': ndjson_rows,
+    '.jsonl': ndjson_rows,
+}
+
+
+def read_rows(uploaded_file):
+    """Lazily yield one dict per record of an uploaded CSV/NDJSON file."""
+    name = uploaded_file.name.lower()
+    for extension, reader in IMPORT_FORMATS.items():
+        if name.endswith(extension):
+            lines = io.TextIOWrapper(uploaded_file, encoding='utf-8',
+                                     newline='')
+            return reader(lines)
+    raise ParseError(f'Supported files: {", ".join(IMPORT_FORMATS)}')
+
+
+# Profile onboarding. Columns other than these are ignored; imported users
+# get an unusable password and set theirs through a password reset.
+USER_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'phone',
+                'address', 'gender', 'age', 'description')
+PROFILE_MODELS = {
+    'benefactor': (Benefactor, ('experience', 'free_time_per_week')),
+    'charity': (Charity, ('name', 'reg_number')),
+}
+EXTRA_VALIDATORS = {'reg_number': [RegNumberValidator()]}
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.errors = []
+
+    def error(self, row, errors):
+        self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {'rows': self.rows, 'created': self.created,
+                'errors': self.errors}
+
+
+def clean_columns(row, model, columns):
+    """Convert and validate ``columns`` of ``row`` with the model's fields."""
+    values, errors = {}, {}
+    for name in columns:
+        field = model._meta.get_field(name)
+        value = row.get(name)
+        if value is None:
+            if not field.has_default() and not field.blank:
+                errors[name] = ['This field is required.']
+            continue
+        try:
+            values[name] = field.clean(value, None)
+            for validator in EXTRA_VALIDATORS.get(name, ()):
+                validator(values[name])
+        except DjangoValidationError as exc:
+            errors[name] = exc.messages
+    return values, errors
+
+
+def import_profiles(rows, kind, batch_size=5000, progress=None):
+    """
+    Create a user and a ``kind`` ('benefactor' or 'charity') profile for
+    every valid row, with one bulk_create per model and batch. Usernames
+    taken in the database or earlier in the file are looked up once per
+    batch. Invalid rows are reported by their 0-based index and skipped;
+    every batch commits on its own. ``progress`` is called with the report
+    after each batch.
+    """
+    model, columns = PROFILE_MODELS[kind]
+    report, seen = ImportReport(), set()
+    for batch in batched(enumerate(rows), batch_size):
+        valid = []
+        for index, row in batch:
+            if not isinstance(row, dict):
+                report.error(index,
+                             {'non_field_errors': ['Expected an object.']})
+                continue
+            user, errors = clean_columns(row, User, USER_COLUMNS)
+            profile, profile_errors = clean_columns(row, model, columns)
+            errors.update(profile_errors)
+            if errors:
+                report.error(index, errors)
+            else:
+                valid.append((index, user, profile))
+        report.rows += len(batch)
+
+        seen.update(User.objects.filter(
+            username__in=[user['username'] for _, user, _ in valid]
+        ).values_list('username', flat=True))
+        users, profiles = [], []
+        for index, user, profile in valid:
+            if user['username'] in seen:
+                report.error(index, {'username': ['This username is taken.']})
+                continue
+            seen.add(user['username'])
+            users.append(User(password=make_password(None), **user))
+            profiles.append(profile)
+
+        if users:
+            with transaction.atomic():
+                users = User.objects.bulk_create(users)
+                model.objects.bulk_create(
+                    model(user=user, **profile)
+                    for user, profile in zip(users, profiles))
+                # bulk_create sends no post_save for the about-us roster.
+                transaction.on_commit(touch_roster)
+        report.created += len(users)
+        if progress:
+            progress(report)
+    return report
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,53 @@
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from django.db import transaction
+
+from charities import seeding
+from charities.seeding import TASK_WORDS
+
+STATES = ('P', 'W', 'A', 'D')
+SEED_START = date(2020, 1, 1)
+
+
+@contextmanager
+def rolled_back():
+    """Run a benchmark inside a transaction that is never committed."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(func, repeat=5):
+    """Return the median wall time of ``func`` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def seed_tasks(tasks, charities=100, benefactors=1000, batch_size=5000,
+               seed=0, states=STATES, vocabulary=TASK_WORDS, days=3 * 365,
+               state_weights=None):
+    """
+    Seed users, profiles and ``tasks`` tasks spread evenly over the
+    charities and ``states`` (or by ``state_weights``), with words from
+    ``vocabulary``, dated over ``days`` days from SEED_START.
+    """
+    return seeding.seed(
+        charities, benefactors, tasks,
+        state_weights=state_weights or dict.fromkeys(states, 1),
+        charity_skew=0,
+        gender_limit_ratio=0.4, undated_ratio=0, days=days, start=SEED_START,
+        vocabulary=vocabulary, prefix='bench_user', batch_size=batch_size,
+        seed=seed)
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from charities.archive import ARCHIVE_BATCH_SIZE, archive_tasks
+
+
+class Command(BaseCommand):
+    help = ('Move done tasks dated more than --days days ago (default '
+            'settings.TASK_ARCHIVE_DAYS) from Task to TaskArchive in '
+            'batches. They keep counting in the task stats and stay in the '
+            'calendar, the export and the task history.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int)
+        parser.add_argument('--batch-size', type=int,
+                            default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--limit', type=int,
+                            help='Move at most this many tasks.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        moved = archive_tasks(days=options['days'],
+                              batch_size=options['batch_size'],
+                              limit=options['limit'])
+        self.stdout.write(
+            f'Archived {moved} done tasks in '
+            f'{time.perf_counter() - started:.2f} s.')
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from charities.assignment import AssignmentConflict, assign_tasks
+from charities.models import Task
+
+
+def describe(report):
+    """Human-readable lines of an AssignmentReport."""
+    share = report.assigned / report.tasks if report.tasks else 0
+    return [
+        f'{report.assigned} of {report.tasks} pending tasks assigned '
+        f'({share:.1%}) to benefactors with {report.capacity} free slots '
+        f'({report.benefactors} benefactors)',
+        f'mean experience of the assignees: {report.mean_experience:.2f}',
+        f'load {report.load_seconds:.2f} s, solve '
+        f'{report.solve_seconds:.2f} s, write {report.write_seconds:.2f} s',
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Assign pending tasks to benefactors in one batch, respecting '
+            'their free time and the task gender and age limits and '
+            'preferring experienced benefactors.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--charity', type=int, action='append',
+                            help='Only tasks of this charity id; repeatable.')
+        parser.add_argument('--hours', type=int,
+                            help='Hours a task takes; defaults to '
+                                 'settings.TASK_ASSIGNMENT_HOURS.')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.all()
+        if options['charity']:
+            tasks = tasks.filter(charity_id__in=options['charity'])
+        try:
+            report = assign_tasks(tasks, hours=options['hours'],
+                                  dry_run=options['dry_run'])
+        except AssignmentConflict as exc:
+            raise CommandError(f'{exc} Nothing was assigned; run again.')
+        for line in describe(report):
+            self.stdout.write(line)
@@ -0,0 +1,279 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from charities.feed import feed_cache
+from charities.matching import rebuild_index
+from charities.models import Task
+from charities.seeding import TASK_WORDS, seed
+from charities.stats import rebuild as rebuild_stats
+
+from ._bench import percentile, rolled_back
+
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = ('Seed a dataset inside a transaction that is rolled back, drive '
+            'every API endpoint through the test client and report p50/p95/'
+            'p99 latency and query counts per endpoint as JSON. Pass an '
+            'earlier report as --baseline to print the differences. '
+            'on_commit hooks never run inside the transaction, so feed '
+            'caching is measured by explicit cold, warm and 304 scenarios.')
+
+    scenarios = (
+        'login', 'register', 'logout',
+        'tasks_feed_uncached', 'tasks_feed_cached', 'tasks_feed_not_modified',
+        'tasks_create', 'tasks_bulk_create',
+        'task_request', 'task_response_accept', 'task_response_reject',
+        'task_done',
+        'tasks_matches', 'tasks_search', 'tasks_stats', 'tasks_export',
+        'about_us',
+    )
+    # Scenarios dominated by password hashing run --slow-requests times.
+    slow_scenarios = ('login', 'register')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--charities', type=int, default=20)
+        parser.add_argument('--benefactors', type=int, default=200)
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--slow-requests', type=int, default=10)
+        parser.add_argument('--only', nargs='+', choices=self.scenarios,
+                            help='Run only these scenarios.')
+        parser.add_argument('--output', help='Write the JSON report here.')
+        parser.add_argument('--baseline',
+                            help='An earlier JSON report to compare with.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+        self.options = options
+
+        with override_settings(ALLOWED_HOSTS=['*']), rolled_back():
+            started = time.perf_counter()
+            self.prepare()
+            self.stderr.write(
+                f'Seeded {options["tasks"]} tasks in '
+                f'{time.perf_counter() - started:.1f} s')
+            endpoints = {}
+            for name in options['only'] or self.scenarios:
+                count = options['requests']
+                if name in self.slow_scenarios:
+                    count = options['slow_requests']
+                endpoints[name] = self.run(getattr(self, name)(count))
+                self.stderr.write(f'{name}: {endpoints[name]}')
+
+        report = {'meta': self.meta(), 'endpoints': endpoints}
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if baseline:
+            self.compare(baseline, report)
+
+    def prepare(self):
+        options = self.options
+        users, charities, benefactors = seed(
+            options['charities'], options['benefactors'], options['tasks'],
+            password=PASSWORD, prefix='bench_api')
+        rebuild_index()
+        rebuild_stats()
+        self.benefactors = benefactors
+        # Charities are ranked by size: the first owns the most tasks.
+        self.owner = self.client_for(charities[0].user)
+        self.charity = charities[0]
+        self.small_owner = self.client_for(charities[-1].user)
+        self.benefactor = self.client_for(benefactors[0].user)
+        self.pending = iter(Task.objects.filter(
+            charity=self.charity, state='P').values_list('pk', flat=True))
+        self.accepted = []
+
+    def client_for(self, user):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def run(self, requests):
+        latencies, queries, statuses = [], [], Counter()
+        for request in requests:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            statuses[str(response.status_code)] += 1
+        if not latencies:
+            return {'requests': 0}
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'status': dict(statuses),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'queries_p50': percentile(sorted(queries), 50),
+            'queries_max': max(queries),
+        }
+
+    def next_pending(self, count):
+        """Up to ``count`` pending task ids of the largest charity."""
+        return [pk for pk, _ in zip(self.pending, range(count))]
+
+    # Scenarios: each yields one callable per request. Work done between
+    # the yields (setup) is not timed.
+
+    def login(self, count):
+        client = APIClient()
+        for benefactor in self.benefactors[:count]:
+            yield lambda username=benefactor.user.username: client.post(
+                '/accounts/login/',
+                {'username': username, 'password': PASSWORD})
+
+    def register(self, count):
+        client = APIClient(raise_request_exception=False)
+        for i in range(count):
+            yield lambda i=i: client.post(
+                '/accounts/register/',
+                {'username': f'bench_api_new_{i}', 'password': PASSWORD})
+
+    def logout(self, count):
+        # Spares benefactors[0], whose token the later scenarios use.
+        for benefactor in self.benefactors[1:count + 1]:
+            client = self.client_for(benefactor.user)
+            yield lambda client=client: client.post('/accounts/logout/')
+
+    def tasks_feed_uncached(self, count):
+        for _ in range(count):
+            feed_cache().clear()
+            yield lambda: self.benefactor.get('/tasks/')
+
+    def tasks_feed_cached(self, count):
+        self.benefactor.get('/tasks/')
+        for _ in range(count):
+            yield lambda: self.benefactor.get('/tasks/')
+
+    def tasks_feed_not_modified(self, count):
+        etag = self.benefactor.get('/tasks/')['ETag']
+        for _ in range(count):
+            yield lambda: self.benefactor.get(
+                '/tasks/', HTTP_IF_NONE_MATCH=etag)
+
+    def tasks_create(self, count):
+        for i in range(count):
+            yield lambda i=i: self.owner.post(
+                '/tasks/', {'title': f'bench task {i}'})
+
+    def tasks_bulk_create(self, count):
+        rows = [{'title': f'bulk task {i}', 'age_limit_from': 20}
+                for i in range(100)]
+        for _ in range(count):
+            yield lambda: self.owner.post('/tasks/', rows, format='json')
+
+    def task_request(self, count):
+        for pk in self.next_pending(count):
+            self.accepted.append(pk)
+            yield lambda pk=pk: self.benefactor.post(f'/tasks/{pk}/request/')
+
+    def task_response_accept(self, count):
+        for pk in self.accepted[:count]:
+            yield lambda pk=pk: self.owner.post(
+                f'/tasks/{pk}/response/', {'response': 'A'})
+
+    def task_response_reject(self, count):
+        for pk in self.next_pending(count):
+            self.benefactor.post(f'/tasks/{pk}/request/')
+            yield lambda pk=pk: self.owner.post(
+                f'/tasks/{pk}/response/', {'response': 'R'})
+
+    def task_done(self, count):
+        for pk in self.accepted[:count]:
+            yield lambda pk=pk: self.owner.post(f'/tasks/{pk}/done/')
+
+    def tasks_matches(self, count):
+        for benefactor in self.benefactors[:count]:
+            client = self.client_for(benefactor.user)
+            yield lambda client=client: client.get('/tasks/matches/')
+
+    def tasks_search(self, count):
+        for i in range(count):
+            words = ' '.join(TASK_WORDS[i % len(TASK_WORDS):][:2])
+            yield lambda words=words: self.benefactor.get(
+                '/tasks/search/', {'q': words})
+
+    def tasks_stats(self, count):
+        for _ in range(count):
+            yield lambda: self.owner.get('/tasks/stats/')
+
+    def tasks_export(self, count):
+        for _ in range(count):
+            yield lambda: self.small_owner.get('/tasks/export/')
+
+    def about_us(self, count):
+        client = APIClient()
+        for i in range(count):
+            # Alternates the first pages; the roster cache is warm after
+            # the first request of each.
+            yield lambda page=i % 3 + 1: client.get(
+                '/about-us/', {'page': page})
+
+    def meta(self):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        options = self.options
+        return {
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'dataset': {key: options[key] for key in (
+                'charities', 'benefactors', 'tasks', 'requests',
+                'slow_requests')},
+        }
+
+    def compare(self, baseline, report):
+        if baseline['meta'].get('dataset') != report['meta']['dataset']:
+            self.stderr.write('Warning: the baseline used another dataset.')
+        self.stderr.write(
+            f'{"endpoint":26} {"p50 ms":>18} {"p95 ms":>18} {"queries":>9}')
+        for name, current in report['endpoints'].items():
+            before = baseline['endpoints'].get(name)
+            if not before or not before.get('requests') or \
+                    not current.get('requests'):
+                continue
+            columns = [
+                f'{before[key]:8.2f} {self.change(before[key], current[key])}'
+                for key in ('p50_ms', 'p95_ms')]
+            self.stderr.write(
+                f'{name:26} {columns[0]:>18} {columns[1]:>18} '
+                f'{before["queries_p50"]:>4}->{current["queries_p50"]:<4}')
+
+    def change(self, before, after):
+        if not before:
+            return '    n/a'
+        return f'{(after - before) / before * 100:+7.1f}%'
@@ -0,0 +1,118 @@
+import os
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from accounts import hashers
+from accounts.models import User
+
+from ._bench import percentile, rolled_back
+
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = ('Compare password hasher profiles, hashing inline and in the '
+            'hashing pool: logins per second (and per core) with --threads '
+            'concurrent logins, the stall they cause to other work in the '
+            'web worker, and the end-to-end latency of /accounts/login/. '
+            'pbkdf2 inline is the setup before hasher profiles.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+',
+                            choices=tuple(settings.PASSWORD_HASHER_PROFILES),
+                            default=['pbkdf2', 'bcrypt', 'argon2'])
+        parser.add_argument('--modes', nargs='+', choices=('inline', 'pool'),
+                            default=['inline', 'pool'])
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 1,
+                            help='Hashing pool processes.')
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--logins', type=int, default=20,
+                            help='Sequential /accounts/login/ requests.')
+
+    def handle(self, *args, **options):
+        cores = os.cpu_count() or 1
+        self.stdout.write(
+            f'{cores} cores, {options["threads"]} threads, '
+            f'{options["workers"]} pool workers')
+        self.stdout.write(
+            f'{"profile":8} {"mode":6} {"logins/s":>9} {"per core":>9} '
+            f'{"stall p99 ms":>13} {"login p50 ms":>13}')
+        for profile in options['profiles']:
+            for mode in options['modes']:
+                workers = options['workers'] if mode == 'pool' else 0
+                with override_settings(
+                        PASSWORD_HASHERS=self.hashers(profile),
+                        PASSWORD_HASHING_WORKERS=workers):
+                    rate, stall = self.burst(options)
+                    login = self.logins(options['logins'])
+                hashers.pool.shutdown()
+                self.stdout.write(
+                    f'{profile:8} {mode:6} {rate:9.1f} {rate / cores:9.1f} '
+                    f'{stall:13.2f} {login:13.2f}')
+
+    def hashers(self, profile):
+        profiles = settings.PASSWORD_HASHER_PROFILES
+        return [profiles[profile], *(
+            path for name, path in profiles.items() if name != profile)]
+
+    def burst(self, options):
+        """
+        Run --threads threads verifying passwords for --duration seconds
+        while a probe thread times a small piece of pure Python work, as
+        the other requests of the worker would. Returns logins per second
+        and the probe's p99 in milliseconds.
+        """
+        encoded = make_password(PASSWORD)
+        hashers.verify_password(PASSWORD, encoded)  # Starts the pool.
+        stop_at = time.monotonic() + options['duration']
+        counts, stalls = [0] * options['threads'], []
+
+        def login(index):
+            while time.monotonic() < stop_at:
+                hashers.verify_password(PASSWORD, encoded)
+                counts[index] += 1
+
+        def probe():
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                sum(range(10000))
+                stalls.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.005)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=login, args=(index,))
+                   for index in range(options['threads'])]
+        threads.append(threading.Thread(target=probe))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        return sum(counts) / elapsed, percentile(sorted(stalls), 99)
+
+    def logins(self, count):
+        """Median latency of ``count`` logins through the test client."""
+        if not count:
+            return 0
+        encoded = make_password(PASSWORD)
+        client = APIClient()
+        latencies = []
+        with override_settings(ALLOWED_HOSTS=['*']), rolled_back():
+            users = User.objects.bulk_create(
+                User(username=f'bench_login_{i}', password=encoded)
+                for i in range(count))
+            for user in users:
+                started = time.perf_counter()
+                client.post('/accounts/login/', {
+                    'username': user.username, 'password': PASSWORD})
+                latencies.append((time.perf_counter() - started) * 1000)
+        return statistics.median(latencies)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from charities.models import Task
+
+from ._bench import measure, rolled_back, seed_tasks
+
+
+def legacy_related_tasks(user):
+    return Task.objects.filter(Q(charity__user=user) |
+                               Q(assigned_benefactor__user=user) |
+                               Q(state='P'))
+
+
+class Command(BaseCommand):
+    help = ('Compare query plans and latency of the joined OR task feed '
+            'against the indexed UNION in TaskManager.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=200000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            users, _, _ = seed_tasks(options['tasks'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            user = users[0]
+
+            self.report('after', Task.objects.all_related_tasks_to_user(user),
+                        options['repeat'])
+            with connection.cursor() as cursor:
+                for index in Task._meta.indexes:
+                    cursor.execute(
+                        f'DROP INDEX {connection.ops.quote_name(index.name)}')
+            self.report('before', legacy_related_tasks(user),
+                        options['repeat'])
+
+    def report(self, label, queryset, repeat):
+        self.stdout.write(f'--- {label}')
+        self.stdout.write(queryset.explain())
+        elapsed = measure(lambda: list(queryset.values_list('pk', flat=True)),
+                          repeat)
+        self.stdout.write(f'{label}: {elapsed:.1f} ms (median of {repeat})')
@@ -0,0 +1,108 @@
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Start the production gunicorn profile once per server interface '
+            '(wsgi, asgi), drive it with keep-alive client threads and '
+            'compare requests per second and latency.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=('wsgi', 'asgi'),
+                            default=['wsgi', 'asgi'])
+        parser.add_argument('--path', default='/about-us/')
+        parser.add_argument('--token',
+                            help='API token sent as "Authorization: Token".')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        for mode in options['modes']:
+            server = self.start_server(mode, options)
+            try:
+                latencies, errors, elapsed = self.load(options)
+            finally:
+                server.terminate()
+                server.wait()
+            if not latencies:
+                raise CommandError(f'{mode}: no successful requests.')
+            latencies.sort()
+            self.stdout.write(
+                f'{mode}: {len(latencies) / elapsed:8.1f} req/s  '
+                f'p50 {statistics.median(latencies) * 1000:6.1f} ms  '
+                f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.1f} ms  '
+                f'{errors} errors')
+
+    def start_server(self, mode, options):
+        env = {
+            **os.environ,
+            'CHARITY_PROFILE': 'production',
+            'SERVER_INTERFACE': mode,
+            'BIND': f'127.0.0.1:{options["port"]}',
+            'WEB_CONCURRENCY': str(options['workers']),
+        }
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c',
+             str(settings.BASE_DIR / 'gunicorn.conf.py')],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                self.request(options).read()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'{mode} server did not come up.')
+
+    def request(self, options, connection=None):
+        connection = connection or http.client.HTTPConnection(
+            '127.0.0.1', options['port'], timeout=10)
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        connection.request('GET', options['path'], headers=headers)
+        return connection.getresponse()
+
+    def load(self, options):
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        stop_at = time.monotonic() + options['duration']
+
+        def client():
+            connection = http.client.HTTPConnection(
+                '127.0.0.1', options['port'], timeout=10)
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    response = self.request(options, connection)
+                    response.read()
+                    ok = response.status < 400
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                    else:
+                        errors[0] += 1
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client)
+                   for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0], time.monotonic() - started
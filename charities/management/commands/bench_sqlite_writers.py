@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ._bench import percentile
+
+SCHEMA = '''
+CREATE TABLE task (
+    id INTEGER PRIMARY KEY, title TEXT, state TEXT, benefactor INTEGER);
+CREATE INDEX task_state ON task (state);
+CREATE TABLE registration (id INTEGER PRIMARY KEY, username TEXT);
+'''
+
+
+def connect(path, pragmas, journal=False):
+    """
+    Open ``path`` in autocommit mode with the profile's PRAGMAs. The busy
+    timeout comes from the profile, not from sqlite3's own default, and
+    journal_mode, which sticks to the file, is only set by the setup.
+    """
+    timeout = pragmas.get('busy_timeout', 0) / 1000
+    db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    for name, value in pragmas.items():
+        if journal or name != 'journal_mode':
+            db.execute(f'PRAGMA {name} = {value}')
+    return db
+
+
+def writer(path, pragmas, number, writes, results):
+    """Claim a pending task and register a user per transaction."""
+    db = connect(path, pragmas)
+    latencies, locked = [], 0
+    for index in range(writes):
+        started = time.perf_counter()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute(
+                "UPDATE task SET state = 'W', benefactor = ? WHERE id = ("
+                "SELECT id FROM task WHERE state = 'P' LIMIT 1)", (number,))
+            db.execute('INSERT INTO registration (username) VALUES (?)',
+                       (f'user{number}-{index}',))
+            db.execute('COMMIT')
+        except sqlite3.OperationalError:
+            locked += 1
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    db.close()
+    results.put((latencies, locked))
+
+
+def reader(path, pragmas, stop, results):
+    """Read the pending feed in a loop, as GET requests would."""
+    db = connect(path, pragmas)
+    reads, locked = 0, 0
+    while not stop.is_set():
+        try:
+            db.execute("SELECT id, title FROM task WHERE state = 'P' "
+                       "LIMIT 50").fetchall()
+            reads += 1
+        except sqlite3.OperationalError:
+            locked += 1
+    db.close()
+    results.put((reads, locked))
+
+
+class Command(BaseCommand):
+    help = ('Compare the SQLITE_PROFILES under concurrent writers: each '
+            'writer process claims a task and registers a user per '
+            'transaction while reader processes poll the task feed. Runs on '
+            'temporary database files and reports commits per second, '
+            'commit latency and "database is locked" errors.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+',
+                            choices=tuple(settings.SQLITE_PROFILES),
+                            default=['rollback', 'wal'])
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=2)
+        parser.add_argument('--writes', type=int, default=500,
+                            help='Transactions per writer.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{options["writers"]} writers x {options["writes"]} '
+            f'transactions, {options["readers"]} readers')
+        self.stdout.write(
+            f'{"profile":9} {"commits/s":>10} {"p50 ms":>8} {"p99 ms":>8} '
+            f'{"locked":>7} {"reads/s":>9}')
+        for profile in options['profiles']:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                row = self.run(path, settings.SQLITE_PROFILES[profile],
+                               options)
+            self.stdout.write(f'{profile:9} {row}')
+
+    def run(self, path, pragmas, options):
+        db = connect(path, pragmas, journal=True)
+        db.executescript(SCHEMA)
+        db.executemany(
+            "INSERT INTO task (title, state) VALUES (?, 'P')",
+            ((f'task{index}',)
+             for index in range(options['writers'] * options['writes'])))
+        db.close()
+
+        context = multiprocessing.get_context('fork')
+        results, stop = context.Queue(), context.Event()
+        readers = [
+            context.Process(target=reader,
+                            args=(path, pragmas, stop, results))
+            for _ in range(options['readers'])]
+        writers = [
+            context.Process(target=writer,
+                            args=(path, pragmas, number, options['writes'],
+                                  results))
+            for number in range(options['writers'])]
+        for process in readers:
+            process.start()
+        started = time.perf_counter()
+        for process in writers:
+            process.start()
+        written = [results.get() for _ in writers]
+        elapsed = time.perf_counter() - started
+        stop.set()
+        read = [results.get() for _ in readers]
+        for process in readers + writers:
+            process.join()
+
+        latencies = sorted(ms for batch, _ in written for ms in batch)
+        locked = sum(count for _, count in written + read)
+        reads = sum(count for count, _ in read)
+        p50 = percentile(latencies, 50) if latencies else 0
+        p99 = percentile(latencies, 99) if latencies else 0
+        return (f'{len(latencies) / elapsed:10.0f} {p50:8.2f} {p99:8.2f} '
+                f'{locked:7} {reads / elapsed:9.0f}')
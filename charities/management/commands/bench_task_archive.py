@@ -0,0 +1,89 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from charities.archive import archive_tasks
+from charities.models import Task
+from charities.pagination import TaskCursorPagination
+from charities.views import TaskExport
+
+from ._bench import measure, rolled_back, seed_tasks
+
+# Nine in ten tasks are done, as in a tree that never archived.
+STATE_WEIGHTS = {'P': 1 / 30, 'W': 1 / 30, 'A': 1 / 30, 'D': 0.9}
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = ('Seed tasks of which 90% are done and dated in the past, time '
+            'the hot task queries (feed pages, charity and pending '
+            'listings, the charity export), archive every done task with '
+            'archive_tasks and time them again. Nothing is committed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, nargs='+',
+                            default=[100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for tasks in options['tasks']:
+            with rolled_back():
+                _, charities, benefactors = seed_tasks(
+                    tasks, state_weights=STATE_WEIGHTS)
+                self.analyze()
+                queries = self.queries(charities[0], benefactors[0].user)
+                before = self.time(queries, options['repeat'])
+                started = time.perf_counter()
+                # Every seeded task is dated before today.
+                moved = archive_tasks(days=0, today=date.today(),
+                                      batch_size=options['batch_size'])
+                elapsed = time.perf_counter() - started
+                self.analyze()
+                after = self.time(queries, options['repeat'])
+                self.stdout.write(
+                    f'{tasks} tasks: archived {moved} in {elapsed:.1f} s '
+                    f'({moved / elapsed:.0f} tasks/s), '
+                    f'{Task.objects.count()} left; ms per query '
+                    f'(median of {options["repeat"]})')
+                self.stdout.write(
+                    f'  {"query":32} {"before":>9} {"after":>9} '
+                    f'{"speedup":>8}')
+                for name in queries:
+                    self.stdout.write(
+                        f'  {name:32} {before[name]:9.2f} '
+                        f'{after[name]:9.2f} '
+                        f'{before[name] / after[name]:7.1f}x')
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def queries(self, charity, benefactor_user):
+        charity_user = charity.user
+        ordering = TaskCursorPagination.ordering
+
+        def page(queryset):
+            return lambda: list(queryset.order_by(*ordering)[:PAGE_SIZE])
+
+        return {
+            'feed page, charity': page(
+                Task.objects.all_related_tasks_to_user(charity_user)),
+            'feed page, benefactor': page(
+                Task.objects.all_related_tasks_to_user(benefactor_user)),
+            'charity task count': lambda: (
+                Task.objects.related_tasks_to_charity(charity_user).count()),
+            'benefactor assigned tasks': lambda: list(
+                Task.objects.related_tasks_to_benefactor(benefactor_user)
+                .filter(state='A')),
+            'pending page': page(Task.objects.filter(state='P')),
+            # Reads both tables; the archive is empty before.
+            'charity export (live + archive)': lambda: list(
+                TaskExport.get_rows(charity.pk)),
+        }
+
+    def time(self, queries, repeat):
+        return {name: measure(query, repeat)
+                for name, query in queries.items()}
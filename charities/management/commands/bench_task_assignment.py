@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from charities.assignment import assign_tasks
+from charities.models import Task
+from charities.stats import rebuild
+
+from ._bench import SEED_START, rolled_back, seed_tasks
+from .assign_tasks import describe
+
+
+class Command(BaseCommand):
+    help = ('Seed pending tasks and benefactors and run the batch '
+            'assignment over all of them, reporting load, solve and write '
+            'time and the share of tasks matched. Nothing is committed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000)
+        parser.add_argument('--benefactors', type=int, default=50000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solve without writing the assignments.')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            started = time.perf_counter()
+            _, charities, _ = seed_tasks(
+                options['tasks'], benefactors=options['benefactors'],
+                states=('P',), days=365)
+            # Task stats are needed for the stats deltas of the write.
+            rebuild()
+            self.stdout.write(
+                f'Seeded {options["tasks"]} tasks and '
+                f'{options["benefactors"]} benefactors in '
+                f'{time.perf_counter() - started:.1f} s')
+            report = assign_tasks(
+                Task.objects.filter(charity__in=charities),
+                dry_run=options['dry_run'], today=SEED_START)
+            for line in describe(report):
+                self.stdout.write(line)
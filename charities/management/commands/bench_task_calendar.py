@@ -0,0 +1,88 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from accounts.authentication import user_roles
+from charities.feed import feed_cache
+from charities.schedule import task_calendar
+
+from ._bench import SEED_START, measure, rolled_back, seed_tasks
+
+# Room for every week bucket of the run: LocMemCache's default of 300
+# entries would cull warm buckets and measure misses instead.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+
+class Command(BaseCommand):
+    help = ('Seed tasks over several years and time calendar range queries '
+            'of one week and one quarter for each table size: cold (empty '
+            'cache), warm (cached weeks) and cold without the (date, state) '
+            'index. Nothing is committed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, nargs='+',
+                            default=[100000, 1000000])
+        parser.add_argument('--years', type=int, default=5)
+        parser.add_argument('--ranges', type=int, default=20)
+
+    @override_settings(CACHES=BENCH_CACHES, TASK_FEED_CACHE='default')
+    def handle(self, *args, **options):
+        days = options['years'] * 365
+        rng = random.Random(0)
+        self.stdout.write(
+            f'{options["years"]} years, {options["ranges"]} random ranges '
+            f'per row, ms per range')
+        self.stdout.write(
+            f'{"tasks":>9} {"range":>7} {"cold":>8} {"warm":>8} '
+            f'{"no index":>9} {"tasks/range":>12}')
+        for tasks in options['tasks']:
+            with rolled_back():
+                _, _, benefactors = seed_tasks(tasks, days=days)
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                roles = user_roles(benefactors[0].user)
+                rows = {}
+                for length in (7, 91):
+                    ranges = []
+                    for _ in range(options['ranges']):
+                        start = SEED_START + timedelta(
+                            days=rng.randrange(days - length))
+                        ranges.append(
+                            (start, start + timedelta(days=length - 1)))
+                    rows[length] = ranges, self.time(roles, ranges)
+                with connection.cursor() as cursor:
+                    cursor.execute('DROP INDEX task_date_state_idx')
+                    cursor.execute('DROP INDEX task_state_date_idx')
+                for length, (ranges, (cold, warm, found)) in rows.items():
+                    unindexed = self.time(roles, ranges, warm=False)[0]
+                    self.stdout.write(
+                        f'{tasks:9} {length:5} d {cold:8.2f} {warm:8.2f} '
+                        f'{unindexed:9.2f} {found:12.0f}')
+
+    def time(self, roles, ranges, warm=True):
+        """Median cold and warm ms per range and the mean tasks returned."""
+        cache = feed_cache()
+        found = []
+
+        def run():
+            found[:] = [
+                sum(len(bucket['tasks']) for bucket in task_calendar(
+                    roles, start, end, group='week'))
+                for start, end in ranges]
+
+        def cold():
+            cache.clear()
+            run()
+
+        count = len(ranges)
+        cold_ms = measure(cold, repeat=3) / count
+        warm_ms = measure(run, repeat=3) / count if warm else 0
+        return cold_ms, warm_ms, sum(found) / count
@@ -0,0 +1,80 @@
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from charities.models import Task, TaskEvent
+from charities.views import TaskRequest
+
+from ._bench import seed_tasks
+
+
+class Command(BaseCommand):
+    help = ('Let benefactor threads race for the same pending tasks through '
+            'TaskRequest, report claims per second and verify that no task '
+            'was assigned twice. Seeded rows are deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=8)
+
+    def handle(self, *args, **options):
+        users, _, benefactors = seed_tasks(
+            options['tasks'], charities=1, benefactors=options['threads'],
+            states=('P',))
+        try:
+            self.race(users[0].charity, benefactors)
+        finally:
+            TaskEvent.objects.filter(charity_id=users[0].charity.pk).delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def race(self, charity, benefactors):
+        task_ids = list(Task.objects.filter(charity=charity)
+                        .values_list('pk', flat=True))
+        view = TaskRequest.as_view()
+        factory = APIRequestFactory()
+
+        def claimant(benefactor):
+            order = task_ids[:]
+            random.shuffle(order)
+            won, codes = [], Counter()
+            try:
+                for task_id in order:
+                    request = factory.post(f'/tasks/{task_id}/request/')
+                    force_authenticate(request, benefactor.user)
+                    code = view(request, task_id=task_id).status_code
+                    codes[code] += 1
+                    if code == 200:
+                        won.append(task_id)
+            finally:
+                connection.close()
+            return benefactor.pk, won, codes
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(benefactors)) as pool:
+            results = list(pool.map(claimant, benefactors))
+        elapsed = time.perf_counter() - started
+
+        codes = sum((result[2] for result in results), Counter())
+        winners = {}
+        for benefactor_id, won, _ in results:
+            for task_id in won:
+                if task_id in winners:
+                    raise CommandError(f'Task {task_id} was claimed twice.')
+                winners[task_id] = benefactor_id
+        assigned = dict(Task.objects.filter(pk__in=task_ids, state='W')
+                        .values_list('pk', 'assigned_benefactor'))
+        if assigned != winners or len(winners) != len(task_ids):
+            raise CommandError('Stored assignments do not match the winners.')
+
+        attempts = sum(codes.values())
+        self.stdout.write(
+            f'{len(benefactors)} threads, {len(task_ids)} tasks: '
+            f'{attempts} attempts ({dict(codes)}) in {elapsed:.2f} s, '
+            f'{attempts / elapsed:.0f} attempts/s, '
+            f'{len(winners) / elapsed:.0f} claims/s, no double assignment')
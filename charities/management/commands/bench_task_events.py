@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from charities.events import drain_all
+from charities.models import TaskEvent
+
+
+class Command(BaseCommand):
+    help = ('Fill the task event outbox and time how fast drain_all() '
+            'empties it for each batch size and thread count. The handler '
+            'sleeps --handler-ms to stand in for a notification call.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--tasks', type=int, default=5000,
+                            help='Distinct task ids the events spread over.')
+        parser.add_argument('--batch-sizes', type=int, nargs='+',
+                            default=[100, 500, 2000])
+        parser.add_argument('--workers', type=int, nargs='+',
+                            default=[1, 8, 32])
+        parser.add_argument('--handler-ms', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        if TaskEvent.objects.exists():
+            raise CommandError('The outbox is not empty; drain it first.')
+        delay = options['handler_ms'] / 1000
+        delivered = []
+
+        def handler(event):
+            if delay:
+                time.sleep(delay)
+            delivered.append(event.pk)
+
+        for batch_size in options['batch_sizes']:
+            for workers in options['workers']:
+                self.fill(options['events'], options['tasks'])
+                delivered.clear()
+                started = time.perf_counter()
+                drain_all(batch_size, workers, handlers=[handler])
+                elapsed = time.perf_counter() - started
+                if len(delivered) != options['events']:
+                    raise CommandError(
+                        f'Delivered {len(delivered)} of {options["events"]}.')
+                self.stdout.write(
+                    f'batch {batch_size:5d}, {workers:3d} threads: '
+                    f'{options["events"] / elapsed:9.0f} events/s '
+                    f'({elapsed:.2f} s)')
+
+    def fill(self, events, tasks):
+        TaskEvent.objects.bulk_create(
+            [TaskEvent(task_id=i % tasks, charity_id=1, benefactor_id=1,
+                       from_state='P', to_state='W')
+             for i in range(events)],
+            batch_size=5000)
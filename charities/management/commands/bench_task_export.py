@@ -0,0 +1,46 @@
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from charities.views import TaskExport
+
+from ._bench import rolled_back, seed_tasks
+
+
+class Command(BaseCommand):
+    help = ('Stream the charity task export for growing task counts and '
+            'report peak Python heap and process RSS for each run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10000, 100000, 500000])
+        parser.add_argument('--output', choices=('ndjson', 'csv'),
+                            default='ndjson')
+
+    def handle(self, *args, **options):
+        view = TaskExport.as_view()
+        factory = APIRequestFactory()
+        for size in options['sizes']:
+            with rolled_back():
+                users, _, _ = seed_tasks(size, charities=1, benefactors=10)
+                request = factory.get('/tasks/export/',
+                                      {'output': options['output']})
+                force_authenticate(request, users[0])
+
+                tracemalloc.start()
+                started = time.perf_counter()
+                response = view(request)
+                streamed = sum(len(chunk)
+                               for chunk in response.streaming_content)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.stdout.write(
+                f'{size:>9} rows  {streamed / 2**20:8.1f} MiB streamed  '
+                f'{elapsed:6.2f} s  heap peak {peak / 2**20:6.2f} MiB  '
+                f'max RSS {max_rss / 1024:7.1f} MiB')
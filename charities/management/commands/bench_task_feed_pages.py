@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from accounts.authentication import user_roles
+from charities.models import Task
+from charities.pagination import TaskCursorPagination
+
+from ._bench import measure, rolled_back, seed_tasks
+
+
+class Command(BaseCommand):
+    help = ('Seed tasks and time a feed page (first and from the middle of '
+            'the feed) for a charity and a benefactor, paged over the UNION '
+            'of all_related_tasks_to_user and over related_task_branches. '
+            'Nothing is committed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, nargs='+',
+                            default=[20000, 200000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        for tasks in options['tasks']:
+            with rolled_back():
+                _, charities, benefactors = seed_tasks(tasks)
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                self.stdout.write(f'{tasks} tasks: ms per 20-task page '
+                                  f'(median of {repeat})')
+                for role, user in (('charity', charities[0].user),
+                                   ('benefactor', benefactors[0].user)):
+                    union = Task.objects.all_related_tasks_to_user(user)
+                    branches = Task.objects.related_task_branches(
+                        user_roles(user))
+                    middle = self.middle_cursor(union)
+                    for label, cursor in (('first', None),
+                                          ('middle', middle)):
+                        before = measure(
+                            lambda: self.page(union, cursor), repeat)
+                        after = measure(
+                            lambda: self.page(branches, cursor), repeat)
+                        self.stdout.write(
+                            f'  {role:10} {label:6} union {before:8.2f}  '
+                            f'branches {after:6.2f}')
+
+    def middle_cursor(self, queryset):
+        ordered = queryset.order_by(*TaskCursorPagination.ordering)
+        task = ordered[ordered.count() // 2]
+        return TaskCursorPagination().encode_cursor(task.date, task.id)
+
+    def page(self, queryset, cursor):
+        params = {'cursor': cursor} if cursor else {}
+        request = Request(RequestFactory().get('/tasks/', params))
+        return TaskCursorPagination().paginate_queryset(queryset, request)
@@ -0,0 +1,56 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from charities.matching import matching_tasks, rebuild_index
+from charities.models import Benefactor
+
+from ._bench import rolled_back, seed_tasks
+
+
+class Command(BaseCommand):
+    help = ('Seed pending tasks with random gender/age limits, build the '
+            'eligibility index and report benefactor matches per second.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(1)
+        with rolled_back():
+            started = time.perf_counter()
+            _, _, benefactors = seed_tasks(
+                options['tasks'], states=('P',))
+            # Time for every match, so none is cut short for capacity.
+            Benefactor.objects.update(free_time_per_week=100)
+            seeded = time.perf_counter()
+            rebuild_index()
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            indexed = time.perf_counter()
+            self.stdout.write(
+                f'seeded {options["tasks"]} pending tasks in '
+                f'{seeded - started:.1f} s, indexed in '
+                f'{indexed - seeded:.1f} s')
+
+            # Seeded task dates lie in 2020-2022; match as of the start so
+            # that they are all still upcoming.
+            today = date(2020, 1, 1)
+            profiles = rng.choices([benefactor.user
+                                    for benefactor in benefactors],
+                                   k=options['queries'])
+            started = time.perf_counter()
+            found = sum(len(matching_tasks(user, options['limit'], today))
+                        for user in profiles)
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{len(profiles)} match queries in {elapsed:.2f} s: '
+            f'{len(profiles) / elapsed:.0f} matches/s, '
+            f'{elapsed / len(profiles) * 1000:.2f} ms each, '
+            f'{found / len(profiles):.1f} tasks per match')
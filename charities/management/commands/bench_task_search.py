@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from charities.models import Task
+from charities.search import search_tasks
+
+from ._bench import measure, rolled_back, seed_tasks
+
+# Seeded into about 40% of the tasks, to time queries with many matches.
+COMMON_WORD = 'common'
+
+
+def vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return sorted({''.join(rng.choices(letters, k=rng.randrange(4, 10)))
+                   for _ in range(size)})
+
+
+class Command(BaseCommand):
+    help = ('Seed tasks with random words and compare the full-text search '
+            'backend to an icontains filter for single words, two words, '
+            'prefixes and a word in about 40% of the tasks. Nothing is '
+            'committed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000000)
+        parser.add_argument('--words', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(2)
+        words = vocabulary(options['words'], rng)
+        limit = options['limit']
+        with rolled_back():
+            started = time.perf_counter()
+            # 23 words per task, each the common one with odds 1 in 41.
+            seed_tasks(options['tasks'], vocabulary=words + [COMMON_WORD] * (
+                len(words) // 40))
+            self.stdout.write(
+                f'Seeded and indexed {options["tasks"]} tasks in '
+                f'{time.perf_counter() - started:.1f} s')
+            pending = Task.objects.filter(state='P')
+            kinds = {
+                'word': lambda: [rng.choice(words)],
+                'two words': lambda: rng.sample(words, 2),
+                'prefix': lambda: [rng.choice(words)[:3] + '*'],
+                'common word': lambda: [COMMON_WORD],
+                'common prefix': lambda: [COMMON_WORD[:4] + '*'],
+            }
+            for kind, make_terms in kinds.items():
+                queries = [make_terms() for _ in range(options['queries'])]
+                fts = measure(lambda: [
+                    list(search_tasks(pending, ' '.join(terms))[:limit])
+                    for terms in queries], repeat=3)
+                contains = measure(lambda: [
+                    list(self.icontains(pending, terms)[:limit])
+                    for terms in queries], repeat=1)
+                count = len(queries)
+                self.stdout.write(
+                    f'{kind:13}: fts {fts / count:8.2f} ms/query, '
+                    f'icontains {contains / count:8.2f} ms/query')
+
+    def icontains(self, queryset, terms):
+        for term in terms:
+            term = term.rstrip('*')
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(description__icontains=term))
+        return queryset.order_by('id')
@@ -0,0 +1,94 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.throttling import UserRateThrottle
+
+from accounts.authentication import UserRoles
+from accounts.models import User
+from charities.throttling import TokenBuckets, buckets
+from charities.views import TaskRequest
+
+# Limits no check reaches, so every timed check takes a token.
+UNLIMITED = {'user': {'rate': 10 ** 9, 'burst': 10 ** 9}}
+
+
+class CacheThrottle(UserRateThrottle):
+    """DRF's per-user throttle: a cache get and set per request."""
+    rate = '300/min'
+
+
+class Command(BaseCommand):
+    help = ('Time throttle checks: the in-memory token buckets of '
+            'charities.throttling alone and syncing with a shared cache, '
+            "next to DRF's cache-backed UserRateThrottle, over a number of "
+            'distinct users; then a claim refused by TaskRequest, which '
+            'must not query. Reports microseconds per check.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=200000)
+        parser.add_argument('--users', type=int, nargs='+',
+                            default=[1, 1000, 100000])
+
+    def handle(self, *args, **options):
+        checks = options['checks']
+        self.stdout.write(f'{checks} checks, us per check')
+        self.stdout.write(f'{"users":>7} {"bucket":>8} {"shared":>8} '
+                          f'{"DRF cache":>10}')
+        for users in options['users']:
+            keys = [[('user', number)] for number in range(users)]
+            local = self.time_buckets(keys, checks)
+            with override_settings(TASK_THROTTLE_SHARED_CACHE='default',
+                                   TASK_THROTTLE_SYNC_INTERVAL=1):
+                shared = self.time_buckets(keys, checks)
+            drf = self.time_drf(users, checks // 10)
+            self.stdout.write(
+                f'{users:7} {local:8.2f} {shared:8.2f} {drf:10.2f}')
+        self.stdout.write(
+            f'refused claim through TaskRequest: {self.time_refused():.1f} '
+            f'us, no queries')
+
+    def time_buckets(self, keys, checks):
+        store = TokenBuckets()
+        with override_settings(TASK_WRITE_THROTTLES=UNLIMITED):
+            for key in keys:
+                store.take(key)
+            started = time.perf_counter()
+            for index in range(checks):
+                store.take(keys[index % len(keys)])
+            return (time.perf_counter() - started) / checks * 10 ** 6
+
+    def time_drf(self, users, checks):
+        throttle = CacheThrottle()
+        throttle.cache.clear()
+        requests = []
+        for number in range(users):
+            request = APIRequestFactory().post('/')
+            request.user = User(pk=number + 1)
+            requests.append(request)
+        started = time.perf_counter()
+        for index in range(checks):
+            throttle.allow_request(requests[index % users], None)
+        return (time.perf_counter() - started) / checks * 10 ** 6
+
+    def time_refused(self, count=2000):
+        user = User(pk=1)
+        user.roles = UserRoles(True, False, 1, None)
+        view = TaskRequest.as_view()
+        factory = APIRequestFactory()
+        with override_settings(TASK_WRITE_THROTTLES={
+                'user': {'rate': 10 ** -9, 'burst': 1}}):
+            buckets.take([('user', user.pk)])
+            request = factory.post('/tasks/1/request/')
+            force_authenticate(request, user)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(count):
+                    if view(request, task_id=1).status_code != 429:
+                        raise CommandError('The claim was not throttled.')
+                elapsed = time.perf_counter() - started
+        if len(queries):
+            raise CommandError(f'{len(queries)} queries for refused claims.')
+        return elapsed / count * 10 ** 6
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ParseError
+
+from charities.imports import PROFILE_MODELS, import_profiles, read_rows
+
+
+class Command(BaseCommand):
+    help = ('Import benefactor or charity profiles, with their users, from a '
+            'CSV or NDJSON file. Invalid rows are reported and skipped; the '
+            'others are committed batch by batch.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=tuple(PROFILE_MODELS))
+        parser.add_argument('path', help='A .csv, .ndjson or .jsonl file.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--max-errors', type=int, default=20,
+                            help='Row errors to print.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(report):
+            self.stderr.write(
+                f'{report.rows} rows read, {report.created} created, '
+                f'{len(report.errors)} rejected '
+                f'({time.perf_counter() - started:.1f} s)')
+
+        try:
+            with open(options['path'], 'rb') as file:
+                report = import_profiles(
+                    read_rows(file), options['kind'],
+                    batch_size=options['batch_size'], progress=progress)
+        except (OSError, ParseError) as exc:
+            raise CommandError(exc)
+
+        for error in report.errors[:options['max_errors']]:
+            self.stdout.write(f'Row {error["row"]}: {error["errors"]}')
+        if len(report.errors) > options['max_errors']:
+            self.stdout.write(
+                f'... and {len(report.errors) - options["max_errors"]} more.')
+        self.stdout.write(
+            f'Imported {report.created} of {report.rows} '
+            f'{options["kind"]} rows in '
+            f'{time.perf_counter() - started:.1f} s.')
@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from charities.events import drain
+
+
+class Command(BaseCommand):
+    help = ('Deliver the task event outbox to settings.TASK_EVENT_HANDLERS: '
+            'claim events in batches, run the handlers on a thread pool and '
+            'delete what was delivered; failures are retried with backoff. '
+            'Polls until interrupted unless --once is given.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as the outbox is empty.')
+
+    def handle(self, *args, **options):
+        total = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            try:
+                while True:
+                    try:
+                        count = drain(options['batch_size'], pool)
+                    except OperationalError as exc:
+                        # The database stayed locked past busy_timeout or
+                        # went away. A failed claim delivered nothing; a
+                        # batch whose results were not recorded stays
+                        # claimed and is delivered again after
+                        # CLAIM_TIMEOUT.
+                        self.stderr.write(f'Draining failed, retrying: {exc}')
+                        connection.close()
+                        time.sleep(options['poll_interval'])
+                        continue
+                    total += count
+                    if count:
+                        continue
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(f'Processed {total} events.')
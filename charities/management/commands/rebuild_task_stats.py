@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from charities.stats import inconsistencies, rebuild
+
+
+class Command(BaseCommand):
+    help = ('Recompute the per-charity and per-benefactor task counts from '
+            'Task. With --check, only compare the stored counts to a fresh '
+            'aggregate and fail if they differ.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            found = inconsistencies()
+            for model, pk, field, stored, actual in found:
+                self.stdout.write(
+                    f'{model} {pk}: {field} is {stored}, expected {actual}')
+            if found:
+                raise CommandError(f'{len(found)} counters are out of date.')
+            self.stdout.write('Task stats are consistent.')
+            return
+        started = time.perf_counter()
+        rebuild()
+        self.stdout.write(
+            f'Rebuilt task stats in {time.perf_counter() - started:.2f} s.')
@@ -0,0 +1,85 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import User
+from charities.matching import rebuild_index
+from charities.seeding import DEFAULT_STATE_WEIGHTS, seed
+from charities.stats import rebuild as rebuild_stats
+
+
+def state_weights(value):
+    """Parse "P=4,W=1,A=2,D=3"."""
+    try:
+        weights = {state: float(weight) for state, weight
+                   in (item.split('=') for item in value.split(','))}
+    except ValueError:
+        raise CommandError(f'Bad --states value: {value!r}')
+    if set(weights) - set(DEFAULT_STATE_WEIGHTS):
+        raise CommandError(f'Unknown states in {value!r}')
+    return weights
+
+
+class Command(BaseCommand):
+    help = ('Bulk-generate users, charities, benefactors and tasks with '
+            'configurable distributions, then rebuild the eligibility index '
+            'and the task stats. Users log in with --password.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--charities', type=int, default=100)
+        parser.add_argument('--benefactors', type=int, default=1000)
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument(
+            '--states', default='P=4,W=1,A=2,D=3',
+            help='Relative weights of the task states.')
+        parser.add_argument(
+            '--charity-skew', type=float, default=1.0,
+            help='Zipf exponent of tasks per charity; 0 spreads them evenly.')
+        parser.add_argument('--gender-limit-ratio', type=float, default=0.3)
+        parser.add_argument('--age-limit-ratio', type=float, default=0.5)
+        parser.add_argument('--undated-ratio', type=float, default=0.1)
+        parser.add_argument('--days', type=int, default=3 * 365,
+                            help='Task dates are spread over this many days.')
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--prefix', default='seed',
+                            help='Usernames are <prefix>_<n>.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        if User.objects.filter(username__startswith=f'{options["prefix"]}_'
+                               ).exists():
+            raise CommandError(
+                f'Users named {options["prefix"]}_<n> exist already; pick '
+                f'another --prefix.')
+
+        def progress(count):
+            if count % (options['batch_size'] * 20) == 0:
+                self.stdout.write(f'{count} tasks...')
+
+        with transaction.atomic():
+            users, charities, benefactors = seed(
+                options['charities'], options['benefactors'],
+                options['tasks'],
+                state_weights=state_weights(options['states']),
+                charity_skew=options['charity_skew'],
+                gender_limit_ratio=options['gender_limit_ratio'],
+                age_limit_ratio=options['age_limit_ratio'],
+                undated_ratio=options['undated_ratio'],
+                days=options['days'],
+                password=options['password'],
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                seed=options['seed'],
+                progress=progress)
+            seeded = time.perf_counter()
+            rebuild_index(options['batch_size'])
+            rebuild_stats(options['batch_size'])
+        self.stdout.write(
+            f'Seeded {len(users)} users, {len(charities)} charities, '
+            f'{len(benefactors)} benefactors and {options["tasks"]} tasks in '
+            f'{seeded - started:.1f} s; rebuilt the eligibility index and '
+            f'stats in {time.perf_counter() - seeded:.1f} s.')
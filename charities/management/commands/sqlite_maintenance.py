@@ -0,0 +1,77 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Maintain a SQLite database: refresh the planner statistics '
+            "(ANALYZE, which also feeds the admin's estimated counts), "
+            'optionally VACUUM, and checkpoint and truncate the WAL. '
+            'Without options it analyzes and checkpoints.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--checkpoint', action='store_true')
+        parser.add_argument('--analyze', action='store_true')
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Rebuild the file to reclaim free pages. Blocks writers '
+                 'and needs free disk space of about the database size.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                f'{options["database"]} is not a SQLite database.')
+        # The checkpoint goes last so it also moves what VACUUM wrote.
+        steps = [step for step in ('analyze', 'vacuum', 'checkpoint')
+                 if options[step]] or ['analyze', 'checkpoint']
+
+        with connection.cursor() as cursor:
+            self.report(cursor, connection, 'Before')
+            for step in steps:
+                started = time.perf_counter()
+                result = getattr(self, step)(cursor)
+                self.stdout.write(
+                    f'{step}: {result} '
+                    f'({time.perf_counter() - started:.2f} s)')
+            self.report(cursor, connection, 'After')
+
+    def checkpoint(self, cursor):
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        busy, log_frames, checkpointed = cursor.fetchone()
+        if busy:
+            return (f'incomplete, a reader or writer was busy '
+                    f'({checkpointed} of {log_frames} frames)')
+        return f'{checkpointed} frames copied, WAL truncated'
+
+    def analyze(self, cursor):
+        cursor.execute('ANALYZE')
+        cursor.execute('PRAGMA optimize')
+        cursor.execute('SELECT count(*) FROM sqlite_stat1')
+        return f'{cursor.fetchone()[0]} index statistics'
+
+    def vacuum(self, cursor):
+        cursor.execute('PRAGMA freelist_count')
+        free_pages = cursor.fetchone()[0]
+        cursor.execute('VACUUM')
+        return f'{free_pages} free pages reclaimed'
+
+    def report(self, cursor, connection, label):
+        values = {}
+        for pragma in ('journal_mode', 'page_size', 'page_count',
+                       'freelist_count'):
+            cursor.execute(f'PRAGMA {pragma}')
+            values[pragma] = cursor.fetchone()[0]
+        path = connection.settings_dict['NAME']
+        wal_size = 0
+        if os.path.exists(f'{path}-wal'):
+            wal_size = os.path.getsize(f'{path}-wal')
+        self.stdout.write(
+            f'{label}: {values["journal_mode"]} journal, '
+            f'{values["page_count"] * values["page_size"] / 2 ** 20:.1f} MiB '
+            f'in {values["page_count"]} pages '
+            f'({values["freelist_count"]} free), '
+            f'WAL {wal_size / 2 ** 20:.1f} MiB')
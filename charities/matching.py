@@ -0,0 +1,166 @@
+import heapq
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Benefactor, Task, TaskEligibility
+
+AGE_BAND_WIDTH = 10
+LAST_AGE_BAND = 10
+
+
+def age_band(age):
+    return max(0, min(age // AGE_BAND_WIDTH, LAST_AGE_BAND))
+
+
+def eligibility_rows(task, model=TaskEligibility):
+    """
+    Index rows for ``task``: one per age band its limits overlap, or a single
+    ANY_AGE row when it has none. Only pending tasks are indexed.
+    """
+    if task.state != 'P':
+        return []
+    age_from, age_to = task.age_limit_from, task.age_limit_to
+    if age_from is not None or age_to is not None:
+        low = 0 if age_from is None else age_band(age_from)
+        high = LAST_AGE_BAND if age_to is None else age_band(age_to)
+        bands = range(low, high + 1)
+    else:
+        bands = [TaskEligibility.ANY_AGE]
+    gender = task.gender_limit or TaskEligibility.ANY_GENDER
+    return [model(task_id=task.pk, gender=gender, age_band=band,
+                  date=task.date, age_limit_from=age_from,
+                  age_limit_to=age_to)
+            for band in bands]
+
+
+def rebuild_index(batch_size=5000):
+    TaskEligibility.objects.all().delete()
+    rows = []
+    for task in Task.objects.filter(state='P').iterator(chunk_size=batch_size):
+        rows.extend(eligibility_rows(task))
+        if len(rows) >= batch_size:
+            TaskEligibility.objects.bulk_create(rows)
+            rows = []
+    TaskEligibility.objects.bulk_create(rows)
+
+
+def index_tasks(tasks, batch_size=5000):
+    tasks = list(tasks)
+    TaskEligibility.objects.filter(
+        task_id__in=[task.pk for task in tasks]).delete()
+    rows = [row for task in tasks for row in eligibility_rows(task)]
+    TaskEligibility.objects.bulk_create(rows, batch_size=batch_size)
+
+
+def reindex_tasks(task_ids):
+    index_tasks(Task.objects.filter(pk__in=task_ids))
+
+
+def unindex_tasks(task_ids):
+    TaskEligibility.objects.filter(task_id__in=task_ids).delete()
+
+
+def bucket_keys(user):
+    """
+    The (specificity, gender, age band) buckets ``user`` may draw from, most
+    specific first: tasks aimed at the user's gender and age band, then at
+    either one, then at anyone.
+    """
+    genders = [(0, TaskEligibility.ANY_GENDER)]
+    if user.gender:
+        genders.append((1, user.gender))
+    bands = [(0, TaskEligibility.ANY_AGE)]
+    if user.age is not None:
+        bands.append((1, age_band(user.age)))
+    return sorted(((g_score + b_score, gender, band)
+                   for g_score, gender in genders
+                   for b_score, band in bands), reverse=True)
+
+
+def age_matching_rows(user):
+    rows = TaskEligibility.objects.all()
+    if user.age is not None:
+        # Bands are coarse; the exact limits are checked on the row itself.
+        rows = rows.filter(
+            Q(age_limit_from__isnull=True) | Q(age_limit_from__lte=user.age),
+            Q(age_limit_to__isnull=True) | Q(age_limit_to__gte=user.age))
+    return rows
+
+
+def remaining_capacity(user, hours=None):
+    """
+    How many more tasks ``user``'s benefactor profile has time for, as in
+    charities.assignment: free_time_per_week // TASK_ASSIGNMENT_HOURS less
+    the tasks waiting for or assigned to it. 0 without a profile.
+    """
+    hours = hours or settings.TASK_ASSIGNMENT_HOURS
+    row = Benefactor.objects.filter(user_id=user.pk).values_list(
+        'free_time_per_week', 'task_stats__waiting',
+        'task_stats__assigned').first()
+    if row is None:
+        return 0
+    free_time, waiting, assigned = row
+    return free_time // hours - (waiting or 0) - (assigned or 0)
+
+
+def eligible_tasks(user, queryset=None):
+    """``queryset`` (all tasks by default) narrowed to what ``user`` may take."""
+    queryset = Task.objects.all() if queryset is None else queryset
+    if remaining_capacity(user) <= 0:
+        return queryset.none()
+    buckets = Q()
+    for _, gender, band in bucket_keys(user):
+        buckets |= Q(gender=gender, age_band=band)
+    rows = age_matching_rows(user).filter(buckets)
+    return queryset.filter(state='P', pk__in=rows.values('task_id'))
+
+
+def bucket_head(rows, limit, today):
+    """The first ``limit`` (date, task id) keys of one bucket, undated last."""
+    dated = list(rows.filter(date__gte=today)
+                 .order_by('date', 'task_id')
+                 .values_list('date', 'task_id')[:limit])
+    if len(dated) < limit:
+        dated += (rows.filter(date__isnull=True)
+                  .order_by('task_id')
+                  .values_list('date', 'task_id')[:limit - len(dated)])
+    return dated
+
+
+def sort_key(row):
+    row_date, task_id = row
+    return (row_date is None, row_date, task_id)
+
+
+def matching_tasks(user, limit, today=None):
+    """
+    Pending, upcoming (or undated) tasks ``user`` is eligible for, none if
+    the user's benefactor profile has no time left for another task. Tasks
+    aimed at the user's gender or age rank first, then the soonest ones.
+
+    Every bucket is read as an ordered range of the (gender, age_band, date)
+    index with a LIMIT, so the cost does not grow with the number of tasks.
+    """
+    if remaining_capacity(user) <= 0:
+        return []
+    today = today or timezone.localdate()
+    rows = age_matching_rows(user)
+
+    task_ids = []
+    for _, buckets in groupby(bucket_keys(user), key=lambda key: key[0]):
+        heads = [bucket_head(rows.filter(gender=gender, age_band=band),
+                             limit - len(task_ids), today)
+                 for _, gender, band in buckets]
+        task_ids += [task_id for _, task_id
+                     in heapq.merge(*heads, key=sort_key)]
+        task_ids = task_ids[:limit]
+        if len(task_ids) == limit:
+            break
+
+    # The index is kept in step with task states, but only pending tasks are
+    # ever returned even if a row were stale.
+    tasks = Task.objects.filter(pk__in=task_ids, state='P').in_bulk()
+    return [tasks[pk] for pk in task_ids if pk in tasks]
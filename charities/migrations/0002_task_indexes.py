@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["state", "date"], name="task_state_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["charity", "state"], name="task_charity_state_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["assigned_benefactor", "state"],
+                name="task_benefactor_state_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("state", "P")),
+                fields=["date", "id"],
+                name="task_pending_date_idx",
+            ),
+        ),
+    ]
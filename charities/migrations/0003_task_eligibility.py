@@ -0,0 +1,96 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copy of charities.matching.eligibility_rows as of this migration,
+# so later changes to the live code cannot change what it writes.
+AGE_BAND_WIDTH = 10
+LAST_AGE_BAND = 10
+ANY_GENDER = "*"
+ANY_AGE = -1
+
+
+def age_band(age):
+    return max(0, min(age // AGE_BAND_WIDTH, LAST_AGE_BAND))
+
+
+def eligibility_rows(task, model):
+    age_from, age_to = task.age_limit_from, task.age_limit_to
+    if age_from is not None or age_to is not None:
+        low = 0 if age_from is None else age_band(age_from)
+        high = LAST_AGE_BAND if age_to is None else age_band(age_to)
+        bands = range(low, high + 1)
+    else:
+        bands = [ANY_AGE]
+    gender = task.gender_limit or ANY_GENDER
+    return [
+        model(
+            task_id=task.pk,
+            gender=gender,
+            age_band=band,
+            date=task.date,
+            age_limit_from=age_from,
+            age_limit_to=age_to,
+        )
+        for band in bands
+    ]
+
+
+def index_pending_tasks(apps, schema_editor, batch_size=5000):
+    Task = apps.get_model("charities", "Task")
+    TaskEligibility = apps.get_model("charities", "TaskEligibility")
+    rows = []
+    tasks = Task.objects.filter(state="P").iterator(chunk_size=batch_size)
+    for task in tasks:
+        rows.extend(eligibility_rows(task, TaskEligibility))
+        if len(rows) >= batch_size:
+            TaskEligibility.objects.bulk_create(rows)
+            rows = []
+    TaskEligibility.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0002_task_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskEligibility",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("gender", models.CharField(max_length=1)),
+                ("age_band", models.SmallIntegerField()),
+                ("date", models.DateField(blank=True, null=True)),
+                ("age_limit_from", models.IntegerField(blank=True, null=True)),
+                ("age_limit_to", models.IntegerField(blank=True, null=True)),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="eligibility",
+                        to="charities.task",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["gender", "age_band", "date", "task"],
+                        name="eligibility_bucket_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(index_pending_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0003_task_eligibility"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="charity",
+            index=models.Index(fields=["name"], name="charity_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="charity",
+            index=models.Index(fields=["reg_number"], name="charity_reg_number_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["title"], name="task_title_idx"),
+        ),
+    ]
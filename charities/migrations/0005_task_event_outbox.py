@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0004_admin_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("task_id", models.BigIntegerField()),
+                ("charity_id", models.BigIntegerField()),
+                ("benefactor_id", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "from_state",
+                    models.CharField(
+                        choices=[
+                            ("P", "Pending"),
+                            ("W", "Waiting"),
+                            ("A", "Assigned"),
+                            ("D", "Done"),
+                        ],
+                        max_length=1,
+                    ),
+                ),
+                (
+                    "to_state",
+                    models.CharField(
+                        choices=[
+                            ("P", "Pending"),
+                            ("W", "Waiting"),
+                            ("A", "Assigned"),
+                            ("D", "Done"),
+                        ],
+                        max_length=1,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+        ),
+    ]
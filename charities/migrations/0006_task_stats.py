@@ -0,0 +1,85 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+# Frozen copy of charities.stats.STATE_FIELDS as of this migration.
+STATE_FIELDS = {"P": "pending", "W": "waiting", "A": "assigned", "D": "done"}
+
+
+def count_existing_tasks(apps, schema_editor):
+    Task = apps.get_model("charities", "Task")
+    for model_name, owner in (
+        ("CharityTaskStats", "charity_id"),
+        ("BenefactorTaskStats", "assigned_benefactor_id"),
+    ):
+        model = apps.get_model("charities", model_name)
+        counts = {}
+        rows = (
+            Task.objects.filter(**{f"{owner}__isnull": False})
+            .values_list(owner, "state")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        for pk, state, count in rows:
+            counts.setdefault(pk, {})[STATE_FIELDS[state]] = count
+        model.objects.bulk_create(
+            [model(pk=pk, **fields) for pk, fields in counts.items()],
+            batch_size=5000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0005_task_event_outbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BenefactorTaskStats",
+            fields=[
+                ("pending", models.IntegerField(default=0)),
+                ("waiting", models.IntegerField(default=0)),
+                ("assigned", models.IntegerField(default=0)),
+                ("done", models.IntegerField(default=0)),
+                (
+                    "benefactor",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="task_stats",
+                        serialize=False,
+                        to="charities.benefactor",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="CharityTaskStats",
+            fields=[
+                ("pending", models.IntegerField(default=0)),
+                ("waiting", models.IntegerField(default=0)),
+                ("assigned", models.IntegerField(default=0)),
+                ("done", models.IntegerField(default=0)),
+                (
+                    "charity",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="task_stats",
+                        serialize=False,
+                        to="charities.charity",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RunPython(count_existing_tasks, migrations.RunPython.noop),
+    ]
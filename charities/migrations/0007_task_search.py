@@ -0,0 +1,67 @@
+from django.db import migrations
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE charities_task_fts USING fts5(
+        title, description,
+        content='charities_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER charities_task_fts_insert AFTER INSERT ON charities_task
+    BEGIN
+        INSERT INTO charities_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER charities_task_fts_delete AFTER DELETE ON charities_task
+    BEGIN
+        INSERT INTO charities_task_fts(charities_task_fts, rowid, title,
+                                       description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER charities_task_fts_update
+    AFTER UPDATE OF title, description ON charities_task
+    BEGIN
+        INSERT INTO charities_task_fts(charities_task_fts, rowid, title,
+                                       description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO charities_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO charities_task_fts(charities_task_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS charities_task_fts_insert",
+    "DROP TRIGGER IF EXISTS charities_task_fts_delete",
+    "DROP TRIGGER IF EXISTS charities_task_fts_update",
+    "DROP TABLE IF EXISTS charities_task_fts",
+]
+
+
+def run_on_sqlite(statements):
+    def operation(apps, schema_editor):
+        # The index is SQLite's FTS5; other databases search without it.
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0006_task_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0008_task_calendar_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("age_limit_from", models.IntegerField(blank=True, null=True)),
+                ("age_limit_to", models.IntegerField(blank=True, null=True)),
+                ("date", models.DateField(blank=True, null=True)),
+                ("description", models.TextField(blank=True)),
+                (
+                    "gender_limit",
+                    models.CharField(
+                        blank=True,
+                        choices=[("M", "Male"), ("F", "Female")],
+                        max_length=1,
+                        null=True,
+                    ),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("P", "Pending"),
+                            ("W", "Waiting"),
+                            ("A", "Assigned"),
+                            ("D", "Done"),
+                        ],
+                        default="D",
+                        max_length=1,
+                    ),
+                ),
+                ("title", models.CharField(max_length=60)),
+                ("archived_at", models.DateTimeField()),
+                (
+                    "assigned_benefactor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="charities.benefactor",
+                    ),
+                ),
+                (
+                    "charity",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="charities.charity",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["date"], name="archive_date_idx")],
+            },
+        ),
+    ]
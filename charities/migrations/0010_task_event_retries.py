@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0009_task_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskevent",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskevent",
+            name="claimed_by",
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskevent",
+            name="next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="taskevent",
+            index=models.Index(fields=["task_id", "id"], name="event_task_idx"),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+def fts_sql(options=""):
+    # The triggers of 0007 refer to the table by name and keep working.
+    return [
+        "DROP TABLE charities_task_fts",
+        f"""
+        CREATE VIRTUAL TABLE charities_task_fts USING fts5(
+            title, description,
+            content='charities_task', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'{options}
+        )
+        """,
+        "INSERT INTO charities_task_fts(charities_task_fts) VALUES ('rebuild')",
+    ]
+
+
+def run_on_sqlite(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    """
+    Index the 2 and 3 letter prefixes of every word, so that a prefix query
+    reads one doclist rather than merging those of every word it matches.
+    """
+
+    dependencies = [
+        ("charities", "0010_task_event_retries"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(fts_sql(",\n            prefix='2 3'")),
+            run_on_sqlite(fts_sql()),
+        ),
+    ]
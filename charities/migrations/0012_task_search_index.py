@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charities", "0011_task_search_prefixes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskSearchIndex",
+            fields=[
+                (
+                    "task",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="charities.task",
+                    ),
+                ),
+                ("document", models.TextField(db_column="charities_task_fts")),
+            ],
+            options={
+                "db_table": "charities_task_fts",
+                "managed": False,
+            },
+        ),
+    ]
@@ -1,20 +1,100 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
-class TaskManager(models.Manager):
+class TaskQuerySet(models.QuerySet):
+    def transition(self, state, **changes):
+        """
+        Move the matched tasks to ``state`` from the one state that leads
+        to it (see Task.TRANSITIONS) and record a TaskEvent for every moved
+        task in the same transaction. Returns the number of tasks moved.
+        """
+        source = Task.source_state(state)
+        from .feed import touch_task_feeds
+        from .matching import reindex_tasks, unindex_tasks
+        from .schedule import touch_task_weeks
+        from .stats import StatsDelta
+
+        # Read before the transaction starts writing: SQLite cannot upgrade
+        # a read transaction to a write one while another writer waits.
+        candidates = list(self.filter(state=source).values_list(
+            'pk', 'charity_id', 'assigned_benefactor_id', 'date'))
+        if not candidates:
+            return 0
+        new_benefactor = changes.get('assigned_benefactor_id')
+        events, stats = [], StatsDelta()
+        with transaction.atomic(using=self.db):
+            for pk, charity_id, benefactor_id, day in candidates:
+                # Conditional per row on everything read above, so each
+                # event, stats delta and feed touch matches a move this call
+                # made: a task that changed in between (e.g. rejected and
+                # claimed by someone else) is skipped.
+                if not self.model.objects.filter(
+                        pk=pk, state=source, charity_id=charity_id,
+                        assigned_benefactor_id=benefactor_id, date=day,
+                ).update(state=state, **changes):
+                    continue
+                events.append(TaskEvent(
+                    task_id=pk, charity_id=charity_id,
+                    benefactor_id=new_benefactor or benefactor_id,
+                    from_state=source, to_state=state))
+                before = (charity_id, benefactor_id, source)
+                after = (charity_id,
+                         changes.get('assigned_benefactor_id', benefactor_id),
+                         state)
+                stats.remove(*before)
+                stats.add(*after)
+                touch_task_feeds(before, after)
+                touch_task_weeks(day)
+            TaskEvent.objects.using(self.db).bulk_create(events)
+            stats.apply()
+            task_ids = [event.task_id for event in events]
+            if task_ids and source == 'P':
+                unindex_tasks(task_ids)
+            elif task_ids and state == 'P':
+                reindex_tasks(task_ids)
+        return len(events)
+
+
+class RelatedTasksMixin:
+    # Charity.user and Benefactor.user are one-to-one, so the profile ids are
+    # resolved through their unique user_id index instead of joining them in.
     def related_tasks_to_charity(self, user):
-        return self.filter(charity__user=user)
+        charity_ids = Charity.objects.filter(user_id=user.pk).values('pk')
+        return self.filter(charity_id__in=charity_ids)
 
     def related_tasks_to_benefactor(self, user):
-        return self.filter(assigned_benefactor__user=user)
+        benefactor_ids = Benefactor.objects.filter(
+            user_id=user.pk).values('pk')
+        return self.filter(assigned_benefactor_id__in=benefactor_ids)
+
 
+class TaskManager(RelatedTasksMixin,
+                  models.Manager.from_queryset(TaskQuerySet)):
     def all_related_tasks_to_user(self, user):
-        return self.filter(models.Q(charity__user=user) |
-                           models.Q(assigned_benefactor__user=user) |
-                           models.Q(state='P'))
+        # Each branch is served by its own (fk, state) / state index; the
+        # UNION of primary keys avoids the OR that forces a full scan.
+        related_ids = self.related_tasks_to_charity(user).values('pk').union(
+            self.related_tasks_to_benefactor(user).values('pk'),
+            self.filter(state='P').values('pk'),
+        )
+        return self.filter(pk__in=related_ids)
+
+    def related_task_branches(self, roles):
+        """
+        Querysets whose union is all_related_tasks_to_user() for a user with
+        ``roles`` (see accounts.authentication.user_roles): the pending
+        tasks, the charity's and the benefactor's. They may overlap.
+        """
+        branches = [self.filter(state='P')]
+        if roles.charity_id is not None:
+            branches.append(self.filter(charity_id=roles.charity_id))
+        if roles.benefactor_id is not None:
+            branches.append(
+                self.filter(assigned_benefactor_id=roles.benefactor_id))
+        return branches
 
 
 class Benefactor(models.Model):
@@ -37,6 +117,12 @@ class Charity(models.Model):
     name = models.CharField(max_length=50)
     reg_number = models.CharField(max_length=10)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='charity_name_idx'),
+            models.Index(fields=['reg_number'], name='charity_reg_number_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -55,6 +141,14 @@ class Task(models.Model):
         ('A', 'Assigned'),
         ('D', 'Done'),
     )
+    # Allowed moves: pending -> waiting -> assigned -> done, and a rejected
+    # request sends a waiting task back to pending.
+    TRANSITIONS = (
+        ('P', 'W'),
+        ('W', 'A'),
+        ('W', 'P'),
+        ('A', 'D'),
+    )
     assigned_benefactor = models.ForeignKey(
         Benefactor, on_delete=models.SET_NULL, null=True, blank=True)
     charity = models.ForeignKey(Charity, on_delete=models.CASCADE)
@@ -67,5 +161,175 @@ class Task(models.Model):
     state = models.CharField(max_length=1, choices=STATE_CHOICES, default='P')
     title = models.CharField(max_length=60)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'date'], name='task_state_date_idx'),
+            models.Index(fields=['charity', 'state'],
+                         name='task_charity_state_idx'),
+            models.Index(fields=['assigned_benefactor', 'state'],
+                         name='task_benefactor_state_idx'),
+            models.Index(fields=['date', 'id'], name='task_pending_date_idx',
+                         condition=models.Q(state='P')),
+            models.Index(fields=['title'], name='task_title_idx'),
+            models.Index(fields=['date', 'state'], name='task_date_state_idx'),
+            # The feed's branches (related_task_branches) in page order.
+            models.Index(fields=['charity', 'date', 'id'],
+                         name='task_charity_date_idx'),
+            models.Index(fields=['assigned_benefactor', 'date', 'id'],
+                         name='task_benefactor_date_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def source_state(cls, state):
+        """The state a task has to be in to move to ``state``."""
+        if state not in dict(cls.STATE_CHOICES):
+            raise ValueError(f'Unknown task state: {state!r}')
+        sources = [source for source, target in cls.TRANSITIONS
+                   if target == state]
+        if not sources:
+            raise ValueError(f'No transition leads to state {state!r}')
+        return sources[0]
+
+    def transition(self, state, **changes):
+        """
+        Move this task to ``state``; returns False if it was not in the
+        state leading there. The instance is updated on success.
+        """
+        moved = Task.objects.filter(pk=self.pk).transition(state, **changes)
+        if moved:
+            self.state = state
+            for name, value in changes.items():
+                setattr(self, name, value)
+        return bool(moved)
+
+
+class TaskArchiveManager(RelatedTasksMixin, models.Manager):
+    pass
+
+
+class TaskArchive(models.Model):
+    """
+    Done tasks moved out of Task by charities.archive, under the ids they
+    had there (Task ids are never reused). They keep counting in the task
+    stats.
+    """
+    objects = TaskArchiveManager()
+
+    assigned_benefactor = models.ForeignKey(
+        Benefactor, on_delete=models.SET_NULL, null=True, blank=True)
+    charity = models.ForeignKey(Charity, on_delete=models.CASCADE)
+    age_limit_from = models.IntegerField(blank=True, null=True)
+    age_limit_to = models.IntegerField(blank=True, null=True)
+    date = models.DateField(blank=True, null=True)
+    description = models.TextField(blank=True)
+    gender_limit = models.CharField(
+        max_length=1, choices=Task.GENDER_CHOICES, blank=True, null=True)
+    state = models.CharField(
+        max_length=1, choices=Task.STATE_CHOICES, default='D')
+    title = models.CharField(max_length=60)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='archive_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class TaskSearchIndex(models.Model):
+    """
+    The FTS5 index of task titles and descriptions, one row per task by
+    rowid, kept in sync by the triggers of migration 0007 (SQLite only).
+    ``document`` is the hidden column named after the table, which MATCH
+    and bm25() take; charities.search joins it to Task.
+    """
+    task = models.OneToOneField(
+        Task, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', related_name='search_index')
+    document = models.TextField(db_column='charities_task_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'charities_task_fts'
+
+
+class TaskEligibility(models.Model):
+    """
+    Lookup rows for pending tasks, one per (gender, age band) bucket the
+    task is open to. Maintained by charities.matching.
+    """
+    ANY_GENDER = '*'
+    ANY_AGE = -1
+
+    task = models.ForeignKey(
+        Task, on_delete=models.CASCADE, related_name='eligibility')
+    gender = models.CharField(max_length=1)
+    age_band = models.SmallIntegerField()
+    date = models.DateField(blank=True, null=True)
+    age_limit_from = models.IntegerField(blank=True, null=True)
+    age_limit_to = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['gender', 'age_band', 'date', 'task'],
+                         name='eligibility_bucket_idx'),
+        ]
+
+
+class TaskEvent(models.Model):
+    """
+    Outbox row for a task state change, written in the transaction that
+    made the change and handed to settings.TASK_EVENT_HANDLERS by the
+    process_task_events worker, which deletes it once handled.
+    """
+    # No foreign keys: the events outlive deleted tasks and profiles.
+    task_id = models.BigIntegerField()
+    charity_id = models.BigIntegerField()
+    benefactor_id = models.BigIntegerField(blank=True, null=True)
+    from_state = models.CharField(max_length=1, choices=Task.STATE_CHOICES)
+    to_state = models.CharField(max_length=1, choices=Task.STATE_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Set by the worker delivering the event, see charities.events.
+    claimed_by = models.UUIDField(blank=True, null=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    # When a failed event may be retried.
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task_id', 'id'], name='event_task_idx'),
+        ]
+
+    def __str__(self):
+        return f'task {self.task_id}: {self.from_state} -> {self.to_state}'
+
+
+class TaskStats(models.Model):
+    """Number of tasks in each state, kept by charities.stats."""
+    pending = models.IntegerField(default=0)
+    waiting = models.IntegerField(default=0)
+    assigned = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class CharityTaskStats(TaskStats):
+    charity = models.OneToOneField(
+        Charity, on_delete=models.CASCADE, primary_key=True,
+        related_name='task_stats')
+
+
+class BenefactorTaskStats(TaskStats):
+    """Tasks assigned to the benefactor; ``pending`` is always 0."""
+    benefactor = models.OneToOneField(
+        Benefactor, on_delete=models.CASCADE, primary_key=True,
+        related_name='task_stats')
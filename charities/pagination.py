@@ -0,0 +1,147 @@
+import heapq
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date
+
+from django.db.models import F, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def requested_limit(query_params, default, maximum, param='limit'):
+    """?limit= of an unpaginated listing, clamped to [1, maximum]."""
+    try:
+        limit = int(query_params.get(param, default))
+    except ValueError:
+        return default
+    return min(max(limit, 1), maximum)
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    Keyset pagination over (date, id).
+
+    The cursor holds the (date, id) of the last row on the page, so every
+    page is a range scan from that key instead of an OFFSET. Tasks without
+    a date sort first on every backend.
+
+    A list of querysets is paged as their union without building it: each
+    is read from the cursor up to a page, in (date, id) order from an index
+    that ends in those columns, and the pages are merged, tasks that several
+    of them hold coming once. A page then costs the same however many tasks
+    the querysets hold.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    ordering = (F('date').asc(nulls_first=True), F('id').asc())
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(self.merge(
+            [list(page) for page in self.page_querysets(queryset, request)]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page(self.merge(
+            [[row async for row in page]
+             for page in self.page_querysets(queryset, request)]))
+
+    def page_querysets(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        position = self.decode_cursor(request)
+        querysets = [queryset] if isinstance(queryset, QuerySet) else queryset
+        return [self.page_queryset(queryset, position)
+                for queryset in querysets]
+
+    def page_queryset(self, queryset, position):
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(*position))
+        # Fetch one extra row to know whether a next page exists.
+        return queryset[:self.page_size + 1]
+
+    def merge(self, pages):
+        if len(pages) == 1:
+            return pages[0]
+        results, seen = [], set()
+        for row in heapq.merge(*pages, key=self.position):
+            if row.pk not in seen:
+                seen.add(row.pk)
+                results.append(row)
+                if len(results) > self.page_size:
+                    break
+        return results
+
+    def position(self, row):
+        """Sort key of ``row`` in the pages' order."""
+        return row.date is not None, row.date or date.min, row.pk
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def after(self, last_date, last_id):
+        if last_date is None:
+            return (Q(date__isnull=True, id__gt=last_id) |
+                    Q(date__isnull=False))
+        # The date__gte term is what an index on (..., date, id) seeks to.
+        return Q(date__gte=last_date) & (
+            Q(date__gt=last_date) | Q(id__gt=last_id))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            self.encode_cursor(last.date, last.id))
+
+    def encode_cursor(self, last_date, last_id):
+        payload = [last_date.isoformat() if last_date else None, last_id]
+        return b64encode(json.dumps(payload).encode('ascii'),
+                         altchars=b'-_').decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            last_date, last_id = json.loads(
+                b64decode(encoded.encode('ascii'), altchars=b'-_'))
+            if last_date is not None:
+                last_date = date.fromisoformat(last_date)
+            return last_date, int(last_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
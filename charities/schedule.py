@@ -0,0 +1,138 @@
+"""
+Week-bucketed task calendar (GET /tasks/calendar/).
+
+Tasks are cached per ISO week (Monday to Sunday): a bucket holds every
+dated task of the week, whoever may see it, archived or not, and is read
+with one range scan of the (date, state) index and one of the archive's
+date index. Each week has a version counter in the
+cache, bumped after any transaction that changes a task dated in it
+commits; buckets are stored under their week's version, so a change only
+ever invalidates the weeks it touched, and a bucket filled from a read that
+raced a write is never served once the write commits. Buckets are read from
+the primary (charity.db.primary_reads), as a replica may not have the write
+yet when its version is bumped. Callers filter the buckets down to the
+tasks they may see.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from charity.db import primary_reads
+
+from .archive import task_history
+from .feed import bump_versions, feed_cache, new_versions
+
+WEEK_CACHE_TIMEOUT = 60 * 60
+# Buckets hold tuples of these fields, which pickle much smaller than dicts.
+CALENDAR_FIELDS = ('id', 'title', 'state', 'date', 'charity',
+                   'assigned_benefactor')
+STATE, DATE, CHARITY, BENEFACTOR = 2, 3, 4, 5
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def week_version_key(monday):
+    return f'charities:calendar:week:{monday.isoformat()}'
+
+
+def week_bucket_key(monday, version):
+    return f'charities:calendar:bucket:{monday.isoformat()}:{version}'
+
+
+def weeks(start, end):
+    """The Mondays of the weeks that overlap [start, end]."""
+    monday = week_start(start)
+    while monday <= end:
+        yield monday
+        monday += timedelta(days=7)
+
+
+def week_versions(mondays):
+    cache = feed_cache()
+    keys = [week_version_key(monday) for monday in mondays]
+    versions = cache.get_many(keys)
+    missing = new_versions(keys, versions)
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {monday: versions[key] for monday, key in zip(mondays, keys)}
+
+
+def load_weeks(mondays):
+    """Task rows of the weeks starting on ``mondays``, by week, from the DB."""
+    buckets = {monday: [] for monday in mondays}
+    # One range scan from the first to the last week; rows of weeks in
+    # between that were not asked for are dropped.
+    # Archived tasks included: archiving leaves the weeks as they were.
+    rows = task_history(lambda tasks: tasks.filter(
+        date__gte=mondays[0], date__lt=mondays[-1] + timedelta(days=7),
+    ), *CALENDAR_FIELDS).order_by('date', 'id')
+    with primary_reads():
+        for row in rows:
+            bucket = buckets.get(week_start(row[DATE]))
+            if bucket is not None:
+                bucket.append(row)
+    return buckets
+
+
+def week_buckets(start, end):
+    """{monday: [task row, ...]} for the weeks overlapping [start, end]."""
+    cache = feed_cache()
+    versions = week_versions(list(weeks(start, end)))
+    keys = {monday: week_bucket_key(monday, version)
+            for monday, version in versions.items()}
+    found = cache.get_many(keys.values())
+    buckets = {monday: found[key] for monday, key in keys.items()
+               if key in found}
+    missing = sorted(keys.keys() - buckets.keys())
+    if missing:
+        loaded = load_weeks(missing)
+        cache.set_many({keys[monday]: rows for monday, rows in loaded.items()},
+                       WEEK_CACHE_TIMEOUT)
+        buckets.update(loaded)
+    return dict(sorted(buckets.items()))
+
+
+def visible(row, roles):
+    """Whether the caller sees the task, as in all_related_tasks_to_user."""
+    return (row[STATE] == 'P'
+            or (roles.charity_id is not None
+                and row[CHARITY] == roles.charity_id)
+            or (roles.benefactor_id is not None
+                and row[BENEFACTOR] == roles.benefactor_id))
+
+
+def task_calendar(roles, start, end, group='day', state=None):
+    """
+    The caller's tasks dated in [start, end] as [{'start': date, 'end':
+    date, 'tasks': [{field: value}, ...]}, ...], one entry per day or week
+    that has tasks, in date order.
+    """
+    grouped = {}
+    for rows in week_buckets(start, end).values():
+        for row in rows:
+            if not start <= row[DATE] <= end:
+                continue
+            if state is not None and row[STATE] != state:
+                continue
+            if not visible(row, roles):
+                continue
+            key = row[DATE] if group == 'day' else week_start(row[DATE])
+            grouped.setdefault(key, []).append(
+                dict(zip(CALENDAR_FIELDS, row)))
+    length = timedelta(days=0 if group == 'day' else 6)
+    return [{'start': key, 'end': key + length, 'tasks': rows}
+            for key, rows in grouped.items()]
+
+
+def touch_task_weeks(*dates):
+    """
+    Invalidate the calendar weeks of ``dates`` (task dates before and after
+    a change; None is ignored) once the current transaction commits.
+    """
+    keys = {week_version_key(week_start(day)) for day in dates
+            if day is not None}
+    if keys:
+        transaction.on_commit(lambda: bump_versions(keys))
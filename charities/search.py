@@ -0,0 +1,101 @@
+"""
+Full-text search over task titles and descriptions.
+
+A backend narrows a Task queryset to the tasks matching a query and orders
+them by relevance, so it composes with any other filter (TaskManager
+scopes, states, eligibility). settings.TASK_SEARCH_BACKEND picks the
+backend; by default SQLite databases use the FTS5 index that the 0007
+migration keeps in sync with triggers, and other databases fall back to
+substring matching until they get a backend of their own.
+
+Queries are lists of words; a word ending in '*' matches as a prefix.
+Every word has to match.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import (
+    Case, F, FloatField, Func, IntegerField, Lookup, Q, Value, When
+)
+from django.utils.module_loading import import_string
+
+from .models import TaskSearchIndex
+
+MAX_TERMS = 10
+TERM_RE = re.compile(r'(\w+)(\*?)')
+
+
+def parse_query(text):
+    """The (word, is_prefix) terms of a user query."""
+    return [(word.lower(), bool(star))
+            for word, star in TERM_RE.findall(text)][:MAX_TERMS]
+
+
+class TaskSearchBackend:
+    def search(self, queryset, terms):
+        """Tasks of ``queryset`` matching ``terms``, best matches first."""
+        raise NotImplementedError
+
+
+class Match(Lookup):
+    """``document__match=query``: the FTS5 MATCH operator."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+TaskSearchIndex._meta.get_field('document').register_lookup(Match)
+
+
+class SQLiteFTS5Backend(TaskSearchBackend):
+    # bm25() weights of the indexed columns: title, description.
+    weights = (10.0, 1.0)
+
+    def match_expression(self, terms):
+        # Words are \w+ only, so quoting them leaves no FTS5 syntax to inject.
+        return ' '.join(f'"{word}"' + ('*' if prefix else '')
+                        for word, prefix in terms)
+
+    def search(self, queryset, terms):
+        # One join with the index: the full-text query runs once and drives
+        # the plan, each match costing a primary key lookup in the tasks.
+        rank = Func(F('search_index__document'), *map(Value, self.weights),
+                    function='bm25', output_field=FloatField())
+        return queryset.filter(
+            search_index__document__match=self.match_expression(terms),
+        ).annotate(search_rank=rank).order_by('search_rank', 'id')
+
+
+class ContainsBackend(TaskSearchBackend):
+    """Unindexed substring matching; title matches rank first."""
+
+    def search(self, queryset, terms):
+        title_hits = []
+        for word, _ in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=word) | Q(description__icontains=word))
+            title_hits.append(When(title__icontains=word, then=Value(-1)))
+        return queryset.annotate(search_rank=Case(
+            *title_hits, default=Value(0), output_field=IntegerField(),
+        )).order_by('search_rank', 'id')
+
+
+def search_backend(using='default'):
+    path = getattr(settings, 'TASK_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connections[using].vendor == 'sqlite':
+        return SQLiteFTS5Backend()
+    return ContainsBackend()
+
+
+def search_tasks(queryset, text):
+    """``queryset`` filtered by the query ``text``; empty for no words."""
+    terms = parse_query(text)
+    if not terms:
+        return queryset.none()
+    return search_backend(queryset.db).search(queryset, terms)
@@ -0,0 +1,105 @@
+"""
+Synthetic data for benchmarks and local load testing.
+
+seed() bulk-creates users, their charity and benefactor profiles and any
+number of tasks, streaming the tasks in batches so millions of them fit in
+memory. Every user gets the same password hash, computed once. Tasks go to
+charities with a Zipf-like skew (a few charities own most tasks), their
+states follow ``state_weights`` and a share of them carry gender, age or
+date limits. Everything is reproducible from ``seed``.
+
+bulk_create sends no signals: callers that need the eligibility index or
+the task stats rebuild them afterwards (see the seed command).
+"""
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+
+from accounts.models import User
+
+from .models import Benefactor, Charity, Task
+
+DEFAULT_STATE_WEIGHTS = {'P': 4, 'W': 1, 'A': 2, 'D': 3}
+FIRST_NAMES = ('Ali', 'Sara', 'Reza', 'Maryam', 'Hossein', 'Zahra', 'Amir',
+               'Fatemeh', 'Mohammad', 'Neda', 'Kian', 'Leila')
+LAST_NAMES = ('Ahmadi', 'Hosseini', 'Karimi', 'Moradi', 'Rezaei', 'Jafari',
+              'Mohammadi', 'Sadeghi', 'Rahimi', 'Kazemi')
+TASK_WORDS = ('food', 'drive', 'library', 'books', 'garden', 'cleanup',
+              'tutoring', 'math', 'elderly', 'visit', 'shelter', 'animals',
+              'clothes', 'donation', 'sorting', 'painting', 'school',
+              'hospital', 'reading', 'delivery', 'kitchen', 'park', 'river',
+              'trees', 'planting', 'computer', 'lessons', 'winter', 'coats')
+
+
+def seed(charities, benefactors, tasks, *, state_weights=None,
+         charity_skew=1.0, gender_limit_ratio=0.3, age_limit_ratio=0.5,
+         undated_ratio=0.1, days=3 * 365, start=date(2024, 1, 1),
+         vocabulary=TASK_WORDS, password=None, prefix='seed',
+         batch_size=5000, seed=0, progress=None):
+    """
+    Create ``charities`` + ``benefactors`` users and profiles and ``tasks``
+    tasks. Returns (users, charities, benefactors); the tasks are not kept.
+    ``progress`` is called with the number of tasks created so far.
+    """
+    rng = random.Random(seed)
+    state_weights = state_weights or DEFAULT_STATE_WEIGHTS
+    password = make_password(password)
+
+    users = User.objects.bulk_create(
+        [User(username=f'{prefix}_{i}', password=password,
+              first_name=rng.choice(FIRST_NAMES),
+              last_name=rng.choice(LAST_NAMES),
+              gender=rng.choice('MF'), age=rng.randrange(16, 70))
+         for i in range(charities + benefactors)],
+        batch_size=batch_size)
+    charity_rows = Charity.objects.bulk_create(
+        [Charity(user=user, name=f'{user.last_name} foundation {i}',
+                 reg_number=f'{i:010d}')
+         for i, user in enumerate(users[:charities])],
+        batch_size=batch_size)
+    benefactor_rows = Benefactor.objects.bulk_create(
+        [Benefactor(user=user, experience=rng.randrange(3),
+                    free_time_per_week=rng.randrange(20))
+         for user in users[charities:]],
+        batch_size=batch_size)
+
+    if tasks and not charity_rows:
+        raise ValueError('Tasks need at least one charity.')
+    charity_weights = list(accumulate(
+        1 / (rank + 1) ** charity_skew for rank in range(len(charity_rows))))
+    states = list(state_weights)
+    state_weights = list(accumulate(state_weights[s] for s in states))
+
+    for offset in range(0, tasks, batch_size):
+        count = min(batch_size, tasks - offset)
+        owners = rng.choices(charity_rows, cum_weights=charity_weights,
+                             k=count)
+        batch_states = rng.choices(states, cum_weights=state_weights, k=count)
+        batch = []
+        for charity, state in zip(owners, batch_states):
+            age_from = age_to = None
+            if rng.random() < age_limit_ratio:
+                age_from = rng.randrange(16, 50)
+                age_to = age_from + rng.randrange(10, 30)
+            assigned = None
+            if state != 'P' and benefactor_rows:
+                assigned = rng.choice(benefactor_rows)
+            batch.append(Task(
+                title=' '.join(rng.choices(vocabulary, k=3)),
+                description=' '.join(rng.choices(vocabulary, k=20)),
+                charity=charity,
+                assigned_benefactor=assigned,
+                state=state if assigned or state == 'P' else 'P',
+                date=(None if rng.random() < undated_ratio
+                      else start + timedelta(days=rng.randrange(days))),
+                gender_limit=(rng.choice('MF')
+                              if rng.random() < gender_limit_ratio else None),
+                age_limit_from=age_from,
+                age_limit_to=age_to,
+            ))
+        Task.objects.bulk_create(batch)
+        if progress:
+            progress(offset + count)
+    return users, charity_rows, benefactor_rows
@@ -1,16 +1,67 @@
+from django.db import transaction
 from rest_framework import serializers
 
+from charity.metrics import TimedSerializerMixin
+
+from .feed import touch_task_feeds
+from .matching import index_tasks
 from .models import Benefactor
 from .models import Charity, Task
+from .schedule import touch_task_weeks
+from .stats import StatsDelta
 
 
 class BenefactorSerializer(serializers.ModelSerializer):
-    pass
+    class Meta:
+        model = Benefactor
+        fields = ('experience', 'free_time_per_week')
 
 
 class CharitySerializer(serializers.ModelSerializer):
-    pass
+    class Meta:
+        model = Charity
+        fields = ('name', 'reg_number')
+
+
+class TaskListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    batch_size = 1000
+
+    def create(self, validated_data):
+        tasks = [Task(**attrs) for attrs in validated_data]
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+            # bulk_create sends no post_save, so index and count the batch
+            # and refresh the feeds and calendar weeks here.
+            index_tasks(tasks)
+            delta = StatsDelta()
+            delta.add_tasks(tasks)
+            delta.apply()
+            touch_task_feeds(*{
+                (task.charity_id, task.assigned_benefactor_id, task.state)
+                for task in tasks})
+            touch_task_weeks(*{task.date for task in tasks})
+        return tasks
+
+
+class TaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ('id', 'title', 'state', 'charity', 'description',
+                  'assigned_benefactor', 'date', 'age_limit_from',
+                  'age_limit_to', 'gender_limit')
+        read_only_fields = ('assigned_benefactor', 'charity', 'state')
+        list_serializer_class = TaskListSerializer
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
-class TaskSerializer(serializers.ModelSerializer):
-    pass
+    def validate(self, attrs):
+        age_from = attrs.get('age_limit_from')
+        age_to = attrs.get('age_limit_to')
+        if age_from is not None and age_to is not None and age_from > age_to:
+            raise serializers.ValidationError(
+                {'age_limit_to': 'Must not be less than age_limit_from.'})
+        return attrs
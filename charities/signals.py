@@ -0,0 +1,74 @@
+from django.core.signals import setting_changed
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .feed import touch_task_feeds
+from .matching import index_tasks
+from .models import Benefactor, Task
+from .schedule import touch_task_weeks
+from .stats import StatsDelta
+from .throttling import buckets
+
+
+@receiver(post_save, sender=Task)
+def index_saved_task(sender, instance, **kwargs):
+    index_tasks([instance])
+
+
+@receiver(pre_save, sender=Task)
+def remember_counted_task(sender, instance, raw=False, **kwargs):
+    # The counts and calendar week the task had before this save, if it
+    # existed.
+    instance._counted_as = instance._dated_as = None
+    if not raw and not instance._state.adding:
+        row = Task.objects.filter(pk=instance.pk).values_list(
+            'charity_id', 'assigned_benefactor_id', 'state', 'date').first()
+        if row is not None:
+            instance._counted_as, instance._dated_as = row[:3], row[3]
+
+
+@receiver(post_save, sender=Task)
+def record_saved_task(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    placement = (instance.charity_id, instance.assigned_benefactor_id,
+                 instance.state)
+    delta = StatsDelta()
+    counted_as = getattr(instance, '_counted_as', None)
+    if counted_as is not None:
+        delta.remove(*counted_as)
+        touch_task_feeds(counted_as)
+    delta.add(*placement)
+    delta.apply()
+    touch_task_feeds(placement)
+    touch_task_weeks(getattr(instance, '_dated_as', None), instance.date)
+
+
+@receiver(post_delete, sender=Task)
+def record_deleted_task(sender, instance, **kwargs):
+    placement = (instance.charity_id, instance.assigned_benefactor_id,
+                 instance.state)
+    delta = StatsDelta()
+    delta.remove(*placement)
+    delta.apply()
+    touch_task_feeds(placement)
+    touch_task_weeks(instance.date)
+
+
+@receiver(pre_delete, sender=Benefactor)
+def touch_unassigned_tasks(sender, instance, **kwargs):
+    # Deleting a benefactor unassigns its tasks with an UPDATE that sends
+    # no Task signals.
+    tasks = list(Task.objects.filter(assigned_benefactor=instance).values_list(
+        'charity_id', 'assigned_benefactor_id', 'state', 'date'))
+    touch_task_feeds(*(task[:3] for task in tasks))
+    touch_task_weeks(*(task[3] for task in tasks))
+
+
+@receiver(setting_changed)
+def reset_throttles(sender, setting, **kwargs):
+    # Buckets are sized by the limits they were made with.
+    if setting == 'TASK_WRITE_THROTTLES':
+        buckets.clear()
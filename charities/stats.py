@@ -0,0 +1,143 @@
+"""
+Materialized task counts per charity and per benefactor.
+
+Every task counts once towards its charity's row for its state and, while
+it has an assigned benefactor, once towards that benefactor's row. Writers
+describe what they changed with a StatsDelta (tasks removed from and added
+to the counts) and apply it in their transaction: bulk task creation,
+Task.transition() and the Task save/delete signals. Archived tasks
+(charities.archive) keep counting. rebuild() recomputes everything from
+Task and TaskArchive and inconsistencies() compares the two.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import BenefactorTaskStats, CharityTaskStats, Task, TaskArchive
+
+STATE_FIELDS = {
+    'P': 'pending',
+    'W': 'waiting',
+    'A': 'assigned',
+    'D': 'done',
+}
+COUNT_FIELDS = tuple(STATE_FIELDS.values())
+# Rows per UPDATE when many rows change by the same amounts.
+APPLY_BATCH_SIZE = 500
+
+
+class StatsDelta:
+    def __init__(self):
+        self.changes = defaultdict(Counter)
+
+    def add(self, charity_id, benefactor_id, state, sign=1):
+        field = STATE_FIELDS[state]
+        self.changes[CharityTaskStats, charity_id][field] += sign
+        if benefactor_id is not None:
+            self.changes[BenefactorTaskStats, benefactor_id][field] += sign
+
+    def remove(self, charity_id, benefactor_id, state):
+        self.add(charity_id, benefactor_id, state, sign=-1)
+
+    def add_tasks(self, tasks):
+        for task in tasks:
+            self.add(task.charity_id, task.assigned_benefactor_id, task.state)
+
+    def apply(self):
+        changes = {key: {field: delta for field, delta in counts.items()
+                         if delta}
+                   for key, counts in self.changes.items()}
+        changes = {key: counts for key, counts in changes.items() if counts}
+        # Sorted, so concurrent writers lock the rows in the same order.
+        keys = sorted(changes, key=lambda key: (key[0].__name__, key[1]))
+        # Rows that only lose tasks exist already; not recreating them also
+        # keeps a cascading charity delete from reviving its row. Each
+        # statement is safe on its own, so no transaction of its own is
+        # needed: callers that change tasks already run in one.
+        for model in (CharityTaskStats, BenefactorTaskStats):
+            missing = [model(pk=pk) for key_model, pk in keys
+                       if key_model is model
+                       and max(changes[model, pk].values()) > 0]
+            if missing:
+                model.objects.bulk_create(missing, ignore_conflicts=True)
+        # Rows that change by the same amounts share an UPDATE, so a batch
+        # touching thousands of benefactors needs a handful of statements.
+        groups = defaultdict(list)
+        for model, pk in keys:
+            groups[model, tuple(sorted(changes[model, pk].items()))].append(pk)
+        for (model, deltas), pks in groups.items():
+            for start in range(0, len(pks), APPLY_BATCH_SIZE):
+                model.objects.filter(
+                    pk__in=pks[start:start + APPLY_BATCH_SIZE],
+                ).update(**{field: F(field) + delta
+                            for field, delta in deltas})
+        self.changes.clear()
+
+
+def aggregate():
+    """Counts from Task and TaskArchive: {(model, pk): {field: count}}."""
+    counts = defaultdict(Counter)
+    for model in (Task, TaskArchive):
+        by_charity = model.objects.values_list(
+            'charity_id', 'state').annotate(count=Count('id')).order_by()
+        for charity_id, state, count in by_charity:
+            counts[CharityTaskStats, charity_id][STATE_FIELDS[state]] += count
+        by_benefactor = model.objects.filter(
+            assigned_benefactor__isnull=False,
+        ).values_list('assigned_benefactor_id', 'state').annotate(
+            count=Count('id')).order_by()
+        for benefactor_id, state, count in by_benefactor:
+            counts[BenefactorTaskStats, benefactor_id][
+                STATE_FIELDS[state]] += count
+    return counts
+
+
+def stored():
+    counts = {}
+    for model in (CharityTaskStats, BenefactorTaskStats):
+        for pk, *values in model.objects.values_list('pk', *COUNT_FIELDS):
+            counts[model, pk] = dict(zip(COUNT_FIELDS, values))
+    return counts
+
+
+def rebuild(batch_size=5000):
+    counts = aggregate()
+    with transaction.atomic():
+        for model in (CharityTaskStats, BenefactorTaskStats):
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                [model(pk=pk, **fields)
+                 for (key_model, pk), fields in counts.items()
+                 if key_model is model],
+                batch_size=batch_size)
+
+
+def inconsistencies():
+    """
+    (model name, pk, field, stored, actual) for every counter that differs
+    from a fresh aggregate. Missing rows count as zeros.
+    """
+    actual, current = aggregate(), stored()
+    found = []
+    for model, pk in sorted(actual.keys() | current.keys(),
+                            key=lambda key: (key[0].__name__, key[1])):
+        for field in COUNT_FIELDS:
+            have = current.get((model, pk), {}).get(field, 0)
+            want = actual.get((model, pk), {}).get(field, 0)
+            if have != want:
+                found.append((model.__name__, pk, field, have, want))
+    return found
+
+
+def task_stats(charity_id=None, benefactor_id=None):
+    """The stored counters of one charity and/or benefactor, by primary key."""
+    result = {}
+    for name, model, pk in (('charity', CharityTaskStats, charity_id),
+                            ('benefactor', BenefactorTaskStats, benefactor_id)):
+        if pk is None:
+            result[name] = None
+            continue
+        counts = model.objects.filter(pk=pk).values(*COUNT_FIELDS).first()
+        result[name] = counts or dict.fromkeys(COUNT_FIELDS, 0)
+    return result
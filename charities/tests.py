@@ -1,3 +1,1177 @@
-from django.test import TestCase
+import tempfile
+import time
+import uuid
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import (
+    APIClient, APIRequestFactory, force_authenticate
+)
+
+from accounts.models import User
+from charities.admin import estimated_row_count
+from charities.async_views import task_feed
+from charities.events import (
+    CLAIM_TIMEOUT, MAX_ATTEMPTS, RETRY_DELAY, drain, retry_at
+)
+from charities.feed import charity_scope_key
+from charities.models import (
+    Benefactor, Charity, CharityTaskStats, Task, TaskArchive,
+    TaskEligibility, TaskEvent
+)
+from charities.pagination import requested_limit
+from charities.search import search_tasks
+from charities.stats import inconsistencies, task_stats
+from charities.throttling import TokenBuckets, buckets
+from charities.views import TaskRequest
+
+
+class TaskListPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='owner', password='9')
+        cls.charity = Charity.objects.create(
+            user=cls.user, name='charity', reg_number='1234567890')
+        Task.objects.bulk_create(
+            [Task(title=f'task{i}', charity=cls.charity,
+                  date=date(2023, 1, 1) + timedelta(days=i % 3))
+             for i in range(7)] +
+            [Task(title='undated', charity=cls.charity)])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_limits_are_clamped(self):
+        for value, limit in (('5', 5), ('0', 1), ('-3', 1), ('500', 100),
+                             ('x', 20), ('', 20)):
+            self.assertEqual(requested_limit({'limit': value}, 20, 100),
+                             limit)
+        self.assertEqual(requested_limit({}, 20, 100), 20)
+
+    def test_cursor_walks_every_task_once_in_key_order(self):
+        url, seen = '/tasks/?page_size=3', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(response.data['results'])
+            url = response.data['next']
+        expected = Task.objects.order_by('date', 'id')
+        self.assertEqual([row['id'] for row in seen],
+                         [task.id for task in expected])
+
+    def test_fields_projection(self):
+        response = self.client.get('/tasks/?fields=id,title')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+    def test_unknown_field_and_bad_cursor_are_rejected(self):
+        self.assertEqual(
+            self.client.get('/tasks/?fields=password').status_code, 400)
+        self.assertEqual(
+            self.client.get('/tasks/?cursor=garbage').status_code, 404)
+
+    def test_page_queries_do_not_depend_on_offset(self):
+        first = self.client.get('/tasks/?page_size=2')
+        # One keyset query per branch of the feed (pending, the charity's),
+        # each read in page order from an index, whatever the table size.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        self.assertEqual(len(queries), 2)
+        with connection.cursor() as cursor:
+            for query in queries:
+                self.assertIn('LIMIT 3', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'])
+                cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+                self.assertNotIn('TEMP B-TREE', plan)
+                self.assertIn('USING INDEX', plan)
+
+
+class AsyncTaskFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='owner')
+        cls.token = Token.objects.create(user=cls.user)
+        charity = Charity.objects.create(
+            user=cls.user, name='charity', reg_number='1234567890')
+        Task.objects.bulk_create(
+            [Task(title=f'task{i}', charity=charity,
+                  date=date(2023, 1, 1) + timedelta(days=i % 2))
+             for i in range(5)])
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, path, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        request = RequestFactory().get(path, **headers)
+        return async_to_sync(task_feed)(request)
+
+    def test_async_feed_answers_like_the_sync_view(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for path in ('/tasks/?page_size=3&fields=id,title,date',
+                     '/tasks/?fields=password', '/tasks/?cursor=garbage'):
+            expected = client.get(path)
+            response = self.get(path, self.token.key)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertJSONEqual(response.content, expected.data)
+
+    def test_async_feed_requires_a_token(self):
+        self.assertEqual(self.get('/tasks/').status_code, 401)
+        self.assertEqual(self.get('/tasks/', 'nope').status_code, 401)
+
+    def test_async_feed_answers_conditional_gets(self):
+        etag = self.get('/tasks/', self.token.key)['ETag']
+        request = RequestFactory().get(
+            '/tasks/', HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            HTTP_IF_NONE_MATCH=etag)
+        with self.assertNumQueries(0):
+            response = async_to_sync(task_feed)(request)
+        self.assertEqual(response.status_code, 304)
+
+
+class TaskFeedCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(username='owner')
+        self.charity = Charity.objects.create(
+            user=self.owner, name='charity', reg_number='1')
+        self.task = Task.objects.create(title='task', charity=self.charity)
+        self.benefactor = Benefactor.objects.create(
+            user=User.objects.create(username='benefactor'))
+        self.other_benefactor = Benefactor.objects.create(
+            user=User.objects.create(username='other'))
+        other_owner = User.objects.create(username='other owner')
+        Charity.objects.create(user=other_owner, name='other', reg_number='2')
+        self.clients = {}
+        for name, user in (('owner', self.owner),
+                           ('benefactor', self.benefactor.user),
+                           ('other benefactor', self.other_benefactor.user),
+                           ('other owner', other_owner)):
+            client = APIClient()
+            client.force_authenticate(user)
+            self.clients[name] = client
+        self.etags = {name: self.feed(name)['ETag'] for name in self.clients}
+
+    def feed(self, name, **headers):
+        return self.clients[name].get('/tasks/', **headers)
+
+    def changed_feeds(self):
+        """Names of the clients whose ETag no longer matches; updates them."""
+        changed = set()
+        for name, client in self.clients.items():
+            response = self.feed(name, HTTP_IF_NONE_MATCH=self.etags[name])
+            if response.status_code == 200:
+                changed.add(name)
+                self.etags[name] = response['ETag']
+            else:
+                self.assertEqual(response.status_code, 304)
+        return changed
+
+    def act(self, client, action, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.clients[client].post(
+                f'/tasks/{self.task.id}/{action}/', data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_feed_is_answered_without_touching_tasks(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.feed('owner').status_code, 200)
+            not_modified = self.feed(
+                'owner', HTTP_IF_NONE_MATCH=self.etags['owner'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertFalse([query for query in queries
+                          if 'charities_task' in query['sql']])
+
+    def test_every_transition_invalidates_exactly_the_affected_feeds(self):
+        everyone = set(self.clients)
+        steps = [
+            ('benefactor', 'request', None, everyone),
+            ('owner', 'response', {'response': 'R'}, everyone),
+            ('benefactor', 'request', None, everyone),
+            ('owner', 'response', {'response': 'A'},
+             {'owner', 'benefactor'}),
+            ('owner', 'done', None, {'owner', 'benefactor'}),
+        ]
+        for client, action, data, affected in steps:
+            with self.subTest(action=action, data=data):
+                self.act(client, action, data)
+                self.assertEqual(self.changed_feeds(), affected)
+
+    def test_edits_creates_and_deletes_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clients['owner'].post('/tasks/', {'title': 'new'})
+        self.assertEqual(self.changed_feeds(), set(self.clients))
+        self.task.transition('W', assigned_benefactor_id=self.benefactor.pk)
+        self.changed_feeds()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.title = 'renamed'
+            self.task.save()
+        self.assertEqual(self.changed_feeds(), {'owner', 'benefactor'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.benefactor.delete()
+        self.assertIn('owner', self.changed_feeds())
+
+
+class TaskCalendarTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(username='owner')
+        self.charity = Charity.objects.create(
+            user=self.owner, name='charity', reg_number='1')
+        self.benefactor = Benefactor.objects.create(
+            user=User.objects.create(username='benefactor'))
+        # 2024-01-01 is a Monday.
+        self.monday = date(2024, 1, 1)
+        self.tasks = Task.objects.bulk_create([
+            Task(title='monday', charity=self.charity, date=self.monday),
+            Task(title='wednesday', charity=self.charity,
+                 date=self.monday + timedelta(days=2)),
+            Task(title='next week', charity=self.charity,
+                 date=self.monday + timedelta(days=8)),
+            Task(title='done', charity=self.charity, state='D',
+                 date=self.monday + timedelta(days=2)),
+            Task(title='undated', charity=self.charity),
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.benefactor.user)
+
+    def calendar(self, client=None, **params):
+        params.setdefault('start', '2024-01-01')
+        params.setdefault('end', '2024-01-14')
+        response = (client or self.client).get('/tasks/calendar/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(str(bucket['start']),
+                 [task['title'] for task in bucket['tasks']])
+                for bucket in response.data['buckets']]
+
+    def test_tasks_are_grouped_by_day_or_week(self):
+        self.assertEqual(self.calendar(), [
+            ('2024-01-01', ['monday']),
+            ('2024-01-03', ['wednesday']),
+            ('2024-01-09', ['next week']),
+        ])
+        self.assertEqual(self.calendar(group='week'), [
+            ('2024-01-01', ['monday', 'wednesday']),
+            ('2024-01-08', ['next week']),
+        ])
+        owner = APIClient()
+        owner.force_authenticate(self.owner)
+        self.assertEqual(self.calendar(owner, state='D', end='2024-01-02'),
+                         [])
+        self.assertEqual(self.calendar(owner, state='D'),
+                         [('2024-01-03', ['done'])])
+
+    def test_invalid_ranges_are_rejected(self):
+        for params in ({'start': 'monday'}, {'end': '2023-12-31'},
+                       {'end': '2025-06-01'}, {'group': 'month'},
+                       {'state': 'X'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(
+                    '/tasks/calendar/',
+                    {'start': '2024-01-01', **params}).status_code, 400)
+
+    def test_cached_weeks_are_invalidated_only_by_their_tasks(self):
+        self.calendar()
+        with self.assertNumQueries(0):
+            self.calendar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tasks[2].title = 'renamed'
+            self.tasks[2].save()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.calendar(group='week')[1],
+                             ('2024-01-08', ['renamed']))
+        # Only the second week is read again.
+        self.assertEqual(len(queries), 1)
+        self.assertIn("'2024-01-08'", queries[0]['sql'])
+        self.assertIn("'2024-01-15'", queries[0]['sql'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tasks[0].transition(
+                'W', assigned_benefactor_id=self.benefactor.pk)
+        self.assertEqual(self.calendar()[0], ('2024-01-01', ['monday']))
+        other = APIClient()
+        other.force_authenticate(
+            User.objects.create(username='other benefactor'))
+        self.assertEqual(self.calendar(other)[0],
+                         ('2024-01-03', ['wednesday']))
+
+
+class TaskAssignmentTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner')
+        self.charity = Charity.objects.create(
+            user=self.owner, name='charity', reg_number='1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def benefactor(self, name, free_time, experience=0, **user_fields):
+        return Benefactor.objects.create(
+            user=User.objects.create(username=name, **user_fields),
+            free_time_per_week=free_time, experience=experience)
+
+    def assign(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/tasks/assign/', data)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_limits_and_capacity_are_respected_optimally(self):
+        young = self.benefactor('young', 2, gender='F', age=25)
+        old = self.benefactor('old', 4, gender='M', age=50)
+        self.benefactor('busy', 1, age=25)
+        # Giving "anyone" to the young benefactor first would strand
+        # "young women".
+        anyone = Task.objects.create(title='anyone', charity=self.charity)
+        limited = Task.objects.create(
+            title='young women', charity=self.charity, gender_limit='F',
+            age_limit_from=20, age_limit_to=30)
+        nobody = Task.objects.create(
+            title='children', charity=self.charity, age_limit_to=12)
+        other = Charity.objects.create(
+            user=User.objects.create(username='other owner'), name='other',
+            reg_number='2')
+        foreign = Task.objects.create(title='foreign', charity=other)
+
+        report = self.assign(dry_run='true')
+        self.assertEqual((report['tasks'], report['assigned']), (3, 2))
+        self.assertFalse(Task.objects.exclude(state='P').exists())
+
+        report = self.assign()
+        self.assertEqual(report['assigned'], 2)
+        assigned = dict(Task.objects.filter(state='A').values_list(
+            'pk', 'assigned_benefactor'))
+        self.assertEqual(assigned, {limited.pk: young.pk, anyone.pk: old.pk})
+        self.assertEqual(Task.objects.get(pk=nobody.pk).state, 'P')
+        self.assertEqual(Task.objects.get(pk=foreign.pk).state, 'P')
+        self.assertEqual(
+            list(TaskEvent.objects.filter(task_id=anyone.pk).values_list(
+                'from_state', 'to_state').order_by('id')),
+            [('P', 'W'), ('W', 'A')])
+        self.assertEqual(inconsistencies(), [])
+        self.assertFalse(
+            TaskEligibility.objects.filter(task__state='A').exists())
+
+        # The young benefactor's two hours are used up now.
+        Task.objects.create(title='more', charity=self.charity)
+        self.assign()
+        self.assertEqual(
+            Task.objects.get(title='more').assigned_benefactor_id, old.pk)
+
+    def test_experienced_benefactors_are_preferred(self):
+        self.benefactor('novice', 10)
+        expert = self.benefactor('expert', 2, experience=2)
+        Task.objects.bulk_create(
+            [Task(title=f't{i}', charity=self.charity) for i in range(2)])
+        report = self.assign()
+        self.assertEqual(report['assigned'], 2)
+        self.assertEqual(report['mean_experience'], 1)
+        self.assertTrue(Task.objects.filter(
+            assigned_benefactor=expert).exists())
+
+    def test_tasks_claimed_meanwhile_roll_the_batch_back(self):
+        self.benefactor('benefactor', 10)
+        Task.objects.create(title='task', charity=self.charity)
+        with mock.patch('charities.assignment.update_pending_tasks',
+                        return_value=0):
+            response = self.client.post('/tasks/assign/')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(TaskEvent.objects.exists())
+        self.assertEqual(inconsistencies(), [])
+
+    def test_command_reports_the_match(self):
+        self.benefactor('benefactor', 10)
+        Task.objects.create(title='task', charity=self.charity)
+        out = StringIO()
+        call_command('assign_tasks', charity=[self.charity.pk], stdout=out)
+        self.assertIn('1 of 1 pending tasks assigned', out.getvalue())
+
+
+class TaskCreateTest(TestCase):
+    def test_only_charity_owners_create_tasks(self):
+        user = User.objects.create_user(username='benefactor', password='9')
+        Benefactor.objects.create(user=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(
+            client.post('/tasks/', {'title': 'task'}).status_code, 403)
+
+        Charity.objects.create(user=user, name='c', reg_number='1234567890')
+        response = client.post('/tasks/', {'title': 'task'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['state'], 'P')
+
+
+class BulkTaskCreateTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='9')
+        self.charity = Charity.objects.create(
+            user=self.user, name='charity', reg_number='1234567890')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_json_list_is_created_in_bulk(self):
+        rows = [{'title': f'task{i}', 'gender_limit': 'F'} for i in range(50)]
+        # Role lookup, atomic block, insert, eligibility index (2 queries)
+        # and task stats (2 queries).
+        with self.assertNumQueries(8):
+            response = self.client.post('/tasks/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'created': 50})
+        self.assertEqual(self.charity.task_set.count(), 50)
+
+    def test_csv_and_ndjson_uploads(self):
+        csv_file = SimpleUploadedFile(
+            'tasks.csv', b'title,age_limit_from,date\nfirst,,2023-02-01\n'
+                         b'second,18,\n')
+        ndjson_file = SimpleUploadedFile(
+            'tasks.ndjson', b'{"title": "third"}\n\n{"title": "fourth"}\n')
+        for upload in (csv_file, ndjson_file):
+            response = self.client.post('/tasks/', {'file': upload})
+            self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.charity.task_set.count(), 4)
+
+    def test_invalid_rows_are_reported_and_nothing_is_saved(self):
+        rows = [{'title': 'ok'},
+                {'title': 'ages', 'age_limit_from': 30, 'age_limit_to': 20},
+                {'title': 'gender', 'gender_limit': 'X'}]
+        response = self.client.post('/tasks/', rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']],
+                         [1, 2])
+        self.assertIn('age_limit_to', response.data['errors'][0]['errors'])
+        self.assertFalse(Task.objects.exists())
+
+
+class TaskMatchingTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.charity = Charity.objects.create(
+            user=owner, name='charity', reg_number='1234567890')
+        self.user = User.objects.create(username='sara', gender='F', age=30)
+        # Time for two tasks of TASK_ASSIGNMENT_HOURS.
+        self.benefactor = Benefactor.objects.create(
+            user=self.user, free_time_per_week=4)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def task(self, title, **limits):
+        return Task.objects.create(title=title, charity=self.charity, **limits)
+
+    def matches(self):
+        response = self.client.get('/tasks/matches/')
+        self.assertEqual(response.status_code, 200)
+        return [task['title'] for task in response.data]
+
+    def test_only_eligible_tasks_are_ranked_most_specific_first(self):
+        self.task('anyone')
+        self.task('women', gender_limit='F')
+        self.task('women in their thirties', gender_limit='F',
+                  age_limit_from=30, age_limit_to=39)
+        self.task('band edge', age_limit_from=31, age_limit_to=35)
+        self.task('men', gender_limit='M')
+        self.task('seniors', age_limit_from=60)
+        self.task('past', date=date(2000, 1, 1))
+        self.assertEqual(self.matches(),
+                         ['women in their thirties', 'women', 'anyone'])
+
+    def test_index_follows_task_state_changes(self):
+        task = self.task('task', age_limit_to=40)
+        self.assertEqual(self.matches(), ['task'])
+
+        owner_client = APIClient()
+        owner_client.force_authenticate(self.charity.user)
+        self.client.post(f'/tasks/{task.id}/request/')
+        self.assertEqual(self.matches(), [])
+        self.assertFalse(task.eligibility.exists())
+
+        owner_client.post(f'/tasks/{task.id}/response/', {'response': 'R'})
+        self.assertEqual(self.matches(), ['task'])
+
+        task.age_limit_to = 20
+        task.save()
+        self.assertEqual(self.matches(), [])
+
+    def test_benefactors_without_time_left_get_no_matches(self):
+        self.task('anyone')
+        other = self.task('other')
+        self.client.post(f'/tasks/{other.id}/request/')
+        self.assertEqual(self.matches(), ['anyone'])
+
+        Benefactor.objects.filter(pk=self.benefactor.pk).update(
+            free_time_per_week=2)
+        self.assertEqual(self.matches(), [])
+        Benefactor.objects.filter(pk=self.benefactor.pk).update(
+            free_time_per_week=0)
+        response = self.client.get('/tasks/search/?q=anyone&eligible=1')
+        self.assertEqual(response.data, [])
+
+
+class TaskSearchTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.charity = Charity.objects.create(
+            user=owner, name='charity', reg_number='1')
+        self.user = User.objects.create(username='sara', gender='F', age=30)
+        Benefactor.objects.create(user=self.user, free_time_per_week=4)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def task(self, title, description='', **fields):
+        return Task.objects.create(title=title, description=description,
+                                   charity=self.charity, **fields)
+
+    def search(self, query, backend=None, **params):
+        with self.settings(TASK_SEARCH_BACKEND=backend):
+            response = self.client.get('/tasks/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [task['title'] for task in response.data]
+
+    def test_ranking_prefixes_and_filters(self):
+        self.task('Library cleanup', 'Sort donated books')
+        self.task('Food drive', 'Carry books and cans to the library')
+        self.task('Painting', 'Paint the library fence', gender_limit='M')
+        self.task('Bookkeeping', 'Monthly accounts', state='D')
+        for backend in (None, 'charities.search.ContainsBackend'):
+            with self.subTest(backend=backend):
+                self.assertEqual(self.search('library', backend)[0],
+                                 'Library cleanup')
+                self.assertEqual(
+                    set(self.search('library books', backend)),
+                    {'Library cleanup', 'Food drive'})
+                self.assertEqual(
+                    self.search('library', backend, eligible=1,
+                                fields='title'),
+                    ['Library cleanup', 'Food drive'])
+        self.assertEqual(self.search('book*'),
+                         ['Library cleanup', 'Food drive'])
+        self.assertEqual(self.search('book*', state='D'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        task = self.task('Garden', 'Water the plants')
+        self.assertEqual(self.search('plants'), ['Garden'])
+        task.description = 'Mow the lawn'
+        task.save()
+        self.assertEqual(self.search('plants'), [])
+        self.assertEqual(self.search('lawn'), ['Garden'])
+        task.delete()
+        self.assertEqual(self.search('lawn'), [])
+
+    def test_index_is_joined_once_not_queried_per_match(self):
+        self.task('Garden', 'Water the plants')
+        sql = str(search_tasks(Task.objects.all(), 'garden').query)
+        self.assertEqual(sql.count(' MATCH '), 1)
+        self.assertIn('INNER JOIN "charities_task_fts"', sql)
+        self.assertEqual(
+            search_tasks(Task.objects.all(), 'garden').count(), 1)
+
+    def test_query_syntax_is_not_passed_through(self):
+        self.task('Quotes "and" stars')
+        self.assertEqual(self.search('"and" OR NEAR(*'), [])
+        self.assertEqual(self.search('quotes "stars"'), ['Quotes "and" stars'])
+        self.assertEqual(
+            self.client.get('/tasks/search/').status_code, 400)
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='9')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        start = User.objects.count()
+        users = User.objects.bulk_create(
+            [User(username=f'user{start + i}') for i in range(count)])
+        charities = Charity.objects.bulk_create(
+            [Charity(user=user, name=f'c{user.username}', reg_number='1')
+             for user in users])
+        benefactors = Benefactor.objects.bulk_create(
+            [Benefactor(user=user) for user in users])
+        Task.objects.bulk_create(
+            [Task(title='task', charity=charity, assigned_benefactor=benefactor)
+             for charity, benefactor in zip(charities, benefactors)])
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelists_issue_a_constant_number_of_queries(self):
+        urls = ('/admin/charities/task/', '/admin/charities/benefactor/',
+                '/admin/charities/charity/',
+                '/admin/charities/task/?state__exact=P&q=task')
+        self.add_rows(3)
+        small = [self.changelist_queries(url) for url in urls]
+        self.add_rows(60)
+        self.assertEqual([self.changelist_queries(url) for url in urls], small)
+
+    def test_large_tables_use_estimated_counts(self):
+        self.add_rows(5)
+        with mock.patch('charities.admin.estimated_row_count',
+                        return_value=10 ** 6):
+            response = self.client.get('/admin/charities/task/')
+        self.assertEqual(response.context['cl'].result_count, 10 ** 6)
+
+    def test_estimate_is_the_table_size_not_a_partial_index(self):
+        charity = Charity.objects.create(
+            user=User.objects.create(username='estimated'), name='e',
+            reg_number='1')
+        Task.objects.bulk_create(
+            [Task(title=f't{i}', charity=charity, state='D')
+             for i in range(30)] +
+            [Task(title='pending', charity=charity, date=date(2024, 1, 1))])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            # The partial index of pending tasks counts one row; put it
+            # first, as SQLite may list it.
+            cursor.execute(
+                'SELECT idx, stat FROM sqlite_stat1 WHERE tbl = %s',
+                [Task._meta.db_table])
+            stats = sorted(cursor.fetchall(),
+                           key=lambda row: row[0] != 'task_pending_date_idx')
+            cursor.execute('DELETE FROM sqlite_stat1 WHERE tbl = %s',
+                           [Task._meta.db_table])
+            cursor.executemany(
+                'INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (%s, %s, %s)',
+                [(Task._meta.db_table, idx, stat) for idx, stat in stats])
+        self.assertEqual(estimated_row_count(Task), Task.objects.count())
+
+
+class TaskExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='9')
+        charity = Charity.objects.create(
+            user=self.user, name='charity', reg_number='1234567890')
+        Task.objects.create(title='first, task', charity=charity,
+                            date=date(2023, 1, 1))
+        Task.objects.create(title='second', charity=charity)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_export_streams_one_object_per_task(self):
+        response = self.client.get('/tasks/export/')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"date": "2023-01-01"', lines[0])
+
+    def test_csv_export_has_header_and_quoted_rows(self):
+        response = self.client.get('/tasks/export/?output=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'title', 'state'])
+        self.assertIn('"first, task"', lines[1])
+
+
+class TaskTransitionTest(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='9')
+        self.charity = Charity.objects.create(
+            user=owner, name='charity', reg_number='1234567890')
+        self.task = Task.objects.create(title='task', charity=self.charity)
+        self.benefactor = Benefactor.objects.create(
+            user=User.objects.create_user(username='benefactor', password='9'))
+        self.owner_client = APIClient()
+        self.owner_client.force_authenticate(owner)
+        self.benefactor_client = APIClient()
+        self.benefactor_client.force_authenticate(self.benefactor.user)
+
+    def post(self, client, action, data=None, task_id=None):
+        if task_id is None:
+            task_id = self.task.id
+        return client.post(f'/tasks/{task_id}/{action}/', data).status_code
+
+    def test_full_lifecycle_and_conflicts(self):
+        self.assertEqual(self.post(self.benefactor_client, 'request'), 200)
+        self.assertEqual(self.post(self.benefactor_client, 'request'), 409)
+        self.assertEqual(self.post(self.owner_client, 'done'), 409)
+        self.assertEqual(
+            self.post(self.owner_client, 'response', {'response': 'A'}), 200)
+        self.assertEqual(self.post(self.owner_client, 'done'), 200)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.state, 'D')
+        self.assertEqual(self.task.assigned_benefactor, self.benefactor)
+
+    def test_moves_skip_tasks_that_changed_after_they_were_read(self):
+        self.task.transition('W', assigned_benefactor_id=self.benefactor.pk)
+        other = Benefactor.objects.create(
+            user=User.objects.create_user(username='other', password='9'))
+        atomic = transaction.atomic
+
+        def rejected_and_claimed_meanwhile(*args, **kwargs):
+            Task.objects.filter(pk=self.task.pk).update(
+                assigned_benefactor=other)
+            return atomic(*args, **kwargs)
+
+        events = TaskEvent.objects.count()
+        with mock.patch.object(transaction, 'atomic',
+                               rejected_and_claimed_meanwhile):
+            moved = Task.objects.filter(pk=self.task.pk).transition('A')
+        self.assertEqual(moved, 0)
+        self.assertEqual(TaskEvent.objects.count(), events)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.state, self.task.assigned_benefactor),
+                         ('W', other))
+
+    def test_rejection_releases_the_task(self):
+        self.post(self.benefactor_client, 'request')
+        self.assertEqual(
+            self.post(self.owner_client, 'response', {'response': 'R'}), 200)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.state, self.task.assigned_benefactor),
+                         ('P', None))
+
+    def test_other_charities_and_missing_tasks_are_not_found(self):
+        self.post(self.benefactor_client, 'request')
+        stranger = User.objects.create_user(username='stranger', password='9')
+        Charity.objects.create(user=stranger, name='c', reg_number='1')
+        client = APIClient()
+        client.force_authenticate(stranger)
+        self.assertEqual(
+            self.post(client, 'response', {'response': 'A'}), 404)
+        self.assertEqual(
+            self.post(self.benefactor_client, 'request', task_id=0), 404)
+
+    def test_every_transition_writes_an_outbox_event(self):
+        self.post(self.benefactor_client, 'request')
+        self.post(self.owner_client, 'response', {'response': 'R'})
+        self.post(self.benefactor_client, 'request')
+        self.post(self.owner_client, 'response', {'response': 'A'})
+        self.post(self.owner_client, 'done')
+        self.post(self.owner_client, 'done')
+        events = TaskEvent.objects.order_by('id')
+        self.assertEqual(
+            [(e.from_state, e.to_state) for e in events],
+            [('P', 'W'), ('W', 'P'), ('P', 'W'), ('W', 'A'), ('A', 'D')])
+        self.assertEqual({(e.task_id, e.charity_id, e.benefactor_id)
+                          for e in events},
+                         {(self.task.pk, self.charity.pk, self.benefactor.pk)})
+
+
+class TaskStateMachineTest(TestCase):
+    def setUp(self):
+        charity = Charity.objects.create(
+            user=User.objects.create(username='owner'), name='c',
+            reg_number='1')
+        self.task = Task.objects.create(title='task', charity=charity)
+
+    def test_transitions_are_validated_against_the_states(self):
+        with self.assertRaises(ValueError):
+            self.task.transition('X')
+        self.assertFalse(self.task.transition('D'))
+        self.assertTrue(self.task.transition('W'))
+        self.assertEqual(self.task.state, 'W')
+        self.assertEqual(TaskEvent.objects.count(), 1)
+
+    def test_event_rolls_back_with_the_transition(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.task.transition('W')
+            raise RuntimeError
+        self.assertFalse(TaskEvent.objects.exists())
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.state, 'P')
+
+    def test_drain_delivers_in_order_and_retries_failures(self):
+        for state in ('W', 'P', 'W'):
+            self.task.transition(state)
+        seen = []
+
+        def handler(event):
+            if len(seen) == 1 and event.to_state == 'P':
+                seen.append('failed')
+                raise ConnectionError
+            seen.append(event.to_state)
+
+        with ThreadPoolExecutor(max_workers=2) as pool, \
+                self.assertLogs('charities.events', 'ERROR'):
+            self.assertEqual(drain(pool=pool, handlers=[handler]), 3)
+        # The event after the failed one waits for it, also during the
+        # failed event's backoff.
+        failed, waiting = TaskEvent.objects.order_by('id')
+        self.assertEqual((failed.to_state, failed.attempts), ('P', 1))
+        self.assertIn('ConnectionError', failed.last_error)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        self.assertEqual((waiting.to_state, waiting.attempts), ('W', 0))
+        self.assertIsNone(waiting.claimed_by)
+        self.assertEqual(drain(handlers=[handler]), 0)
+
+        TaskEvent.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(drain(handlers=[handler]), 2)
+        self.assertEqual(seen, ['W', 'failed', 'P', 'W'])
+        self.assertFalse(TaskEvent.objects.exists())
+
+    def test_backoff_doubles_per_attempt(self):
+        self.task.transition('W')
+        event = TaskEvent.objects.get()
+        now = timezone.now()
+        self.assertEqual(retry_at(event, now) - now,
+                         timedelta(seconds=RETRY_DELAY))
+        event.attempts = 3
+        self.assertEqual(retry_at(event, now) - now,
+                         timedelta(seconds=RETRY_DELAY * 8))
+
+    def test_claimed_events_wait_until_the_claim_times_out(self):
+        self.task.transition('W')
+        TaskEvent.objects.update(claimed_by=uuid.uuid4(),
+                                 claimed_at=timezone.now())
+        self.assertEqual(drain(handlers=[]), 0)
+        TaskEvent.objects.update(claimed_at=timezone.now() - timedelta(
+            seconds=CLAIM_TIMEOUT + 1))
+        self.assertEqual(drain(handlers=[]), 1)
+        self.assertFalse(TaskEvent.objects.exists())
+
+    def test_events_are_given_up_after_max_attempts(self):
+        self.task.transition('W')
+        TaskEvent.objects.update(attempts=MAX_ATTEMPTS)
+        self.assertEqual(drain(handlers=[]), 0)
+
+
+@override_settings(TASK_WRITE_THROTTLES={
+    'user': {'rate': 1, 'burst': 3}, 'charity': {'rate': 0.5, 'burst': 2}})
+class TaskThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        buckets.clear()
+        owner = User.objects.create(username='owner')
+        self.charity = Charity.objects.create(
+            user=owner, name='charity', reg_number='1234567890')
+        Benefactor.objects.create(user=owner)
+        self.task = Task.objects.create(title='task', charity=self.charity)
+        self.token = Token.objects.create(user=owner)
+
+    def post(self, url, data=None):
+        return self.client.post(
+            url, data, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_bursts_are_refused_before_any_query(self):
+        task = {'title': 'new'}
+        self.assertEqual(self.post('/tasks/', task).status_code, 201)
+        self.assertEqual(self.post('/tasks/', task).status_code, 201)
+        with self.assertNumQueries(0):
+            response = self.post('/tasks/', task)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(Task.objects.count(), 3)
+
+        # Claims only count against the user, who has a token left.
+        url = f'/tasks/{self.task.id}/request/'
+        self.assertEqual(self.post(url).status_code, 200)
+        self.assertEqual(self.post(url).status_code, 429)
+        # Reads are never throttled.
+        self.assertEqual(self.client.get(
+            '/tasks/', HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        ).status_code, 200)
+
+    def test_buckets_refill_at_their_rate(self):
+        store, key = TokenBuckets(), [('user', 1)]
+        self.assertEqual([store.take(key, now=0) for _ in range(4)],
+                         [0, 0, 0, 1])
+        self.assertEqual(store.take(key, now=0.5), 0.5)
+        self.assertEqual(store.take(key, now=1), 0)
+        self.assertEqual(store.take(key, now=1), 1)
+        self.assertEqual(store.take(key, now=100), 0)
+        self.assertEqual(store.take([('other', 1)], now=100), 0)
+
+    @override_settings(TASK_THROTTLE_SHARED_CACHE='default',
+                       TASK_THROTTLE_SYNC_INTERVAL=0)
+    def test_workers_pool_their_spending_through_the_shared_cache(self):
+        first, second, key = TokenBuckets(), TokenBuckets(), [('user', 1)]
+        with mock.patch('charities.throttling.time.time', return_value=0):
+            self.assertEqual([first.take(key, now=0) for _ in range(3)],
+                             [0, 0, 0])
+            # The second worker's bucket is full until it reports its
+            # spending and learns that the first one emptied the window.
+            self.assertEqual(second.take(key, now=0), 0)
+            self.assertEqual(second.take(key, now=0), 2)
+
+
+class TaskStatsTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner')
+        self.charity = Charity.objects.create(
+            user=self.owner, name='c', reg_number='1')
+        self.benefactor = Benefactor.objects.create(
+            user=User.objects.create(username='benefactor'))
+
+    def test_counters_follow_every_kind_of_task_change(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        client.post('/tasks/', [{'title': f't{i}'} for i in range(3)],
+                    format='json')
+        first, second, third = Task.objects.order_by('id')
+        first.transition('W', assigned_benefactor_id=self.benefactor.pk)
+        first.transition('A')
+        first.transition('D')
+        second.transition('W', assigned_benefactor_id=self.benefactor.pk)
+        second.transition('P', assigned_benefactor_id=None)
+        third.state = 'A'
+        third.assigned_benefactor = self.benefactor
+        third.save()
+        Task.objects.create(title='extra', charity=self.charity)
+        second.delete()
+
+        self.assertEqual(inconsistencies(), [])
+        stats = task_stats(self.charity.pk, self.benefactor.pk)
+        self.assertEqual(stats['charity'], {
+            'pending': 1, 'waiting': 0, 'assigned': 1, 'done': 1})
+        self.assertEqual(stats['benefactor'], {
+            'pending': 0, 'waiting': 0, 'assigned': 1, 'done': 1})
+
+    def test_endpoint_serves_the_callers_counters(self):
+        Task.objects.create(title='t', charity=self.charity)
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        with self.assertNumQueries(2):
+            data = client.get('/tasks/stats/').json()
+        self.assertEqual(data['charity']['pending'], 1)
+        self.assertIsNone(data['benefactor'])
+
+    def test_check_reports_drift_and_rebuild_repairs_it(self):
+        Task.objects.create(title='t', charity=self.charity)
+        CharityTaskStats.objects.update(pending=5, done=1)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_stats', check=True, stdout=StringIO())
+        call_command('rebuild_task_stats', stdout=StringIO())
+        self.assertEqual(inconsistencies(), [])
+
+
+class TaskArchiveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(username='owner')
+        self.charity = Charity.objects.create(
+            user=self.owner, name='charity', reg_number='1')
+        self.benefactor = Benefactor.objects.create(
+            user=User.objects.create(username='benefactor'))
+        old, recent = date(2020, 1, 6), date.today()
+        for title, state, day in (('old done', 'D', old),
+                                  ('older done', 'D', old - timedelta(7)),
+                                  ('recent done', 'D', recent),
+                                  ('old pending', 'P', old),
+                                  ('undated done', 'D', None)):
+            Task.objects.create(
+                title=title, charity=self.charity, state=state, date=day,
+                assigned_benefactor=self.benefactor if state == 'D' else None)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def archive(self, **options):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_tasks', days=30, stdout=StringIO(),
+                         **options)
+
+    def test_old_done_tasks_move_in_batches_and_keep_counting(self):
+        stats = task_stats(self.charity.pk, self.benefactor.pk)
+        version = cache.get(charity_scope_key(self.charity.pk))
+        self.archive(batch_size=1)
+
+        self.assertCountEqual(
+            TaskArchive.objects.values_list('title', flat=True),
+            ['old done', 'older done'])
+        self.assertCountEqual(
+            Task.objects.values_list('title', flat=True),
+            ['recent done', 'old pending', 'undated done'])
+        self.assertEqual(task_stats(self.charity.pk, self.benefactor.pk),
+                         stats)
+        self.assertEqual(inconsistencies(), [])
+        self.assertNotEqual(
+            cache.get(charity_scope_key(self.charity.pk)), version)
+        self.assertFalse(search_tasks(Task.objects.all(), 'old done'))
+
+    def test_limit_moves_the_oldest_first(self):
+        self.archive(limit=1)
+        self.assertEqual(
+            list(TaskArchive.objects.values_list('title', flat=True)),
+            ['older done'])
+
+    def test_history_export_and_calendar_include_archived_tasks(self):
+        self.archive()
+        response = self.client.get('/tasks/history/?fields=title')
+        titles = [task['title'] for task in response.data]
+        self.assertEqual(titles,
+                         ['undated done', 'recent done', 'older done',
+                          'old done'])
+        self.assertEqual(response.data[0], {'title': 'undated done'})
+        last_id = Task.objects.get(title='recent done').pk
+        response = self.client.get(f'/tasks/history/?before={last_id}')
+        self.assertEqual([task['title'] for task in response.data],
+                         ['older done', 'old done'])
+        benefactor = APIClient()
+        benefactor.force_authenticate(self.benefactor.user)
+        self.assertEqual(len(benefactor.get('/tasks/history/').data), 4)
+
+        response = self.client.get('/tasks/export/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+
+        response = self.client.get(
+            '/tasks/calendar/', {'start': '2019-12-30', 'end': '2020-01-12'})
+        self.assertEqual(
+            [[task['title'] for task in bucket['tasks']]
+             for bucket in response.data['buckets']],
+            [['older done'], ['old done', 'old pending']])
+
+
+class SeedCommandTest(TestCase):
+    def test_seed_creates_the_requested_data_and_derived_tables(self):
+        call_command('seed', charities=3, benefactors=5, tasks=300,
+                     states='P=1,D=1', batch_size=100, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 8)
+        self.assertEqual(Task.objects.count(), 300)
+        self.assertEqual(set(Task.objects.values_list('state', flat=True)),
+                         {'P', 'D'})
+        self.assertFalse(Task.objects.filter(
+            state='D', assigned_benefactor__isnull=True).exists())
+        # With the default skew the first charity owns the most tasks.
+        sizes = [charity.task_set.count()
+                 for charity in Charity.objects.order_by('pk')]
+        self.assertEqual(sizes[0], max(sizes))
+        self.assertEqual(inconsistencies(), [])
+        self.assertTrue(TaskEligibility.objects.exists())
+        self.assertTrue(self.client.login(username='seed_0',
+                                          password='password'))
+
+        with self.assertRaises(CommandError):
+            call_command('seed', tasks=0, stdout=StringIO())
+
+
+class ProfileImportTest(TestCase):
+    def setUp(self):
+        User.objects.create(username='taken')
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, name, content, kind):
+        return self.client.post('/profiles/import/', {
+            'kind': kind, 'file': SimpleUploadedFile(name, content)})
+
+    def test_benefactor_csv_import_reports_rejected_rows(self):
+        content = (b'username,first_name,age,gender,experience\n'
+                   b'ali,Ali,30,M,2\n'
+                   b'taken,,,,\n'
+                   b'sara,Sara,old,F,1\n'
+                   b'ali,,,,\n'
+                   b',,,,\n'
+                   b'neda,Neda,,,\n')
+        # One username lookup and one insert per model, whatever the size.
+        with self.assertNumQueries(5):
+            response = self.upload('volunteers.csv', content, 'benefactor')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['rows'], 6)
+        self.assertEqual(response.data['created'], 2)
+        errors = {error['row']: error['errors']
+                  for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [1, 2, 3, 4])
+        self.assertIn('age', errors[2])
+        self.assertIn('username', errors[3])
+        ali = Benefactor.objects.select_related('user').get(
+            user__username='ali')
+        self.assertEqual((ali.experience, ali.user.age), (2, 30))
+        self.assertFalse(ali.user.has_usable_password())
+
+    def test_charity_import_validates_reg_numbers(self):
+        content = (
+            b'{"username": "c1", "name": "One", "reg_number": "0123456789"}\n'
+            b'{"username": "c2", "name": "Two", "reg_number": "12"}\n')
+        response = self.upload('charities.ndjson', content, 'charity')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([error['row'] for error in response.data['errors']],
+                         [1])
+        self.assertEqual(list(Charity.objects.values_list('name', flat=True)),
+                         ['One'])
+
+    def test_only_admins_may_import(self):
+        self.client.force_authenticate(User.objects.get(username='taken'))
+        response = self.upload('x.csv', b'username\nx\n', 'benefactor')
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_imports_in_batches(self):
+        out = StringIO()
+        with tempfile.NamedTemporaryFile(suffix='.jsonl') as file:
+            file.writelines(b'{"username": "v%d"}\n' % i for i in range(25))
+            file.flush()
+            call_command('import_profiles', 'benefactor', file.name,
+                         batch_size=10, stdout=out, stderr=StringIO())
+        self.assertIn('Imported 25 of 25', out.getvalue())
+        self.assertEqual(Benefactor.objects.count(), 25)
+
+
+class EventDrainConcurrencyTest(TransactionTestCase):
+    def test_task_writes_while_handlers_run_do_not_break_the_drain(self):
+        charity = Charity.objects.create(
+            user=User.objects.create(username='owner'), name='c',
+            reg_number='1')
+        task = Task.objects.create(title='task', charity=charity)
+        task.transition('W')
+
+        def handler(event):
+            # Another connection commits a task write meanwhile.
+            Task.objects.create(title='written', charity=charity)
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            self.assertEqual(drain(pool=pool, handlers=[handler]), 1)
+        self.assertFalse(TaskEvent.objects.exists())
+        self.assertTrue(Task.objects.filter(title='written').exists())
+
+
+class ConcurrentClaimTest(TransactionTestCase):
+    claimants = 16
+
+    def test_concurrent_claims_assign_the_task_once(self):
+        owner = User.objects.create_user(username='owner', password='9')
+        charity = Charity.objects.create(
+            user=owner, name='charity', reg_number='1234567890')
+        task = Task.objects.create(title='task', charity=charity)
+        users = [User.objects.create(username=f'b{i}')
+                 for i in range(self.claimants)]
+        for user in users:
+            Benefactor.objects.create(user=user)
+
+        # The view is called directly: the test client collects request
+        # exceptions through a global signal, so under threads one client
+        # could re-raise the error of another thread's request.
+        view = TaskRequest.as_view()
+        factory = APIRequestFactory()
+
+        def claim(user):
+            try:
+                while True:
+                    request = factory.post(f'/tasks/{task.id}/request/')
+                    force_authenticate(request, user)
+                    try:
+                        return view(request, task_id=task.id).status_code
+                    except OperationalError:
+                        # The shared-cache in-memory SQLite test database
+                        # reports "table is locked" instead of waiting like
+                        # the busy timeout of a file database would.
+                        time.sleep(0.001)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.claimants) as pool:
+            codes = list(pool.map(claim, users))
+
+        self.assertEqual(codes.count(200), 1)
+        self.assertEqual(codes.count(409), self.claimants - 1)
+        winner = users[codes.index(200)]
+        task.refresh_from_db()
+        self.assertEqual(task.assigned_benefactor.user, winner)
@@ -0,0 +1,157 @@
+"""
+Token-bucket throttling of the task write endpoints.
+
+settings.TASK_WRITE_THROTTLES gives each scope a bucket per identity that
+holds up to ``burst`` tokens and refills at ``rate`` tokens per second:
+"user" covers every write, by user, and "charity" the writes made as a
+charity (creating, assigning, answering and closing its tasks), by
+charity. A write takes a token from each of its buckets; when one is
+empty the request is refused with 429 and a Retry-After of the seconds
+until it refills. TaskWriteThrottle runs after authentication and
+permissions, which are served from the token cache, so a refused request
+costs no query.
+
+The buckets live in the worker's memory, at most TASK_THROTTLE_SIZE of
+them (the least recently used go first and come back full): a check is a
+dict lookup and a little arithmetic under a lock. With
+TASK_THROTTLE_SHARED_CACHE set, workers also add what each bucket spent
+to a counter per refill window (``burst / rate`` seconds) in that cache,
+at most once per TASK_THROTTLE_SYNC_INTERVAL seconds per bucket; when all
+workers together spent more than ``burst``, each empties its bucket and
+owes the excess. The limit then holds across workers, give or take what
+they spend within one interval, without a cache round trip per request.
+The counters rely on the cache's incr being atomic, as it is in Redis and
+Memcached.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from accounts.authentication import user_roles
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated', 'spent', 'synced')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.spent = 0
+        self.synced = now
+
+
+def throttle_limits():
+    return getattr(settings, 'TASK_WRITE_THROTTLES', {})
+
+
+def shared_cache_key(key, window):
+    scope, ident = key
+    return f'charities:throttle:{scope}:{ident}:{window}'
+
+
+class TokenBuckets:
+    """Token buckets keyed by (scope, identity), limited per scope."""
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, keys, now=None):
+        """
+        Take a token from the bucket of each (scope, identity) in ``keys``
+        and return 0, or take none and return the seconds until all of
+        them hold a token again. Scopes without a limit are not throttled.
+        """
+        now = time.monotonic() if now is None else now
+        limits = throttle_limits()
+        alias = getattr(settings, 'TASK_THROTTLE_SHARED_CACHE', None)
+        held, wait, due = [], 0, []
+        with self._lock:
+            for key in keys:
+                limit = limits.get(key[0])
+                if limit is not None:
+                    bucket = self.bucket(key, limit, now)
+                    if bucket.tokens < 1:
+                        wait = max(wait, (1 - bucket.tokens) / limit['rate'])
+                    held.append((key, bucket, limit))
+            if not wait:
+                for _, bucket, _ in held:
+                    bucket.tokens -= 1
+                    bucket.spent += 1
+            if alias:
+                interval = getattr(settings, 'TASK_THROTTLE_SYNC_INTERVAL', 1)
+                for key, bucket, limit in held:
+                    if bucket.spent and now - bucket.synced >= interval:
+                        due.append((key, bucket, bucket.spent, limit))
+                        bucket.spent, bucket.synced = 0, now
+        for key, bucket, spent, limit in due:
+            self.sync(caches[alias], key, bucket, spent, limit)
+        return wait
+
+    def bucket(self, key, limit, now):
+        """The refilled bucket of ``key``; the caller holds the lock."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(limit['burst'], now)
+            if len(self._buckets) > getattr(
+                    settings, 'TASK_THROTTLE_SIZE', 100000):
+                self._buckets.popitem(last=False)
+            return bucket
+        self._buckets.move_to_end(key)
+        bucket.tokens = min(
+            limit['burst'],
+            bucket.tokens + (now - bucket.updated) * limit['rate'])
+        bucket.updated = now
+        return bucket
+
+    def sync(self, cache, key, bucket, spent, limit):
+        """Report ``spent`` tokens and drain ``bucket`` by the overdraft."""
+        length = limit['burst'] / limit['rate']
+        cache_key = shared_cache_key(key, int(time.time() // length))
+        cache.add(cache_key, 0, math.ceil(length) + 1)
+        try:
+            total = cache.incr(cache_key, spent)
+        except ValueError:
+            # Expired between add() and incr(): the window is over.
+            return
+        overdraft = total - limit['burst']
+        if overdraft > 0:
+            with self._lock:
+                bucket.tokens = min(bucket.tokens, -overdraft)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+buckets = TokenBuckets()
+
+
+class TaskWriteThrottle(BaseThrottle):
+    """
+    Throttles unsafe requests in the view's ``throttle_scopes``: "user"
+    by the caller and "charity" by the caller's charity, if any.
+    """
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        scopes = getattr(view, 'throttle_scopes', ('user',))
+        keys = []
+        if 'user' in scopes:
+            keys.append(('user', request.user.pk))
+        if 'charity' in scopes:
+            charity_id = user_roles(request.user).charity_id
+            if charity_id is not None:
+                keys.append(('charity', charity_id))
+        self.wait_seconds = buckets.take(keys)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
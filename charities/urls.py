@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.urls import path
+
+from .async_views import read_async, task_feed
+from .views import (
+    BenefactorRegistration, CharityRegistration, ProfileImport, Tasks,
+    TaskAssignment, TaskCalendar, TaskExport, TaskHistory, TaskMatches,
+    TaskSearch, TaskStatistics, TaskRequest, TaskResponse, DoneTask
+)
+
+tasks_view = Tasks.as_view()
+if settings.ASYNC_READ_VIEWS:
+    tasks_view = read_async(task_feed, tasks_view)
+
+urlpatterns = [
+    path('benefactors/', BenefactorRegistration.as_view()),
+    path('charities/', CharityRegistration.as_view()),
+    path('profiles/import/', ProfileImport.as_view()),
+    path('tasks/', tasks_view),
+    path('tasks/assign/', TaskAssignment.as_view()),
+    path('tasks/calendar/', TaskCalendar.as_view()),
+    path('tasks/export/', TaskExport.as_view()),
+    path('tasks/history/', TaskHistory.as_view()),
+    path('tasks/matches/', TaskMatches.as_view()),
+    path('tasks/search/', TaskSearch.as_view()),
+    path('tasks/stats/', TaskStatistics.as_view()),
+    path('tasks/<int:task_id>/request/', TaskRequest.as_view()),
+    path('tasks/<int:task_id>/response/', TaskResponse.as_view()),
+    path('tasks/<int:task_id>/done/', DoneTask.as_view()),
+]
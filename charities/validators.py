@@ -4,4 +4,6 @@ from django.utils.deconstruct import deconstructible
 
 @deconstructible
 class RegNumberValidator(validators.RegexValidator):
-    pass
+    regex = r'^\d{10}\Z'
+    message = 'Enter a registration number of exactly 10 digits.'
+    code = 'invalid_reg_number'
@@ -1,14 +1,66 @@
+from datetime import date, timedelta
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from rest_framework import status, generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.permissions import (
+    IsAdminUser, IsAuthenticated, SAFE_METHODS
+)
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from accounts.authentication import user_roles
 from accounts.permissions import IsCharityOwner, IsBenefactor
+from charities.archive import task_history
+from charities.assignment import AssignmentConflict, assign_tasks
+from charities.exports import EXPORT_FORMATS
+from charities.feed import (
+    FEED_CACHE_TIMEOUT, etag_matches, feed_cache, feed_etag, feed_page_key,
+    feed_versions
+)
+from charities.imports import PROFILE_MODELS, import_profiles, read_rows
+from charities.matching import eligible_tasks, matching_tasks
 from charities.models import Task
+from charities.pagination import TaskCursorPagination, requested_limit
+from charities.schedule import task_calendar
+from charities.search import search_tasks
 from charities.serializers import (
     TaskSerializer, CharitySerializer, BenefactorSerializer
 )
+from charities.stats import task_stats
+from charities.throttling import TaskWriteThrottle
+from charity.db import primary_reads
+
+
+def requested_task_fields(query_params, param='fields'):
+    """The ?fields= projection of a task listing, or None for all fields."""
+    value = query_params.get(param)
+    if not value:
+        return None
+    fields = [name for name in value.split(',') if name]
+    unknown = set(fields) - set(TaskSerializer.Meta.fields)
+    if unknown:
+        raise ValidationError({param: f'Unknown fields: {sorted(unknown)}'})
+    return fields
+
+
+def set_feed_headers(response, etag):
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+
+
+def task_feed_branches(roles, fields=None):
+    """The querysets a feed page merges, see TaskCursorPagination."""
+    branches = Task.objects.related_task_branches(roles)
+    if fields is not None:
+        # date and id are always loaded because they form the cursor.
+        branches = [branch.only('id', 'date', *fields)
+                    for branch in branches]
+    return branches
 
 
 class BenefactorRegistration(APIView):
@@ -19,17 +71,356 @@ class CharityRegistration(APIView):
     pass
 
 
+class ProfileImport(APIView):
+    """
+    POST a CSV/NDJSON ``file`` and ``kind`` (benefactor or charity) to
+    create the users and profiles it lists. Answers with the number of rows
+    read and created and the errors of the rejected rows.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def post(self, request):
+        kind = request.data.get('kind')
+        if kind not in PROFILE_MODELS:
+            raise ValidationError(
+                {'kind': f'Supported kinds: {list(PROFILE_MODELS)}'})
+        if 'file' not in request.FILES:
+            raise ValidationError({'file': 'This field is required.'})
+        report = import_profiles(read_rows(request.FILES['file']), kind)
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED
+                        if report.created else status.HTTP_400_BAD_REQUEST)
+
+
 class Tasks(generics.ListCreateAPIView):
-    pass
+    serializer_class = TaskSerializer
+    pagination_class = TaskCursorPagination
+    throttle_classes = (TaskWriteThrottle,)
+    throttle_scopes = ('user', 'charity')
+    bulk_max_rows = 50000
+
+    def get_permissions(self):
+        if self.request.method in SAFE_METHODS:
+            self.permission_classes = [IsAuthenticated]
+        else:
+            self.permission_classes = [IsCharityOwner]
+        return super().get_permissions()
+
+    def get_requested_fields(self):
+        return requested_task_fields(self.request.query_params)
+
+    def get_queryset(self):
+        return Task.objects.all_related_tasks_to_user(self.request.user)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in SAFE_METHODS:
+            kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # Pages are cached under the caller's feed versions; a client that
+        # still holds the current ETag is answered without any query.
+        roles = user_roles(request.user)
+        key = feed_page_key(
+            request.build_absolute_uri(), roles, feed_versions(roles))
+        etag = feed_etag(key)
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = feed_cache()
+            data = cache.get(key)
+            if data is None:
+                # Cached under the current versions: no lagging replica.
+                with primary_reads():
+                    page = self.paginate_queryset(task_feed_branches(
+                        roles, self.get_requested_fields()))
+                    data = self.get_paginated_response(
+                        self.get_serializer(page, many=True).data).data
+                cache.set(key, data, FEED_CACHE_TIMEOUT)
+            response = Response(data)
+        set_feed_headers(response, etag)
+        return response
+
+    def get_bulk_rows(self, request):
+        """Rows of a bulk create (a JSON list or an uploaded file), if any."""
+        if 'file' in request.FILES:
+            return list(read_rows(request.FILES['file']))
+        if isinstance(request.data, list):
+            return request.data
+        return None
+
+    def create(self, request, *args, **kwargs):
+        rows = self.get_bulk_rows(request)
+        if rows is None:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(
+            data=rows, many=True, max_length=self.bulk_max_rows)
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, dict):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                {'errors': [{'row': row, 'errors': error}
+                            for row, error in enumerate(errors) if error]},
+                status=status.HTTP_400_BAD_REQUEST)
+        tasks = serializer.save(
+            charity_id=user_roles(request.user).charity_id)
+        return Response({'created': len(tasks)},
+                        status=status.HTTP_201_CREATED)
+
+    def perform_create(self, serializer):
+        serializer.save(
+            charity_id=user_roles(self.request.user).charity_id)
+
+
+class TaskExport(APIView):
+    permission_classes = (IsCharityOwner,)
+    columns = ('id', 'title', 'state', 'date', 'assigned_benefactor',
+               'age_limit_from', 'age_limit_to', 'gender_limit',
+               'description')
+    chunk_size = 2000
+
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                data={'detail': f'Supported outputs: {list(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST)
+        content_type, encode = EXPORT_FORMATS[output]
+        rows = (self.get_rows(user_roles(request.user).charity_id)
+                .iterator(chunk_size=self.chunk_size))
+        response = StreamingHttpResponse(
+            encode(self.columns, rows), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="tasks.{output}"')
+        return response
+
+    @classmethod
+    def get_rows(cls, charity_id):
+        # Archived tasks included, see charities.archive. An equality on the
+        # charity index yields each table's rows in id order already, where
+        # related_tasks_to_charity()'s subquery makes SQLite scan them all.
+        return task_history(
+            lambda tasks: tasks.filter(charity_id=charity_id), *cls.columns,
+        ).order_by('id')
 
 
+class TaskHistory(APIView):
+    """
+    GET /tasks/history/ — the done tasks of the caller's charity and those
+    the caller did as a benefactor, archived ones included, newest first.
+    ?before=<id> continues after the last task of a page; ?fields= as in
+    the feed.
+    """
+    permission_classes = (IsAuthenticated,)
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        params = request.query_params
+        fields = requested_task_fields(params) or TaskSerializer.Meta.fields
+        limit = requested_limit(params, self.default_limit, self.max_limit)
+        owned = Q()
+        roles = user_roles(request.user)
+        if roles.charity_id is not None:
+            owned |= Q(charity_id=roles.charity_id)
+        if roles.benefactor_id is not None:
+            owned |= Q(assigned_benefactor_id=roles.benefactor_id)
+        if not owned:
+            return Response([])
+        before = params.get('before')
+        if before:
+            if not before.isdigit():
+                raise ValidationError({'before': 'Expected a task id.'})
+            owned &= Q(pk__lt=int(before))
+        # The id orders the union, so it is selected even if not requested.
+        columns = tuple(fields) if 'id' in fields else ('id', *fields)
+        rows = task_history(
+            lambda tasks: tasks.filter(owned, state='D'), *columns,
+        ).order_by('-id')[:limit]
+        return Response([
+            {name: value for name, value in zip(columns, row)
+             if name in fields}
+            for row in rows])
+
+
+class TaskMatches(APIView):
+    permission_classes = (IsBenefactor,)
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        limit = requested_limit(
+            request.query_params, self.default_limit, self.max_limit)
+        tasks = matching_tasks(request.user, limit)
+        return Response(TaskSerializer(tasks, many=True).data)
+
+
+class TaskSearch(APIView):
+    """
+    GET /tasks/search/?q=words prefix* — the caller's visible tasks matching
+    every word, best first. ?state= narrows by state and ?eligible=1 to the
+    pending tasks the caller may take.
+    """
+    permission_classes = (IsAuthenticated,)
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        params = request.query_params
+        query = params.get('q', '')
+        if not query.strip():
+            raise ValidationError({'q': 'This parameter is required.'})
+        fields = requested_task_fields(params)
+        if params.get('eligible') in ('1', 'true'):
+            tasks = eligible_tasks(request.user)
+        else:
+            tasks = Task.objects.all_related_tasks_to_user(request.user)
+        state = params.get('state')
+        if state is not None:
+            if state not in dict(Task.STATE_CHOICES):
+                raise ValidationError({'state': f'Unknown state: {state}'})
+            tasks = tasks.filter(state=state)
+        limit = requested_limit(params, self.default_limit, self.max_limit)
+        if fields is not None:
+            tasks = tasks.only('id', *fields)
+        tasks = search_tasks(tasks, query)[:limit]
+        return Response(TaskSerializer(tasks, many=True, fields=fields).data)
+
+
+class TaskAssignment(APIView):
+    """
+    POST /tasks/assign/ — assign the caller's pending tasks to benefactors
+    in one batch (see charities.assignment) and report the match. With
+    ``dry_run`` only the report is computed.
+    """
+    permission_classes = (IsCharityOwner,)
+    throttle_classes = (TaskWriteThrottle,)
+    throttle_scopes = ('user', 'charity')
+
+    def post(self, request):
+        dry_run = str(request.data.get('dry_run', '')).lower() in (
+            '1', 'true')
+        try:
+            report = assign_tasks(
+                Task.objects.related_tasks_to_charity(request.user),
+                dry_run=dry_run)
+        except AssignmentConflict as exc:
+            return Response(data={'detail': str(exc)},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+
+class TaskCalendar(APIView):
+    """
+    GET /tasks/calendar/?start=YYYY-MM-DD&end=YYYY-MM-DD — the caller's
+    visible tasks dated in that range, grouped by ?group=day (default) or
+    week, optionally narrowed by ?state=. Without a range the current week
+    is shown.
+    """
+    permission_classes = (IsAuthenticated,)
+    max_days = 366
+
+    def get(self, request):
+        params = request.query_params
+        start = self.parse_date(params, 'start')
+        if start is None:
+            start = date.today() - timedelta(days=date.today().weekday())
+        end = self.parse_date(params, 'end') or start + timedelta(days=6)
+        if end < start:
+            raise ValidationError({'end': 'Must not be before start.'})
+        if (end - start).days >= self.max_days:
+            raise ValidationError(
+                {'end': f'The range may span at most {self.max_days} days.'})
+        group = params.get('group', 'day')
+        if group not in ('day', 'week'):
+            raise ValidationError({'group': 'Supported groups: day, week'})
+        state = params.get('state')
+        if state is not None and state not in dict(Task.STATE_CHOICES):
+            raise ValidationError({'state': f'Unknown state: {state}'})
+        buckets = task_calendar(
+            user_roles(request.user), start, end, group, state)
+        return Response({'start': start, 'end': end, 'group': group,
+                         'buckets': buckets})
+
+    @staticmethod
+    def parse_date(params, name):
+        value = params.get(name)
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValidationError({name: 'Expected a YYYY-MM-DD date.'})
+
+
+class TaskStatistics(APIView):
+    """Stored task counts of the caller's charity and benefactor profiles."""
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        roles = user_roles(request.user)
+        return Response(task_stats(roles.charity_id, roles.benefactor_id))
+
+
+# State changes below go through Task.transition(): conditional UPDATEs
+# guarded by the expected source state, so concurrent callers race inside
+# the database and exactly one wins, without retries. The losers get 409.
+# Bursts are refused with 429 before that, see charities/throttling.py.
+
 class TaskRequest(APIView):
-    pass
+    permission_classes = (IsBenefactor,)
+    throttle_classes = (TaskWriteThrottle,)
+    throttle_scopes = ('user',)
+
+    def post(self, request, task_id):
+        claimed = Task.objects.filter(pk=task_id).transition(
+            'W', assigned_benefactor_id=user_roles(request.user).benefactor_id)
+        if not claimed:
+            get_object_or_404(Task, pk=task_id)
+            return Response(data={'detail': 'This task is not pending.'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(data={'detail': 'Request sent.'},
+                        status=status.HTTP_200_OK)
 
 
 class TaskResponse(APIView):
-    pass
+    permission_classes = (IsCharityOwner,)
+    throttle_classes = (TaskWriteThrottle,)
+    throttle_scopes = ('user', 'charity')
+
+    def post(self, request, task_id):
+        response = request.data.get('response')
+        if response not in ('A', 'R'):
+            return Response(
+                data={'detail': 'Required field ("A" for accepted / '
+                                '"R" for rejected)'},
+                status=status.HTTP_400_BAD_REQUEST)
+        tasks = Task.objects.filter(
+            pk=task_id, charity_id=user_roles(request.user).charity_id)
+        if response == 'A':
+            updated = tasks.transition('A')
+        else:
+            updated = tasks.transition('P', assigned_benefactor_id=None)
+        if not updated:
+            get_object_or_404(tasks)
+            return Response(data={'detail': 'This task is not waiting.'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(data={'detail': 'Response sent.'},
+                        status=status.HTTP_200_OK)
 
 
 class DoneTask(APIView):
-    pass
\ No newline at end of file
+    permission_classes = (IsCharityOwner,)
+    throttle_classes = (TaskWriteThrottle,)
+    throttle_scopes = ('user', 'charity')
+
+    def post(self, request, task_id):
+        tasks = Task.objects.filter(
+            pk=task_id, charity_id=user_roles(request.user).charity_id)
+        if not tasks.transition('D'):
+            get_object_or_404(tasks)
+            return Response(data={'detail': 'Task is not assigned yet.'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(data={'detail': 'Task has been done successfully.'},
+                        status=status.HTTP_200_OK)
@@ -0,0 +1,127 @@
+"""
+Read replica routing (settings.DATABASE_REPLICAS) and SQLite tuning.
+
+ReplicaRoutingMiddleware lets the ORM read from a replica while it serves a
+GET/HEAD/OPTIONS request; everything else (writes, unsafe requests,
+management commands, reads inside a transaction) uses the primary. After
+an unsafe request the client, identified by its Authorization header or
+session cookie, keeps reading from the primary for REPLICA_PIN_SECONDS so
+that it sees its own writes despite replication lag. The pins live in the
+REPLICA_PIN_CACHE alias, which multi-process deployments should share.
+
+Tokens and sessions are always read from the primary: a token issued by a
+login must authenticate the very next request. So are reads within
+primary_reads(), which the version-keyed caches (the task feed, the
+calendar weeks, the about-us roster) fill from: a replica that lags behind
+a write would have its stale rows cached under the version the write's
+commit bumped, and served until the next bump.
+
+configure_sqlite applies settings.SQLITE_PRAGMAS to every new SQLite
+connection; CharitiesConfig.ready() connects it to connection_created.
+"""
+
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY_ONLY_APPS = {"authtoken", "sessions"}
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", ())
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    """Let the reads of this context go to a replica (or not)."""
+    token = _replica_reads.set(allowed)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_reads():
+    """Read from the primary in this context, even while serving a GET."""
+    return replica_reads(allowed=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or not _replica_reads.get():
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        return False if db in replicas() else None
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", {}))
+    if connection.alias in replicas():
+        pragmas.pop("journal_mode", None)
+    for name, value in pragmas.items():
+        # Straight on the DB-API connection: not logged as a query.
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+def pin_cache():
+    return caches[getattr(settings, "REPLICA_PIN_CACHE", "default")]
+
+
+def pin_key(request):
+    identity = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not identity:
+        return None
+    return "db:pinned:" + hashlib.md5(identity.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = pin_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if key is not None:
+                pin_cache().set(
+                    key, True, getattr(settings, "REPLICA_PIN_SECONDS", 5)
+                )
+            return response
+        if key is not None and pin_cache().get(key):
+            return self.get_response(request)
+        with replica_reads():
+            return self.get_response(request)
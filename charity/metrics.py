@@ -0,0 +1,233 @@
+"""
+Opt-in per-view request instrumentation (settings.REQUEST_METRICS).
+
+RequestMetricsMiddleware records, for every request, the number of SQL
+queries, the time spent in the database, the time spent building
+serializer data (serializers that mix in TimedSerializerMixin, less the SQL
+they run), the time spent encoding the response body once the view
+returned and the total latency. It keeps them
+in in-process histograms labelled by view, which metrics_view exposes in
+the Prometheus text format to staff users and to scrapers that send
+settings.METRICS_TOKEN as a bearer token. Every worker process reports its
+own numbers.
+"""
+
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+METRICS = (
+    ("request_duration_seconds", "Total request latency.", LATENCY_BUCKETS),
+    ("request_db_seconds", "Time spent executing SQL.", LATENCY_BUCKETS),
+    (
+        "request_serialize_seconds",
+        "Time spent building serializer data, excluding its SQL.",
+        LATENCY_BUCKETS,
+    ),
+    (
+        "request_encode_seconds",
+        "Time spent encoding the response body after the view returned.",
+        LATENCY_BUCKETS,
+    ),
+    ("request_queries", "SQL queries issued per request.", QUERY_BUCKETS),
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """Cumulative (le, count) pairs ending with +Inf."""
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._histograms = {
+            name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+            for name, _, buckets in METRICS
+        }
+
+    def observe(self, labels, **values):
+        with self._lock:
+            for name, value in values.items():
+                self._histograms[name][labels].observe(value)
+
+    def get(self, name, labels):
+        return self._histograms[name].get(labels)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, help_text, _ in METRICS:
+                lines.append(f"# HELP charity_{name} {help_text}")
+                lines.append(f"# TYPE charity_{name} histogram")
+                for (view, method), histogram in sorted(self._histograms[name].items()):
+                    labels = f'view="{view}",method="{method}"'
+                    for bound, count in histogram.samples():
+                        lines.append(
+                            f'charity_{name}_bucket{{{labels},le="{bound}"}} {count}'
+                        )
+                    lines.append(f"charity_{name}_sum{{{labels}}} {histogram.sum:.6f}")
+                    count = sum(histogram.counts)
+                    lines.append(f"charity_{name}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class QueryTimer:
+    """Database execute wrapper that counts and times queries."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - started
+
+
+class SerializeTimer:
+    """Time spent in serializer .data, less the queries it ran."""
+
+    def __init__(self, queries):
+        self.queries = queries
+        self.seconds = 0
+        self.running = False
+
+
+_serialize_timer = ContextVar("serialize_timer", default=None)
+
+
+@contextmanager
+def timed_serialization():
+    timer = _serialize_timer.get()
+    if timer is None or timer.running:
+        # Not measuring, or inside an outer serializer that already is.
+        yield
+        return
+    timer.running = True
+    started, db_seconds = time.perf_counter(), timer.queries.seconds
+    try:
+        yield
+    finally:
+        timer.running = False
+        timer.seconds += (
+            time.perf_counter() - started - (timer.queries.seconds - db_seconds)
+        )
+
+
+class TimedSerializerMixin:
+    """Serializer mixin that reports building .data as serialize time."""
+
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    func = getattr(match.func, "view_class", match.func)
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_METRICS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        timer = QueryTimer()
+        serialize = SerializeTimer(timer)
+        encode = {"started": None, "seconds": 0}
+        request._metrics_encode = encode
+
+        token = _serialize_timer.set(serialize)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            _serialize_timer.reset(token)
+
+        registry.observe(
+            (view_label(request), request.method),
+            request_duration_seconds=time.perf_counter() - started,
+            request_db_seconds=timer.seconds,
+            request_serialize_seconds=serialize.seconds,
+            request_encode_seconds=encode["seconds"],
+            request_queries=timer.queries,
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns; the
+        # serializers already ran in the view (request_serialize_seconds),
+        # so this is the JSON encoding.
+        encode = request._metrics_encode
+        encode["started"] = time.perf_counter()
+        response.add_post_render_callback(
+            lambda rendered: encode.update(
+                seconds=time.perf_counter() - encode["started"]
+            )
+        )
+        return response
+
+
+def may_scrape(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    token = getattr(settings, "METRICS_TOKEN", "")
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return bool(
+        token
+        and scheme.lower() == "bearer"
+        and hmac.compare_digest(credentials.encode(), token.encode())
+    )
+
+
+def metrics_view(request):
+    if not getattr(settings, "REQUEST_METRICS", False):
+        raise Http404
+    if not may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4")
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -19,13 +22,36 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
+# Serving profile, selected with the CHARITY_PROFILE environment variable:
+# "development" (the default, runserver with DEBUG on) or "production".
+# SERVER_INTERFACE picks the protocol gunicorn.conf.py serves: "wsgi" or
+# "asgi"; under ASGI the read-heavy views run on the async ORM.
+PROFILE = os.environ.get("CHARITY_PROFILE", "development")
+PRODUCTION = PROFILE == "production"
+SERVER_INTERFACE = os.environ.get("SERVER_INTERFACE", "wsgi")
+ASYNC_READ_VIEWS = SERVER_INTERFACE == "asgi"
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "t1m$51#g8=9fbqg-+c_4&^d!zmh0yv@!1#&2vms1%ltndz-&t3"
+# The production profile takes the key and the hosts from the environment
+# only; the defaults below are for development.
+if PRODUCTION:
+    missing = [
+        name
+        for name in ("DJANGO_SECRET_KEY", "DJANGO_ALLOWED_HOSTS")
+        if not os.environ.get(name)
+    ]
+    if missing:
+        raise ImproperlyConfigured(
+            f"The production profile needs {', '.join(missing)} to be set."
+        )
+SECRET_KEY = os.environ.get(
+    "DJANGO_SECRET_KEY", "t1m$51#g8=9fbqg-+c_4&^d!zmh0yv@!1#&2vms1%ltndz-&t3"
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = ["*"]
+ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "*").split(",")
 
 # Custom User Model
 AUTH_USER_MODEL = "accounts.User"
@@ -56,7 +82,14 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_DEFAULT_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 
+# Per-view query count and latency histograms, served at /metrics.
+REQUEST_METRICS = os.environ.get("REQUEST_METRICS") == "1"
+# Bearer token for scrapers of /metrics; staff users need none.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
 MIDDLEWARE = [
+    "charity.metrics.RequestMetricsMiddleware",
+    "charity.db.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -89,13 +122,146 @@ WSGI_APPLICATION = "charity.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Production WSGI workers keep their connection between requests. Under ASGI
+# every request may run on a different thread, so connections are closed
+# per request there unless DB_CONN_MAX_AGE says otherwise.
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": int(
+            os.environ.get(
+                "DB_CONN_MAX_AGE",
+                600 if PRODUCTION and SERVER_INTERFACE == "wsgi" else 0,
+            )
+        ),
+        "CONN_HEALTH_CHECKS": PRODUCTION,
+        # Kept between runs by charity.test_runner.TestRunner.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+    }
+}
+
+# Read replicas: DB_REPLICAS lists SQLite files (comma-separated, relative
+# to BASE_DIR) that become the aliases "replica1", "replica2", ... They are
+# opened read-only and keep persistent connections like the default. GET
+# requests read from them, see charity/db.py. The primary's own file
+# (DB_REPLICAS=db.sqlite3) is a local stand-in for a real replica.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.environ.get("DB_REPLICAS", "").split(",")), start=1
+):
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME": f"file:{(BASE_DIR / name).as_posix()}?mode=ro",
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# PRAGMAs charity.db.configure_sqlite applies to every new SQLite connection.
+# SQLITE_PROFILE "wal" (the default) lets readers run alongside the single
+# writer and commits without an fsync per transaction; "rollback" restores
+# SQLite's own rollback journal and fsyncs. journal_mode sticks to the file,
+# so it is left alone on read-only replica connections.
+SQLITE_PROFILES = {
+    "wal": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+    },
+    "rollback": {
+        "journal_mode": "delete",
+        "synchronous": "full",
+        "busy_timeout": 5000,
+    },
+}
+SQLITE_PRAGMAS = SQLITE_PROFILES[os.environ.get("SQLITE_PROFILE", "wal")]
+
+DATABASE_ROUTERS = ["charity.db.ReplicaRouter"]
+# Seconds a client reads from the primary after an unsafe request, and the
+# CACHES alias that remembers it.
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_CACHE = "default"
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# The about-us roster, the task feed pages, the calendar weeks and their
+# version stamps live here. A version is bumped only by the process that
+# made the write, so every process serving requests must share this cache.
+# CACHE_URL selects Redis (redis://..., needs the redis package) or
+# Memcached (memcached://host:port, needs pymemcache); without it the
+# production profile keeps the cache in files under CACHE_DIR, shared by
+# the workers of one host, and development uses process memory.
+# gunicorn.conf.py refuses to start several workers on a LocMemCache.
+
+CACHE_URL = os.environ.get("CACHE_URL", "")
+if CACHE_URL.startswith(("redis://", "rediss://", "unix://")):
+    DEFAULT_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_URL,
+    }
+elif CACHE_URL.startswith("memcached://"):
+    DEFAULT_CACHE = {
+        "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+        "LOCATION": CACHE_URL.removeprefix("memcached://"),
     }
+elif CACHE_URL:
+    raise ImproperlyConfigured(f"Unsupported CACHE_URL scheme: {CACHE_URL}")
+elif PRODUCTION:
+    DEFAULT_CACHE = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_DIR", BASE_DIR / "cache"),
+        # Room for the feed pages and calendar weeks between culls.
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    }
+else:
+    DEFAULT_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+
+CACHES = {
+    "default": DEFAULT_CACHE,
 }
 
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+# PASSWORD_HASHER_PROFILE picks the hasher for new passwords: "argon2" (the
+# default, argon2-cffi), "bcrypt" or "pbkdf2". The other hashers stay listed
+# so existing hashes verify; they are rehashed with the profile's hasher and
+# PASSWORD_HASHER_COST on the user's next login. Registration and login hash
+# in a pool of PASSWORD_HASHING_WORKERS processes per web worker (0 hashes
+# inline). Every web worker starts its own pool, so keep this small: the
+# web workers already spread over the CPUs.
+
+PASSWORD_HASHER_PROFILE = os.environ.get("PASSWORD_HASHER_PROFILE", "argon2")
+PASSWORD_HASHER_PROFILES = {
+    "argon2": "accounts.hashers.Argon2PasswordHasher",
+    "bcrypt": "accounts.hashers.BCryptSHA256PasswordHasher",
+    "pbkdf2": "accounts.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE],
+    *(
+        path
+        for name, path in PASSWORD_HASHER_PROFILES.items()
+        if name != PASSWORD_HASHER_PROFILE
+    ),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+# Argon2id at the OWASP minimum (19 MiB, 2 passes, 1 lane); bcrypt and
+# PBKDF2 at Django's defaults.
+PASSWORD_HASHER_COST = {
+    "argon2": {"time_cost": 2, "memory_cost": 19456, "parallelism": 1},
+    "bcrypt": {"rounds": 12},
+    "pbkdf2": {"iterations": 600000},
+}
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", 1))
+
+AUTHENTICATION_BACKENDS = ["accounts.backends.PooledModelBackend"]
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -130,17 +296,65 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
 STATIC_URL = "static/"
+STATIC_ROOT = BASE_DIR / "staticfiles"
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Keeps the migrated test database between runs and reports test durations;
+# see charity/test_runner.py.
+TEST_RUNNER = "charity.test_runner.TestRunner"
+
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "accounts.authentication.CachedTokenAuthentication",
     ],
 }
 
-CORS_ORIGIN_ALLOW_ALL = True
\ No newline at end of file
+# Token authentication cache: entries per worker, seconds an entry may live,
+# and a CACHES alias shared by all workers (AUTH_TOKEN_SHARED_CACHE, "" for
+# none). Logout and user changes reach every worker at once only through
+# the shared cache: without one, the other workers keep accepting a deleted
+# token for up to AUTH_TOKEN_CACHE_TIMEOUT seconds. The production profile
+# shares the default cache, which its workers share too.
+# last_seen is written at most once per interval.
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+AUTH_TOKEN_SHARED_CACHE = (
+    os.environ.get("AUTH_TOKEN_SHARED_CACHE", "default" if PRODUCTION else "") or None
+)
+AUTH_LAST_SEEN_FLUSH_INTERVAL = 60
+
+CORS_ORIGIN_ALLOW_ALL = True
+# CACHES alias holding the task feed pages and their version counters.
+TASK_FEED_CACHE = "default"
+
+# Token buckets of the task write endpoints, see charities/throttling.py:
+# per scope, tokens refilled per second and bucket size. "user" counts every
+# write of a user, "charity" the writes made as a charity. Buckets live in
+# each worker (at most TASK_THROTTLE_SIZE); with a shared CACHES alias the
+# workers pool their spending at most once per sync interval (seconds).
+TASK_WRITE_THROTTLES = {
+    "user": {"rate": 5, "burst": 50},
+    "charity": {"rate": 2, "burst": 20},
+}
+TASK_THROTTLE_SIZE = 100000
+TASK_THROTTLE_SHARED_CACHE = None
+TASK_THROTTLE_SYNC_INTERVAL = 1
+
+# Hours of free_time_per_week a batch-assigned task takes, see
+# charities/assignment.py.
+TASK_ASSIGNMENT_HOURS = 2
+
+# Done tasks dated more than this many days ago are moved to TaskArchive by
+# manage.py archive_tasks, see charities/archive.py.
+TASK_ARCHIVE_DAYS = 180
+
+# Callables (dotted paths) the process_task_events worker calls with every
+# TaskEvent written by a task state change.
+TASK_EVENT_HANDLERS = [
+    "charities.events.log_event",
+]
@@ -0,0 +1,249 @@
+"""
+Test runner (settings.TEST_RUNNER) with a reusable test database and a
+timing report.
+
+The SQLite test database is a file (DATABASES['default']['TEST']['NAME'])
+that is migrated once and then kept between runs, as with --keepdb. Its
+user_version holds a checksum of the migration files: when a migration is
+added, edited or removed, the file and its --parallel clones are rebuilt,
+since Django neither re-applies an edited migration nor refreshes clones
+it kept. --fresh-db rebuilds them unconditionally.
+
+Every run ends with its duration and its slowest tests, also under
+--parallel, whose workers send each test's duration back with its result.
+--timing-report FILE keeps the durations as JSON and compares the run with
+the previous one written to FILE.
+"""
+import glob
+import inspect
+import json
+import os
+import sqlite3
+import time
+import unittest
+import zlib
+
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test.runner import (
+    DiscoverRunner, ParallelTestSuite, RemoteTestResult, RemoteTestRunner)
+
+
+def migrations_checksum():
+    """A 31-bit checksum (SQLite's user_version is signed) of migrations."""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    checksum = 0
+    for key, migration in sorted(loader.disk_migrations.items()):
+        checksum = zlib.crc32(repr(key).encode(), checksum)
+        with open(inspect.getfile(type(migration)), 'rb') as source:
+            checksum = zlib.crc32(source.read(), checksum)
+    return checksum & 0x7FFFFFFF
+
+
+def kept_databases():
+    """Connections whose test database is a file that outlives the run."""
+    for connection in connections.all(initialized_only=False):
+        test = connection.settings_dict['TEST']
+        if (connection.vendor == 'sqlite' and not test['MIRROR']
+                and test['NAME']
+                and not connection.creation.is_in_memory_db(test['NAME'])):
+            yield connection
+
+
+def sqlite_files(name):
+    """The SQLite database ``name`` and its journals, if they exist."""
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(f'{name}{suffix}'):
+            yield f'{name}{suffix}'
+
+
+def clone_names(name):
+    """The --parallel clones of the test database ``name``."""
+    root, ext = os.path.splitext(name)
+    return [path for path in glob.glob(f'{glob.escape(root)}_*{ext}')
+            if path[len(root) + 1:len(path) - len(ext)].isdigit()]
+
+
+def user_version(name):
+    if not os.path.exists(name):
+        return None
+    db = sqlite3.connect(name)
+    try:
+        return db.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        db.close()
+
+
+def read_report(path):
+    """The timing report at ``path``, or None if it is missing or invalid."""
+    try:
+        with open(path) as report:
+            previous = json.load(report)
+        total, tests = previous['total'], previous['tests']
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    if not isinstance(total, (int, float)) or not isinstance(tests, dict):
+        return None
+    return previous
+
+
+class TimedTextTestResult(unittest.TextTestResult):
+    """TextTestResult that records how long each test took, by test id."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.durations = {}
+
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.addDuration(test, time.perf_counter() - self._started)
+
+    def addDuration(self, test, elapsed):
+        # Also replayed from --parallel workers after their stopTest, so the
+        # worker's measurement replaces the replay's.
+        self.durations[test.id()] = elapsed
+
+
+class TimedRemoteTestResult(RemoteTestResult):
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.events.append(('addDuration', self.test_index,
+                            time.perf_counter() - self._started))
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    resultclass = TimedRemoteTestResult
+
+
+class TimedParallelTestSuite(ParallelTestSuite):
+    runner_class = TimedRemoteTestRunner
+
+
+class TestRunner(DiscoverRunner):
+    parallel_test_suite = TimedParallelTestSuite
+
+    def __init__(self, fresh_db=False, slowest=10, timing_report=None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.keepdb = True
+        self.fresh_db = fresh_db
+        self.slowest = slowest
+        self.timing_report = timing_report
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--fresh-db', action='store_true',
+            help='Rebuild the kept test database even if its migrations '
+                 'match.')
+        parser.add_argument(
+            '--slowest', type=int, default=10,
+            help='Number of slowest tests to list after the run (default '
+                 '10).')
+        parser.add_argument(
+            '--timing-report', metavar='FILE',
+            help='Write test durations to FILE (JSON) and compare them with '
+                 'the report FILE held before.')
+
+    def setup_databases(self, **kwargs):
+        checksum = migrations_checksum()
+        kept = list(kept_databases())
+        for connection in kept:
+            name = connection.settings_dict['TEST']['NAME']
+            self.remove_clones(name)
+            if self.fresh_db or user_version(name) != checksum:
+                if self.verbosity >= 1 and os.path.exists(name):
+                    self.log(f'Rebuilding the test database {name}...')
+                for path in sqlite_files(name):
+                    os.remove(path)
+        # Django copies only the database file into the clones, so the
+        # migrations must leave the WAL first: clone here, after a
+        # checkpoint.
+        parallel, self.parallel = self.parallel, 0
+        try:
+            old_config = super().setup_databases(**kwargs)
+        finally:
+            self.parallel = parallel
+        for connection, _, created in old_config:
+            if not created:
+                continue
+            if connection in kept:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'PRAGMA user_version = {checksum}')
+                    cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            for index in range(self.parallel if self.parallel > 1 else 0):
+                with self.time_keeper.timed(
+                        f"  Cloning '{connection.alias}'"):
+                    connection.creation.clone_test_db(
+                        suffix=str(index + 1), verbosity=self.verbosity)
+        return old_config
+
+    def teardown_databases(self, old_config, **kwargs):
+        super().teardown_databases(old_config, **kwargs)
+        for connection, _, created in old_config:
+            if created and connection in kept_databases():
+                self.remove_clones(connection.settings_dict['TEST']['NAME'])
+
+    def remove_clones(self, name):
+        """Clones are copied afresh from the kept database on every run."""
+        for clone in clone_names(os.fspath(name)):
+            for path in sqlite_files(clone):
+                os.remove(path)
+
+    def get_resultclass(self):
+        return super().get_resultclass() or TimedTextTestResult
+
+    def run_suite(self, suite, **kwargs):
+        started = time.perf_counter()
+        result = super().run_suite(suite, **kwargs)
+        elapsed = time.perf_counter() - started
+        durations = getattr(result, 'durations', {})
+        self.report(elapsed, durations)
+        return result
+
+    def report(self, elapsed, durations):
+        slowest = sorted(durations.items(), key=lambda item: -item[1])
+        lines = [f'Ran the suite in {elapsed:.2f}s']
+        if self.slowest > 0 and slowest:
+            lines.append(f'Slowest {min(self.slowest, len(slowest))} tests:')
+            lines.extend(f'  {seconds:7.3f}s {test}'
+                         for test, seconds in slowest[:self.slowest])
+        if self.timing_report:
+            lines.extend(self.compare(elapsed, durations))
+        self.log('\n'.join(lines))
+
+    def compare(self, elapsed, durations):
+        """Write the timing report and describe the change since the last."""
+        previous = read_report(self.timing_report)
+        with open(self.timing_report, 'w') as report:
+            json.dump({'total': elapsed, 'tests': dict(sorted(
+                durations.items()))}, report, indent=1)
+        if previous is None:
+            return [f'Wrote the timing report to {self.timing_report}']
+        before = previous['total']
+        change = f' ({elapsed / before - 1:+.0%})' if before > 0 else ''
+        lines = [f'Suite: {before:.2f}s -> {elapsed:.2f}s{change} since the '
+                 f'last report']
+        tests = previous['tests']
+        changes = sorted(
+            ((seconds - tests[test], test, seconds)
+             for test, seconds in durations.items()
+             if isinstance(tests.get(test), (int, float))),
+            reverse=True)
+        # Ignore jitter: a test must take 10ms and 20% longer than before.
+        grown = [(change, test, seconds) for change, test, seconds in changes
+                 if change > max(0.01, 0.2 * (seconds - change))]
+        if grown:
+            lines.append('Slowed down the most:')
+            lines.extend(f'  {change:+7.3f}s {test} (now {seconds:.3f}s)'
+                         for change, test, seconds in grown[:self.slowest])
+        return lines
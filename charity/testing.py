@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+class QueryBudgetMixin:
+    """TestCase mixin for asserting an upper bound on issued queries."""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        if len(context) > budget:
+            queries = "\n".join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f"{len(context)} queries executed, the budget is "
+                f"{budget}:\n{queries}"
+            )
+
+
+@contextmanager
+def replica_connection(alias="replica", primary=DEFAULT_DB_ALIAS):
+    """
+    Register ``alias`` as a second connection to the test database of
+    ``primary`` and route replica reads to it. It only sees committed data,
+    so use it from a TransactionTestCase.
+    """
+    connections.settings[alias] = {
+        **connections[primary].settings_dict,
+        "TEST": {"MIRROR": primary},
+    }
+    try:
+        with override_settings(DATABASE_REPLICAS=[alias]):
+            yield connections[alias]
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
@@ -16,7 +16,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from charity.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("about-us/", include("about_us.urls")),
+    path("accounts/", include("accounts.urls")),
+    path("", include("charities.urls")),
+    path("metrics", metrics_view),
 ]
@@ -0,0 +1,50 @@
+"""
+Gunicorn settings for the production profile.
+
+    CHARITY_PROFILE=production SERVER_INTERFACE=asgi gunicorn -c gunicorn.conf.py
+
+SERVER_INTERFACE chooses between threaded WSGI workers and uvicorn ASGI
+workers; WEB_CONCURRENCY and WEB_THREADS size them. Several workers need a
+cache they share (see CACHES in charity/settings.py): the master refuses
+to start them on a per-process LocMemCache.
+"""
+import multiprocessing
+import os
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+)
+raw_env = [f"CHARITY_PROFILE={os.environ.get('CHARITY_PROFILE', 'production')}"]
+
+if os.environ.get("SERVER_INTERFACE", "wsgi") == "asgi":
+    wsgi_app = "charity.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "charity.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.environ.get("WEB_THREADS", 4))
+
+accesslog = os.environ.get("ACCESS_LOG")
+
+
+def on_starting(server):
+    # Feed, roster and calendar versions are bumped only in the worker that
+    # wrote; with a cache per worker the others would serve stale pages and
+    # 304s for good.
+    if server.cfg.workers < 2:
+        return
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "charity.settings")
+    from django.conf import settings
+
+    local = sorted(
+        alias
+        for alias, cache in settings.CACHES.items()
+        if cache["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache"
+    )
+    if local:
+        raise RuntimeError(
+            f"{server.cfg.workers} workers cannot share the process-local "
+            f"caches {local}; set CACHE_URL or run one worker."
+        )
@@ -0,0 +1,146 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.authentication import token_cache
+from accounts.models import User
+from charities.models import Benefactor, Charity, Task
+from charity.db import replica_reads
+from charity.testing import replica_connection
+
+SEARCH = "/tasks/search/?q=task1"
+
+
+def statements(captured):
+    return [query["sql"] for query in captured]
+
+
+class ReplicaRoutingTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.owner = User.objects.create(username="owner")
+        self.charity = Charity.objects.create(
+            user=self.owner, name="charity", reg_number="1234567890"
+        )
+        self.tasks = Task.objects.bulk_create(
+            [Task(title=f"task{i}", charity=self.charity) for i in range(3)]
+        )
+        user = User.objects.create(username="benefactor")
+        Benefactor.objects.create(user=user)
+        token = Token.objects.create(user=user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.replica = self.enterContext(replica_connection())
+
+    def queries(self, method, path):
+        """Run a request and return the SQL sent to the primary and replica."""
+        with CaptureQueriesContext(connection) as primary:
+            with CaptureQueriesContext(self.replica) as replica:
+                response = getattr(self.client, method)(path)
+        self.assertLess(response.status_code, 400, response.content)
+        return statements(primary), statements(replica)
+
+    def test_get_requests_read_from_the_replica(self):
+        primary, replica = self.queries("get", SEARCH)
+        # The token is looked up on the primary, the tasks on the replica.
+        self.assertTrue(primary)
+        self.assertTrue(all('"authtoken_token"' in sql for sql in primary))
+        self.assertTrue(any('"charities_task"' in sql for sql in replica))
+
+    def test_clients_read_their_writes_after_a_post(self):
+        path = f"/tasks/{self.tasks[0].pk}/request/"
+        primary, replica = self.queries("post", path)
+        self.assertEqual(replica, [])
+        primary, replica = self.queries("get", SEARCH)
+        self.assertEqual(replica, [])
+        self.assertTrue(any('"charities_task"' in sql for sql in primary))
+
+        cache.clear()  # The pin expires.
+        primary, replica = self.queries("get", SEARCH)
+        self.assertTrue(replica)
+
+    def test_cached_feed_pages_are_read_from_the_primary(self):
+        # A lagging replica would cache the feed from before the write that
+        # bumped its version, until the page times out.
+        for _ in range(2):
+            primary, replica = self.queries("get", "/tasks/")
+            self.assertFalse(any('"charities_task"' in sql for sql in replica))
+        self.assertEqual(primary, [])  # The second page came from the cache.
+
+    def test_reads_outside_requests_and_transactions_use_the_primary(self):
+        helper = Task.objects.related_tasks_to_charity(self.owner)
+        self.assertEqual(helper.db, "default")
+        with replica_reads():
+            self.assertEqual(helper.all().db, "replica")
+            self.assertEqual(Token.objects.all().db, "default")
+            with transaction.atomic():
+                self.assertEqual(helper.all().db, "default")
+            task = Task.objects.get(pk=self.tasks[0].pk)
+            self.assertEqual(task._state.db, "replica")
+            task.title = "renamed"
+            task.save()
+        self.assertEqual(Task.objects.get(pk=task.pk).title, "renamed")
+
+
+class SQLiteProfileTest(TransactionTestCase):
+    def pragmas(self, alias, name):
+        """Open ``alias`` on a fresh file and read back its PRAGMAs."""
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        connections.settings[alias] = {
+            **connections[DEFAULT_DB_ALIAS].settings_dict,
+            "NAME": os.path.join(directory, name),
+        }
+        try:
+            with connections[alias].cursor() as cursor:
+                values = {}
+                for pragma in ("journal_mode", "synchronous", "busy_timeout"):
+                    cursor.execute(f"PRAGMA {pragma}")
+                    values[pragma] = cursor.fetchone()[0]
+                return values
+        finally:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+    @override_settings(SQLITE_PRAGMAS=settings.SQLITE_PROFILES["wal"])
+    def test_new_connections_get_the_profile(self):
+        values = self.pragmas("sqlite_profile", "wal.sqlite3")
+        # synchronous=NORMAL reads back as 1.
+        self.assertEqual(
+            values, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000}
+        )
+
+    @override_settings(
+        SQLITE_PRAGMAS=settings.SQLITE_PROFILES["wal"],
+        DATABASE_REPLICAS=["sqlite_replica"],
+    )
+    def test_replicas_keep_the_journal_mode_of_the_file(self):
+        values = self.pragmas("sqlite_replica", "replica.sqlite3")
+        self.assertEqual(values["journal_mode"], "delete")
+        self.assertEqual(values["busy_timeout"], 5000)
+
+    def test_maintenance_command_analyzes_and_checkpoints(self):
+        Task.objects.create(
+            title="task",
+            charity=Charity.objects.create(
+                user=User.objects.create(username="owner"),
+                name="charity",
+                reg_number="1234567890",
+            ),
+        )
+        out = StringIO()
+        call_command("sqlite_maintenance", stdout=out)
+        output = out.getvalue()
+        self.assertIn("analyze:", output)
+        self.assertIn("checkpoint:", output)
+        self.assertLess(output.index("analyze:"), output.index("checkpoint:"))
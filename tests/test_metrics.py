@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from charities.models import Charity, Task
+from charity.metrics import registry
+from charity.testing import QueryBudgetMixin
+
+
+class RequestMetricsTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.user = User.objects.create(username='owner')
+        charity = Charity.objects.create(
+            user=self.user, name='charity', reg_number='1234567890')
+        Task.objects.bulk_create(
+            [Task(title=f'task{i}', charity=charity) for i in range(5)])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_metrics_are_disabled_by_default(self):
+        self.client.get('/tasks/')
+        self.assertIsNone(registry.get(
+            'request_queries', ('charities.views.Tasks', 'GET')))
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(REQUEST_METRICS=True, METRICS_TOKEN='secret')
+    def test_per_view_histograms_are_exported(self):
+        for _ in range(3):
+            self.client.get('/tasks/')
+        labels = ('charities.views.Tasks', 'GET')
+        queries = registry.get('request_queries', labels)
+        self.assertEqual(sum(queries.counts), 3)
+        self.assertGreater(queries.sum, 0)
+        # Only the first request builds the page; the others hit the cache.
+        self.assertGreater(
+            registry.get('request_serialize_seconds', labels).sum, 0)
+        self.assertGreater(
+            registry.get('request_encode_seconds', labels).sum, 0)
+
+        body = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('# TYPE charity_request_duration_seconds histogram',
+                      body)
+        self.assertIn('charity_request_queries_count{view="charities.views'
+                      '.Tasks",method="GET"} 3', body)
+
+    @override_settings(REQUEST_METRICS=True, METRICS_TOKEN='secret')
+    def test_metrics_need_the_token_or_a_staff_user(self):
+        client = Client()
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        self.assertEqual(client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        client.force_login(User.objects.create(username='ops', is_staff=True))
+        self.assertEqual(client.get('/metrics').status_code, 200)
+
+    @override_settings(REQUEST_METRICS=True)
+    def test_metrics_are_closed_without_a_token(self):
+        self.assertEqual(Client().get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    def test_query_budget(self):
+        with self.assertMaxQueries(3):
+            self.client.get('/tasks/')
+        with self.assertRaisesMessage(AssertionError, 'the budget is 0'):
+            with self.assertMaxQueries(0):
+                self.client.get('/tasks/?page_size=2')
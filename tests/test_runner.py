@@ -0,0 +1,71 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from django.test import SimpleTestCase
+
+from charity.test_runner import (
+    TestRunner,
+    TimedRemoteTestResult,
+    TimedTextTestResult,
+    clone_names,
+    migrations_checksum,
+)
+
+
+class TestRunnerTest(SimpleTestCase):
+    def test_worker_durations_reach_the_parent_result(self):
+        test = unittest.FunctionTestCase(lambda: None)
+        remote = TimedRemoteTestResult()
+        test(remote)
+        self.assertEqual(
+            [event[0] for event in remote.events],
+            ["startTest", "addSuccess", "stopTest", "addDuration"],
+        )
+
+        # ParallelTestSuite.run replays the events in the parent.
+        result = TimedTextTestResult(io.StringIO(), False, 0)
+        for name, _, *args in remote.events:
+            getattr(result, name)(test, *args)
+        self.assertEqual(result.durations, {test.id(): remote.events[-1][2]})
+        self.assertTrue(result.wasSuccessful())
+
+    def test_only_numbered_clones_are_matched(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, "test_db.sqlite3")
+            for file in ("test_db_1.sqlite3", "test_db_12.sqlite3",
+                         "test_db_old.sqlite3", "test_db_1.sqlite3-wal"):
+                open(os.path.join(directory, file), "w").close()
+            self.assertEqual(
+                sorted(os.path.basename(path) for path in clone_names(name)),
+                ["test_db_1.sqlite3", "test_db_12.sqlite3"],
+            )
+
+    def test_migrations_checksum_fits_user_version(self):
+        checksum = migrations_checksum()
+        self.assertEqual(checksum, migrations_checksum())
+        self.assertTrue(0 <= checksum < 2**31)
+
+    def test_compare_survives_an_empty_or_malformed_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "timing.json")
+            runner = TestRunner(timing_report=path)
+            for previous in ({"total": 0, "tests": {"a": 0}},
+                             {"tests": {}}, {"total": 1, "tests": None},
+                             [1, 2], "{"):
+                with open(path, "w") as report:
+                    if isinstance(previous, str):
+                        report.write(previous)
+                    else:
+                        json.dump(previous, report)
+                lines = runner.compare(1.0, {"a": 0.5})
+                self.assertTrue(lines[0].startswith(("Suite:", "Wrote")))
+                with open(path) as report:
+                    self.assertEqual(json.load(report),
+                                     {"total": 1.0, "tests": {"a": 0.5}})
+            self.assertEqual(
+                runner.compare(1.0, {"a": 0.5})[0],
+                "Suite: 1.00s -> 1.00s (+0%) since the last report",
+            )
@@ -0,0 +1,54 @@
+import os
+import runpy
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+on_starting = runpy.run_path(
+    str(Path(settings.BASE_DIR) / 'gunicorn.conf.py'))['on_starting']
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+FILES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': '/tmp/charity-cache'}}
+
+
+def server(workers):
+    return SimpleNamespace(cfg=SimpleNamespace(workers=workers))
+
+
+class GunicornStartupTest(SimpleTestCase):
+    @override_settings(CACHES=LOCMEM)
+    def test_several_workers_refuse_a_process_local_cache(self):
+        with self.assertRaisesMessage(RuntimeError, "['default']"):
+            on_starting(server(4))
+        on_starting(server(1))
+
+    @override_settings(CACHES=FILES)
+    def test_several_workers_start_on_a_shared_cache(self):
+        on_starting(server(4))
+
+
+class ProductionSettingsTest(SimpleTestCase):
+    def load_settings(self, **environ):
+        env = {name: value for name, value in os.environ.items()
+               if not name.startswith(('DJANGO_', 'CHARITY_'))}
+        env.update(CHARITY_PROFILE='production', **environ)
+        return subprocess.run(
+            [sys.executable, '-c', 'import charity.settings'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+
+    def test_production_needs_a_secret_key_and_hosts(self):
+        result = self.load_settings(DJANGO_ALLOWED_HOSTS='example.org')
+        self.assertIn('ImproperlyConfigured', result.stderr)
+        self.assertIn('DJANGO_SECRET_KEY', result.stderr)
+        result = self.load_settings(DJANGO_SECRET_KEY='secret')
+        self.assertIn('DJANGO_ALLOWED_HOSTS', result.stderr)
+        result = self.load_settings(DJANGO_SECRET_KEY='secret',
+                                    DJANGO_ALLOWED_HOSTS='example.org')
+        self.assertEqual(result.returncode, 0, result.stderr)
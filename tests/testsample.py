@@ -37,8 +37,7 @@ class AccountsAppTest(TestCase):
 
 class TaskModelTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='Mohammad', password='9')
         cls.benefactor = Benefactor.objects.create(user=cls.user)
         cls.charity = Charity.objects.create(user=cls.user, name='charity', reg_number='5678901234')
@@ -79,8 +78,8 @@ class AboutUsTest(TestCase):
 
 
 class TestAll(TestCase):
-    def setUp(self):
-        self.client = Client()
+    @classmethod
+    def setUpTestData(cls):
         user = {"username": "Saeid",
                 "password": "1q*b12$z",
                 "phone": "09133333333",
@@ -91,28 +90,29 @@ class TestAll(TestCase):
                 "first_name": "Saeid",
                 "last_name": "Saeidi",
                 "email": "Saeid12345@gmail.com"}
-        self.user = User.objects.create(**user)
-        self.user_2 = User.objects.create(**{**user, "username": "Ali"})
-        self.user_3 = User.objects.create(**{**user, "username": "Mohammad"})
-        self.user_4 = User.objects.create(**{**user, "username": "Sajjad"})
-        
-        self.charity = Charity.objects.create(user=self.user, name='charity1', reg_number='1234567891')
-        self.charity_2 = Charity.objects.create(user=self.user_2, name='charity2', reg_number='1234567892')
-        self.charity_3 = Charity.objects.create(user=self.user_3, name='charity3', reg_number='1234567893')
-        self.charity_4 = Charity.objects.create(user=self.user_4, name='charity4', reg_number='1234567894')
-        
-        self.benefactor = Benefactor.objects.create(user=self.user)
-        self.benefactor_2 = Benefactor.objects.create(user=self.user_2)
-        self.benefactor_3 = Benefactor.objects.create(user=self.user_3)
-        self.benefactor_4 = Benefactor.objects.create(user=self.user_4)
-        
-        Task.objects.create(title='task1', state='A', charity=self.charity)
-        Task.objects.create(title='task2', state='A', charity=self.charity)
-        Task.objects.create(title='task3', state='P', charity=self.charity_2, assigned_benefactor=self.benefactor)
-        Task.objects.create(title='task4', state='A', charity=self.charity_2, assigned_benefactor=self.benefactor_2)
-        Task.objects.create(title='task5', state='A', charity=self.charity_3)
-        Task.objects.create(title='task6', state='A', charity=self.charity_3, assigned_benefactor=self.benefactor_2)
-        Task.objects.create(title='task7', state='P', charity=self.charity_3, assigned_benefactor=self.benefactor_4)
+        cls.user, cls.user_2, cls.user_3, cls.user_4 = User.objects.bulk_create(
+            [User(**{**user, "username": username})
+             for username in ("Saeid", "Ali", "Mohammad", "Sajjad")])
+
+        cls.charity, cls.charity_2, cls.charity_3, cls.charity_4 = Charity.objects.bulk_create(
+            [Charity(user=user, name=f'charity{i}', reg_number=f'123456789{i}')
+             for i, user in enumerate((cls.user, cls.user_2, cls.user_3, cls.user_4), 1)])
+
+        cls.benefactor, cls.benefactor_2, cls.benefactor_3, cls.benefactor_4 = Benefactor.objects.bulk_create(
+            [Benefactor(user=user) for user in (cls.user, cls.user_2, cls.user_3, cls.user_4)])
+
+        Task.objects.bulk_create([
+            Task(title='task1', state='A', charity=cls.charity),
+            Task(title='task2', state='A', charity=cls.charity),
+            Task(title='task3', state='P', charity=cls.charity_2, assigned_benefactor=cls.benefactor),
+            Task(title='task4', state='A', charity=cls.charity_2, assigned_benefactor=cls.benefactor_2),
+            Task(title='task5', state='A', charity=cls.charity_3),
+            Task(title='task6', state='A', charity=cls.charity_3, assigned_benefactor=cls.benefactor_2),
+            Task(title='task7', state='P', charity=cls.charity_3, assigned_benefactor=cls.benefactor_4),
+        ])
+
+    def setUp(self):
+        self.client = Client()
 
     def test_related_tasks_to_charity_manager(self):
         objects = Task.objects.related_tasks_to_charity(user=self.user)